@@ -16,7 +16,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 # Import the Vector type from our application
-from app.database.vector import Vector
+from app.database.vector import EMBEDDING_DIM, Vector
 
 
 # revision identifiers, used by Alembic
@@ -33,7 +33,7 @@ def upgrade():
     # Add the embedding column to document_chunk table
     # We need to use batch_alter_table because Vector is a custom type
     with op.batch_alter_table('document_chunk') as batch_op:
-        batch_op.add_column(Column('embedding', Vector(768), nullable=True))
+        batch_op.add_column(Column('embedding', Vector(EMBEDDING_DIM), nullable=True))
     
     # Create an index for vector similarity search
     op.execute(
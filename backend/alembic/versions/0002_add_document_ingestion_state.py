@@ -0,0 +1,37 @@
+"""Add background ingestion state to document
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Columns may already exist when tables were created by Base.metadata.create_all
+    op.execute('ALTER TABLE document ADD COLUMN IF NOT EXISTS chunk_count INTEGER')
+    op.execute("ALTER TABLE document ADD COLUMN IF NOT EXISTS status VARCHAR NOT NULL DEFAULT 'ready'")
+    op.execute('ALTER TABLE document ADD COLUMN IF NOT EXISTS job_id VARCHAR')
+    op.execute('ALTER TABLE document ADD COLUMN IF NOT EXISTS ingest_progress JSON')
+
+    # Backfill chunk counts for documents ingested before this migration
+    op.execute(
+        'UPDATE document d SET chunk_count = '
+        '(SELECT COUNT(*) FROM document_chunk dc WHERE dc.document_id = d.id) '
+        'WHERE chunk_count IS NULL'
+    )
+
+
+def downgrade():
+    op.execute('ALTER TABLE document DROP COLUMN IF EXISTS ingest_progress')
+    op.execute('ALTER TABLE document DROP COLUMN IF EXISTS job_id')
+    op.execute('ALTER TABLE document DROP COLUMN IF EXISTS status')
+    op.execute('ALTER TABLE document DROP COLUMN IF EXISTS chunk_count')
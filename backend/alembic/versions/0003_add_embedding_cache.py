@@ -0,0 +1,39 @@
+"""Add embedding cache table
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS embedding_cache (
+            id SERIAL PRIMARY KEY,
+            model_name VARCHAR NOT NULL,
+            text_hash VARCHAR(64) NOT NULL,
+            embedding BYTEA NOT NULL,
+            hit_count INTEGER NOT NULL DEFAULT 0,
+            last_used_at TIMESTAMP NOT NULL DEFAULT now(),
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP NOT NULL DEFAULT now(),
+            CONSTRAINT uq_embedding_cache_key UNIQUE (model_name, text_hash)
+        )
+        '''
+    )
+    # Eviction scans the least recently used rows first
+    op.execute('CREATE INDEX IF NOT EXISTS ix_embedding_cache_last_used_at ON embedding_cache (last_used_at)')
+
+
+def downgrade():
+    op.execute('DROP TABLE IF EXISTS embedding_cache')
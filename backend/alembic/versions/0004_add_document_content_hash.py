@@ -0,0 +1,25 @@
+"""Add content hash to document for upload deduplication
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('ALTER TABLE document ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_document_content_hash ON document (content_hash)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_document_content_hash')
+    op.execute('ALTER TABLE document DROP COLUMN IF EXISTS content_hash')
@@ -0,0 +1,63 @@
+"""Rename documentchunk to document_chunk and size embeddings from EMBEDDING_DIM
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.database.vector import EMBEDDING_DIM
+
+
+# revision identifiers, used by Alembic
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables created by Base.metadata.create_all before DocumentChunk declared
+    # its table name were called documentchunk
+    op.execute(
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('documentchunk') IS NOT NULL AND to_regclass('document_chunk') IS NULL THEN
+                ALTER TABLE documentchunk RENAME TO document_chunk;
+            END IF;
+        END
+        $$
+        """
+    )
+
+    # Resize the embedding column when it holds no vectors yet. With the old
+    # hard-coded 768 every insert from a 384-dim model was stored without an
+    # embedding, so this is the common case; populated columns must be moved
+    # with scripts/reembed.py instead.
+    op.execute(
+        f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM document_chunk WHERE embedding IS NOT NULL) THEN
+                DROP INDEX IF EXISTS document_chunk_embedding_idx;
+                ALTER TABLE document_chunk ALTER COLUMN embedding TYPE vector({EMBEDDING_DIM}) USING NULL;
+                CREATE INDEX IF NOT EXISTS document_chunk_embedding_idx
+                    ON document_chunk USING ivfflat (embedding vector_l2_ops);
+            END IF;
+        END
+        $$
+        """
+    )
+
+
+def downgrade():
+    # document_chunk is the name every earlier migration expects, and the
+    # emptied embedding column has nothing to restore
+    pass
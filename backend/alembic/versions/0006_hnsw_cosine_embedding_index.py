@@ -0,0 +1,39 @@
+"""Replace the unsized ivfflat l2 index with an HNSW cosine index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:00:00
+
+"""
+from alembic import op
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.database.indexes import VECTOR_INDEX_NAME, vector_index_sql
+
+
+# revision identifiers, used by Alembic
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The ivfflat index from 0001 was built on an empty table with the default
+    # lists and l2 ops, while searches rank by cosine similarity. HNSW needs no
+    # training data, so it can be built here regardless of table size. Large
+    # tables can instead be rebuilt online with scripts/manage_vector_index.py.
+    op.execute(f'DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}')
+    op.execute(vector_index_sql("hnsw", name=VECTOR_INDEX_NAME, concurrently=False, column="embedding"))
+
+
+def downgrade():
+    op.execute(f'DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}')
+    op.execute(
+        f'CREATE INDEX IF NOT EXISTS {VECTOR_INDEX_NAME} '
+        f'ON document_chunk USING ivfflat (embedding vector_l2_ops)'
+    )
@@ -0,0 +1,26 @@
+"""Index document_chunk.document_id and document.user_id for scoped search
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Exact scoring of a document's chunks reads them through this index
+    op.execute('CREATE INDEX IF NOT EXISTS ix_document_chunk_document_id ON document_chunk (document_id)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_document_user_id ON document (user_id)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_document_user_id')
+    op.execute('DROP INDEX IF EXISTS ix_document_chunk_document_id')
@@ -0,0 +1,39 @@
+"""Add a generated tsvector column and GIN index for lexical chunk search
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 15:00:00
+
+"""
+from alembic import op
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.models.document import FULLTEXT_CONFIG
+
+
+# revision identifiers, used by Alembic
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # A stored generated column is filled for existing rows here and kept in
+    # sync by Postgres for every insert, including COPY and INSERT ... SELECT
+    op.execute(
+        f"""
+        ALTER TABLE document_chunk ADD COLUMN IF NOT EXISTS content_tsv tsvector
+            GENERATED ALWAYS AS (to_tsvector('{FULLTEXT_CONFIG}', content)) STORED
+        """
+    )
+    op.execute('CREATE INDEX IF NOT EXISTS ix_document_chunk_content_tsv ON document_chunk USING gin (content_tsv)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_document_chunk_content_tsv')
+    op.execute('ALTER TABLE document_chunk DROP COLUMN IF EXISTS content_tsv')
@@ -0,0 +1,28 @@
+"""Store a rolling conversation summary and index messages by conversation
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('ALTER TABLE conversation ADD COLUMN IF NOT EXISTS summary TEXT')
+    op.execute('ALTER TABLE conversation ADD COLUMN IF NOT EXISTS summary_message_id INTEGER')
+    # Each turn reads only the latest messages of one conversation
+    op.execute('CREATE INDEX IF NOT EXISTS ix_message_conversation_id_id ON message (conversation_id, id)')
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS ix_message_conversation_id_id')
+    op.execute('ALTER TABLE conversation DROP COLUMN IF EXISTS summary_message_id')
+    op.execute('ALTER TABLE conversation DROP COLUMN IF EXISTS summary')
@@ -0,0 +1,61 @@
+"""Composite indexes for the hot list and lookup queries
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 17:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keyset pages: filter on the owner, then walk (created_at, id) in index order
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_message_conversation_id_created_at '
+        'ON message (conversation_id, created_at, id)'
+    )
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_conversation_user_id_created_at '
+        'ON conversation (user_id, created_at, id)'
+    )
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_document_user_id_created_at '
+        'ON document (user_id, created_at, id)'
+    )
+
+    # Chunks are read per document in chunk order, and a chunk position exists
+    # once per document. Duplicates can only be left by interrupted ingestions
+    # that were retried before earlier attempts were cleared; keep the first copy.
+    op.execute(
+        """
+        DELETE FROM document_chunk newer
+        USING document_chunk older
+        WHERE newer.document_id = older.document_id
+          AND newer.chunk_index = older.chunk_index
+          AND newer.id > older.id
+        """
+    )
+    op.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS uq_document_chunk_document_id_chunk_index '
+        'ON document_chunk (document_id, chunk_index)'
+    )
+
+    # Covered by the composite indexes above, which lead with the same column
+    op.execute('DROP INDEX IF EXISTS ix_document_chunk_document_id')
+    op.execute('DROP INDEX IF EXISTS ix_document_user_id')
+
+
+def downgrade():
+    op.execute('CREATE INDEX IF NOT EXISTS ix_document_user_id ON document (user_id)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_document_chunk_document_id ON document_chunk (document_id)')
+    op.execute('DROP INDEX IF EXISTS uq_document_chunk_document_id_chunk_index')
+    op.execute('DROP INDEX IF EXISTS ix_document_user_id_created_at')
+    op.execute('DROP INDEX IF EXISTS ix_conversation_user_id_created_at')
+    op.execute('DROP INDEX IF EXISTS ix_message_conversation_id_created_at')
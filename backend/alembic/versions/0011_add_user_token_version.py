@@ -0,0 +1,24 @@
+"""Add user.token_version for revoking access tokens
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 18:00:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tokens issued before this column existed carry no version and count as 0
+    op.execute('ALTER TABLE "user" ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0')
+
+
+def downgrade():
+    op.execute('ALTER TABLE "user" DROP COLUMN IF EXISTS token_version')
@@ -0,0 +1,63 @@
+"""Share chunks between documents with the same content
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 19:00:00
+
+"""
+from alembic import op
+import os
+import sys
+
+import sqlalchemy as sa
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from app.database.vector import EMBEDDING_COLUMNS
+
+
+# revision identifiers, used by Alembic
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('ALTER TABLE document ADD COLUMN IF NOT EXISTS chunks_from_id INTEGER REFERENCES document (id)')
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_document_chunks_from_id ON document (chunks_from_id) '
+        'WHERE chunks_from_id IS NOT NULL'
+    )
+    # Documents that were completed by copying an identical document's chunks
+    # now point at them instead, and the copies are dropped
+    op.execute("""
+        UPDATE document d SET chunks_from_id = s.id
+        FROM document s
+        WHERE d.ingest_progress->>'reused_from' = CAST(s.id AS text)
+          AND d.chunks_from_id IS NULL AND s.chunks_from_id IS NULL
+          AND s.status = 'ready' AND d.content_hash = s.content_hash
+    """)
+    op.execute("""
+        DELETE FROM document_chunk dc USING document d
+        WHERE dc.document_id = d.id AND d.chunks_from_id IS NOT NULL
+    """)
+
+
+def downgrade():
+    # Give every sharing document its own copy again, with the embeddings of
+    # every model column present, e.g. both during a scripts/reembed.py rollout
+    existing = set(op.get_bind().execute(sa.text(
+        "SELECT column_name FROM information_schema.columns WHERE table_name = 'document_chunk'"
+    )).scalars())
+    columns = [column for column in EMBEDDING_COLUMNS if column in existing]
+    embedding_columns = ''.join(f', {column}' for column in columns)
+    source_columns = ''.join(f', dc.{column}' for column in columns)
+    op.execute(f"""
+        INSERT INTO document_chunk (content, page_number, chunk_index, document_id{embedding_columns}, created_at, updated_at)
+        SELECT dc.content, dc.page_number, dc.chunk_index, d.id{source_columns}, now(), now()
+        FROM document d JOIN document_chunk dc ON dc.document_id = d.chunks_from_id
+    """)
+    op.execute('DROP INDEX IF EXISTS ix_document_chunks_from_id')
+    op.execute('ALTER TABLE document DROP COLUMN IF EXISTS chunks_from_id')
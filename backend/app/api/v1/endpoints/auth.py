@@ -9,6 +9,7 @@ import os
 
 from ....database.session import get_db
 from ....models.user import User
+from ....utils.principal_cache import Principal, load_principal, principal_cache
 
 router = APIRouter()
 
@@ -52,7 +53,14 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_principal(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
+    """Authenticated principal, usually without touching the database
+
+    Tokens carry the user id ("uid") and token version ("ver"). A cached
+    principal with the same version is trusted for PRINCIPAL_CACHE_TTL
+    seconds; otherwise its columns are read once and cached. Tokens issued
+    before the id was included are looked up by email, as version 0.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -60,15 +68,41 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
-    
-    user = get_user(db, email=email)
-    if user is None:
+    user_id = payload.get("uid")
+    version = payload.get("ver", 0)
+
+    if user_id is not None:
+        principal = principal_cache.get(user_id)
+        if principal is None or principal.token_version != version:
+            principal = load_principal(db, User.id == user_id)
+    elif payload.get("sub") is not None:
+        principal = load_principal(db, User.email == payload["sub"])
+    else:
+        raise credentials_exception
+
+    # A different version means the token was revoked
+    if principal is None or principal.token_version != version:
         raise credentials_exception
+    return principal
+
+
+async def get_current_active_principal(principal: Principal = Depends(get_current_principal)) -> Principal:
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+async def get_current_user(principal: Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
+    """Full user row, for endpoints that need more than the principal"""
+    user = db.get(User, principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
@@ -91,7 +125,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id, "ver": user.token_version or 0},
+        expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,29 +1,37 @@
 import json
-import os
+import logging
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-
-import openai
-from fastapi import APIRouter, Body, Depends, HTTPException, status
-from langchain.chains import ConversationalRetrievalChain
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.llms import OpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores.pgvector import PGVector
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from ....database.session import get_db
+from ....database.session import SessionLocal, get_db
 from ....models.conversation import Conversation, Message
-from ....models.document import Document, DocumentChunk
-from ....models.user import User
-from .auth import get_current_active_user
+from ....models.document import Document
+from ....utils.conversation_memory import load_memory
+from ....utils.embedding_service import EmbeddingQueueFull
+from ....utils.llm import generation_stats
+from ....utils.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    InvalidCursor,
+    paginate,
+)
+from ....utils.principal_cache import Principal
+from ....utils.retrieval import citations_from_sources, get_retrieval_engine
+from .auth import get_current_active_principal
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# LLM Configuration
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Conversation preference options
 LEARNING_STYLES = ["visual", "textual", "example"]
 COMPLEXITY_LEVELS = ["beginner", "intermediate", "advanced"]
 TONE_STYLES = ["casual", "neutral", "formal"]
@@ -64,66 +72,146 @@ def format_user_query(
     return formatted_query
 
 
-def setup_qa_system(document_id: int, db: Session):
-    """Set up the QA system for a specific document"""
-    # Get document chunks from database
-    chunks = (
-        db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).all()
+def conversation_preferences(conversation: Conversation) -> Tuple[str, str, str]:
+    """Learning style, complexity and tone of a conversation, with defaults"""
+    preferences = conversation.preferences or {}
+    return (
+        preferences.get("learning_style", "textual"),
+        preferences.get("complexity", "intermediate"),
+        preferences.get("tone", "neutral"),
     )
 
-    if not chunks:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No chunks found for this document",
-        )
 
-    # Initialize OpenAI embeddings
-    embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+def add_user_message(
+    db: Session, conversation_id: int, user_id: int, content: str
+) -> Tuple[Conversation, Message, Tuple[str, str, str], str]:
+    """Store a question in a document conversation owned by the user
 
-    # Create a vector store with the document chunks
-    connection_string = DATABASE_URL
-    collection_name = f"document_{document_id}"
+    Returns:
+        The conversation, the stored user message, the conversation's answer
+        preferences and the question formatted with them
+    """
+    # Verify conversation exists and belongs to user
+    conversation = (
+        db.query(Conversation)
+        .filter(
+            Conversation.id == conversation_id, Conversation.user_id == user_id
+        )
+        .first()
+    )
 
-    # Check if vector store already exists
-    try:
-        # Try to load existing vector store
-        vector_store = PGVector(
-            collection_name=collection_name,
-            connection_string=connection_string,
-            embedding_function=embeddings,
+    if not conversation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found"
         )
-    except Exception as e:
-        # Create a new vector store if it doesn't exist
-        texts = [chunk.content for chunk in chunks]
-        metadatas = [
-            {
-                "page": chunk.page_number,
-                "chunk_index": chunk.chunk_index,
-                "document_id": document_id,
-            }
-            for chunk in chunks
-        ]
-
-        vector_store = PGVector.from_texts(
-            texts=texts,
-            metadatas=metadatas,
-            embedding=embeddings,
-            collection_name=collection_name,
-            connection_string=connection_string,
+
+    if not conversation.document_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This conversation is not associated with a document",
         )
 
-    # Create conversation memory
-    memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    answer_preferences = conversation_preferences(conversation)
+    formatted_query = format_user_query(content, *answer_preferences)
 
-    # Create QA chain
-    qa_chain = ConversationalRetrievalChain.from_llm(
-        llm=OpenAI(temperature=0, openai_api_key=OPENAI_API_KEY),
-        retriever=vector_store.as_retriever(search_kwargs={"k": 3}),
-        memory=memory,
-        return_source_documents=True,
+    user_message = Message(
+        content=content, role="user", conversation_id=conversation_id, citations=None
     )
+    db.add(user_message)
+    db.commit()
+    db.refresh(user_message)
+    return conversation, user_message, answer_preferences, formatted_query
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-    return qa_chain
+
+def _discard_message(message_id: int) -> None:
+    """Delete a user message whose answer could not be completed"""
+    db = SessionLocal()
+    try:
+        db.query(Message).filter(Message.id == message_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def replay_answer(answer: str) -> AsyncIterator[str]:
+    """A cached answer as a single-token stream"""
+    yield answer
+
+
+async def stream_answer_events(
+    tokens: AsyncIterator[str],
+    sources: List[Dict[str, Any]],
+    conversation_id: int,
+    user_message_id: int,
+    started: float,
+    on_complete: Optional[Callable[[str], Any]] = None,
+    cached: bool = False,
+) -> AsyncIterator[str]:
+    """Stream answer tokens as SSE, then persist the answer and send its citations
+
+    Events are ``token`` (``{"text": ...}``) for each generated piece, then
+    a final ``done`` carrying the stored assistant message, its citations and
+    timings, or ``error``. The user message is removed again if the answer
+    does not complete, including when the client disconnects. ``on_complete``
+    receives the full answer once it has been generated. Replays of
+    ``cached`` answers are left out of the generation stats.
+    """
+    parts = []
+    first_token_at = None
+    completed = False
+    try:
+        async for token in tokens:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(token)
+            yield sse_event("token", {"text": token})
+
+        answer = "".join(parts)
+        if on_complete is not None:
+            on_complete(answer)
+
+        # The request's session may already be closed once the response has started
+        db = SessionLocal()
+        try:
+            ai_message = Message(
+                content=answer.strip(),
+                role="assistant",
+                conversation_id=conversation_id,
+                citations=citations_from_sources(sources),
+            )
+            db.add(ai_message)
+            db.commit()
+            db.refresh(ai_message)
+        finally:
+            db.close()
+        completed = True
+
+        finished = time.perf_counter()
+        first_token_seconds = None if first_token_at is None else first_token_at - started
+        if not cached:
+            generation_stats.record(first_token_seconds, finished - started)
+        yield sse_event("done", {
+            "id": ai_message.id,
+            "content": ai_message.content,
+            "role": ai_message.role,
+            "created_at": ai_message.created_at,
+            "citations": ai_message.citations,
+            "timings": {
+                "first_token_ms": None if first_token_seconds is None else round(first_token_seconds * 1000, 1),
+                "total_ms": round((finished - started) * 1000, 1),
+            },
+        })
+    except Exception as e:
+        logger.exception(f"Streaming answer for conversation {conversation_id} failed")
+        yield sse_event("error", {"detail": f"Error getting AI response: {str(e)}"})
+    finally:
+        if not completed:
+            _discard_message(user_message_id)
 
 
 # Endpoints
@@ -133,7 +221,7 @@ async def create_conversation(
     title: Optional[str] = None,
     preferences: Optional[Dict[str, Any]] = Body(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
     """Create a new conversation"""
     # Verify that the document exists and belongs to the user
@@ -180,52 +268,112 @@ async def create_conversation(
 
 @router.get("/")
 async def get_conversations(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
-    """Get all conversations for the current user"""
-    conversations = (
-        db.query(Conversation)
+    """Get the current user's conversations, newest first
+
+    Each page comes from one query that joins the document and aggregates
+    the messages. When more conversations follow, the X-Next-Cursor header
+    holds the cursor for the next page.
+    """
+    query = (
+        db.query(
+            Conversation.id,
+            Conversation.title,
+            Conversation.created_at,
+            Conversation.preferences,
+            Document.id.label("document_id"),
+            Document.title.label("document_title"),
+            func.count(Message.id).label("message_count"),
+            func.max(Message.created_at).label("last_message_at"),
+        )
+        .outerjoin(Document, Document.id == Conversation.document_id)
+        .outerjoin(Message, Message.conversation_id == Conversation.id)
         .filter(Conversation.user_id == current_user.id)
-        .order_by(Conversation.created_at.desc())
-        .all()
+        # Grouping by both primary keys lets the other columns be selected as is
+        .group_by(Conversation.id, Document.id)
     )
+    try:
+        rows, next_cursor = paginate(query, Conversation.created_at, Conversation.id, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
-    result = []
-    for conv in conversations:
-        document = None
-        if conv.document_id:
-            doc = db.query(Document).filter(Document.id == conv.document_id).first()
-            if doc:
-                document = {"id": doc.id, "title": doc.title}
-
-        # Count messages
-        message_count = (
-            db.query(Message).filter(Message.conversation_id == conv.id).count()
-        )
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "created_at": row.created_at,
+            "document": (
+                {"id": row.document_id, "title": row.document_title}
+                if row.document_id is not None else None
+            ),
+            "message_count": row.message_count,
+            "last_message_at": row.last_message_at,
+            "preferences": row.preferences,
+        }
+        for row in rows
+    ]
 
-        result.append(
-            {
-                "id": conv.id,
-                "title": conv.title,
-                "created_at": conv.created_at,
-                "document": document,
-                "message_count": message_count,
-                "preferences": conv.preferences,
-            }
-        )
 
-    return result
+def message_page(
+    db: Session, conversation_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE
+):
+    """A page of messages, walking back from the newest, in chronological order
+
+    Only the columns the client shows are selected.
+
+    Returns:
+        The messages and the cursor of the next (older) page, or None
+    """
+    query = db.query(
+        Message.id, Message.content, Message.role, Message.created_at, Message.citations
+    ).filter(Message.conversation_id == conversation_id)
+    try:
+        rows, next_cursor = paginate(query, Message.created_at, Message.id, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    messages = [
+        {
+            "id": row.id,
+            "content": row.content,
+            "role": row.role,
+            "created_at": row.created_at,
+            "citations": row.citations,
+        }
+        for row in reversed(rows)
+    ]
+    return messages, next_cursor
 
 
 @router.get("/{conversation_id}")
 async def get_conversation(
     conversation_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Most recent messages to include"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
-    """Get a specific conversation with all messages"""
+    """Get a specific conversation with its most recent messages
+
+    ``older_messages_cursor`` is set when earlier messages exist; pass it to
+    GET /{conversation_id}/messages to load them.
+    """
     conversation = (
-        db.query(Conversation)
+        db.query(
+            Conversation.id,
+            Conversation.title,
+            Conversation.created_at,
+            Conversation.preferences,
+            Document.id.label("document_id"),
+            Document.title.label("document_title"),
+        )
+        .outerjoin(Document, Document.id == Conversation.document_id)
         .filter(
             Conversation.id == conversation_id, Conversation.user_id == current_user.id
         )
@@ -237,91 +385,68 @@ async def get_conversation(
             status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found"
         )
 
-    # Get document info if it exists
-    document = None
-    if conversation.document_id:
-        doc = db.query(Document).filter(Document.id == conversation.document_id).first()
-        if doc:
-            document = {"id": doc.id, "title": doc.title}
-
-    # Get all messages for this conversation
-    messages = (
-        db.query(Message)
-        .filter(Message.conversation_id == conversation_id)
-        .order_by(Message.created_at)
-        .all()
-    )
-
-    message_list = [
-        {
-            "id": msg.id,
-            "content": msg.content,
-            "role": msg.role,
-            "created_at": msg.created_at,
-            "citations": msg.citations,
-        }
-        for msg in messages
-    ]
+    messages, older_messages_cursor = message_page(db, conversation_id, limit=limit)
 
     return {
         "id": conversation.id,
         "title": conversation.title,
         "created_at": conversation.created_at,
-        "document": document,
-        "messages": message_list,
+        "document": (
+            {"id": conversation.document_id, "title": conversation.document_title}
+            if conversation.document_id is not None else None
+        ),
+        "messages": messages,
+        "older_messages_cursor": older_messages_cursor,
         "preferences": conversation.preferences,
     }
 
 
-@router.post("/{conversation_id}/message")
-async def create_message(
+@router.get("/{conversation_id}/messages")
+async def get_messages(
     conversation_id: int,
-    content: str = Body(..., embed=True),
+    response: Response,
+    cursor: Optional[str] = Query(None, description="older_messages_cursor, or the previous page's X-Next-Cursor header"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
-    """Add a message to a conversation and get AI response"""
-    # Verify conversation exists and belongs to user
-    conversation = (
-        db.query(Conversation)
-        .filter(
-            Conversation.id == conversation_id, Conversation.user_id == current_user.id
-        )
+    """Get a range of a conversation's messages, for lazily loading long histories
+
+    Pages walk back from the newest message; each page is in chronological
+    order and X-Next-Cursor points to the one before it.
+    """
+    owned = (
+        db.query(Conversation.id)
+        .filter(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
         .first()
     )
-
-    if not conversation:
+    if not owned:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found"
         )
 
-    # Get document
-    if not conversation.document_id:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="This conversation is not associated with a document",
-        )
+    messages, next_cursor = message_page(db, conversation_id, cursor, limit)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return messages
 
-    # Get preferences
-    preferences = conversation.preferences or {}
-    learning_style = preferences.get("learning_style", "textual")
-    complexity = preferences.get("complexity", "intermediate")
-    tone = preferences.get("tone", "neutral")
-
-    # Format user query with preferences
-    formatted_query = format_user_query(content, learning_style, complexity, tone)
 
-    # Add user message to database
-    user_message = Message(
-        content=content, role="user", conversation_id=conversation_id, citations=None
+@router.post("/{conversation_id}/message")
+async def create_message(
+    conversation_id: int,
+    background_tasks: BackgroundTasks,
+    content: str = Body(..., embed=True),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_principal),
+):
+    """Add a message to a conversation and get AI response"""
+    conversation, user_message, answer_preferences, formatted_query = add_user_message(
+        db, conversation_id, current_user.id, content
     )
-    db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
 
-    # Set up QA system
+    # Get the cached retrieval engine for the document
     try:
-        qa_chain = setup_qa_system(conversation.document_id, db)
+        engine = get_retrieval_engine(db, conversation.document_id)
     except Exception as e:
         db.delete(user_message)
         db.commit()
@@ -330,35 +455,19 @@ async def create_message(
             detail=f"Error setting up QA system: {str(e)}",
         )
 
-    # Get previous messages for context (excluding the one just added)
-    previous_messages = (
-        db.query(Message)
-        .filter(
-            Message.conversation_id == conversation_id, Message.id != user_message.id
-        )
-        .order_by(Message.created_at)
-        .all()
-    )
-
-    # Prepare chat history for QA chain
-    chat_history = []
-    for msg in previous_messages:
-        if msg.role == "user":
-            chat_history.append((msg.content, ""))
+    # Summary plus the latest messages that fit the history budget
+    memory = load_memory(db, conversation, before_id=user_message.id)
 
     # Get AI response
     try:
-        response = qa_chain({"question": formatted_query, "chat_history": chat_history})
+        # Retrieval uses the question itself; the preferences only shape the answer
+        response = await engine.answer(
+            db, content, formatted_query, memory.window,
+            preferences=answer_preferences,
+            summary=memory.summary,
+        )
         answer = response["answer"]
-        source_docs = response.get("source_documents", [])
-
-        # Extract citations
-        citations = []
-        if source_docs:
-            for i, doc in enumerate(source_docs):
-                metadata = doc.metadata if hasattr(doc, "metadata") else {}
-                page = metadata.get("page", "Unknown")
-                citations.append({"page": page, "text": doc.page_content[:100] + "..."})
+        citations = response["citations"]
 
         # Add AI response to database
         ai_message = Message(
@@ -371,6 +480,9 @@ async def create_message(
         db.commit()
         db.refresh(ai_message)
 
+        # Summarize messages that left the history window once the answer is sent
+        background_tasks.add_task(memory.fold)
+
         return {
             "id": ai_message.id,
             "content": ai_message.content,
@@ -379,6 +491,12 @@ async def create_message(
             "citations": ai_message.citations,
         }
 
+    except EmbeddingQueueFull as e:
+        db.delete(user_message)
+        db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"}
+        )
     except Exception as e:
         # If an error occurs, delete the user message to maintain conversation integrity
         db.delete(user_message)
@@ -389,11 +507,66 @@ async def create_message(
         )
 
 
+@router.post("/{conversation_id}/message/stream")
+async def stream_message(
+    conversation_id: int,
+    content: str = Body(..., embed=True),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_principal),
+):
+    """Add a message to a conversation and stream the AI response as Server-Sent Events
+
+    Retrieval happens before the stream opens, so setup errors are returned
+    as regular HTTP errors. See stream_answer_events for the event format.
+    """
+    started = time.perf_counter()
+    conversation, user_message, answer_preferences, formatted_query = add_user_message(
+        db, conversation_id, current_user.id, content
+    )
+
+    memory = load_memory(db, conversation, before_id=user_message.id)
+
+    try:
+        engine = get_retrieval_engine(db, conversation.document_id)
+        pending = await engine.begin(
+            db, content, formatted_query, memory.window, answer_preferences, memory.summary
+        )
+    except EmbeddingQueueFull as e:
+        db.delete(user_message)
+        db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"}
+        )
+    except Exception as e:
+        db.delete(user_message)
+        db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error setting up QA system: {str(e)}",
+        )
+
+    if pending.cached is not None:
+        tokens, on_complete = replay_answer(pending.cached["answer"]), None
+    else:
+        tokens, on_complete = engine.stream(pending.prompt), pending.finish
+
+    return StreamingResponse(
+        stream_answer_events(
+            tokens, pending.sources, conversation_id, user_message.id, started, on_complete,
+            cached=pending.cached is not None,
+        ),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(memory.fold),
+    )
+
+
 @router.post("/{conversation_id}/regenerate")
 async def regenerate_last_message(
     conversation_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
     """Regenerate the assistant's response to the last user message"""
     conversation = (
@@ -422,57 +595,25 @@ async def regenerate_last_message(
             detail="No user message to regenerate",
         )
 
-    preferences = conversation.preferences or {}
-    learning_style = preferences.get("learning_style", "textual")
-    complexity = preferences.get("complexity", "intermediate")
-    tone = preferences.get("tone", "neutral")
-
-    formatted_query = format_user_query(
-        last_user_message.content,
-        learning_style,
-        complexity,
-        tone,
-    )
+    formatted_query = format_user_query(last_user_message.content, *conversation_preferences(conversation))
 
     try:
-        qa_chain = setup_qa_system(conversation.document_id, db)
+        engine = get_retrieval_engine(db, conversation.document_id)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error setting up QA system: {str(e)}",
         )
 
-    previous_messages = (
-        db.query(Message)
-        .filter(
-            Message.conversation_id == conversation_id,
-            Message.created_at < last_user_message.created_at,
-        )
-        .order_by(Message.created_at)
-        .all()
-    )
-
-    chat_history = []
-    for msg in previous_messages:
-        if msg.role == "user":
-            chat_history.append((msg.content, ""))
+    memory = load_memory(db, conversation, before_id=last_user_message.id)
 
     try:
-        response = qa_chain({"question": formatted_query, "chat_history": chat_history})
+        response = await engine.answer(
+            db, last_user_message.content, formatted_query, memory.window,
+            summary=memory.summary,
+        )
         answer = response["answer"]
-        source_docs = response.get("source_documents", [])
-
-        citations = []
-        if source_docs:
-            for doc in source_docs:
-                metadata = doc.metadata if hasattr(doc, "metadata") else {}
-                page = metadata.get("page", "Unknown")
-                citations.append(
-                    {
-                        "page": page,
-                        "text": doc.page_content[:100] + "...",
-                    }
-                )
+        citations = response["citations"]
 
         ai_message = Message(
             content=answer,
@@ -503,7 +644,7 @@ async def update_preferences(
     conversation_id: int,
     preferences: Dict[str, Any] = Body(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
     """Update conversation preferences"""
     conversation = (
@@ -560,7 +701,7 @@ async def update_preferences(
 async def delete_conversation(
     conversation_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user),
+    current_user: Principal = Depends(get_current_active_principal),
 ):
     """Delete a conversation"""
     conversation = (
@@ -1,21 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import hashlib
 import os
-import shutil
 import tempfile
-import pdfplumber
 import magic
-import numpy as np
-from datetime import datetime
 
-from ....utils.embeddings import get_embeddings
+from ....utils.ingestion import (
+    get_ingestion_status,
+    release_chunks,
+    reuse_ingestion,
+    submit_ingestion,
+    STATUS_QUEUED,
+    STATUS_READY,
+)
 
+from ....utils.document_index import document_index
+from ....utils.embedding_service import EmbeddingQueueFull
+from ....utils.embedding_store import remove_store
+from ....utils.embeddings import embed_query_async, search_similar_chunks
+from ....utils.hybrid_search import hybrid_search
+from ....utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, InvalidCursor, paginate
+from ....utils.principal_cache import Principal
+from ....utils.retrieval import invalidate_retrieval_engine
 from ....database.session import get_db
-from ....models.user import User
-from ....models.document import Document, DocumentChunk
-from .auth import get_current_active_user
+from ....models.document import Document
+from .auth import get_current_active_principal
 
 router = APIRouter()
 
@@ -25,11 +36,62 @@ UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
 upload_size_value = os.getenv("MAX_UPLOAD_SIZE", "10").split()[0]
 MAX_UPLOAD_SIZE = int(upload_size_value) * 1024 * 1024  # Default 10MB
 
+# Content-addressed file store, one file per SHA-256
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+UPLOAD_READ_SIZE = 1024 * 1024
+
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 # Helper functions
+async def store_upload(file: UploadFile) -> Tuple[str, str, int]:
+    """Stream an upload to a temporary file, computing its SHA-256 on the way
+    
+    Returns:
+        Temporary file path, hex digest and size in bytes
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    file_size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=BLOB_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                block = await file.read(UPLOAD_READ_SIZE)
+                if not block:
+                    break
+                file_size += len(block)
+                if file_size > MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
+                    )
+                digest.update(block)
+                buffer.write(block)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), file_size
+
+
+def blob_path(content_hash: str) -> str:
+    """Path of the content-addressed copy of a file"""
+    return os.path.join(BLOB_DIR, content_hash[:2], f"{content_hash}.pdf")
+
+
+def document_upload_response(document: Document) -> dict:
+    """Response body for an upload"""
+    return {
+        "id": document.id,
+        "title": document.title,
+        "file_size": document.file_size,
+        "status": document.status,
+        "job_id": document.job_id,
+        "created_at": document.created_at
+    }
+
+
 def validate_pdf(file_path: str) -> bool:
     """Validate if file is a PDF"""
     mime = magic.Magic(mime=True)
@@ -37,49 +99,19 @@ def validate_pdf(file_path: str) -> bool:
     return file_type == "application/pdf"
 
 
-def extract_text_from_pdf(file_path: str) -> List[str]:
-    """Extract text from PDF, return list of pages"""
-    pages = []
-    try:
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                pages.append(text)
-    except Exception as e:
-        print(f"Error extracting text: {e}")
-        pages = []
-    return pages
-
-
-def chunk_text(text_pages: List[str], chunk_size: int = 1000, overlap: int = 200) -> List[dict]:
-    """Chunk text into smaller pieces with page tracking"""
-    chunks = []
-    for page_num, page_text in enumerate(text_pages):
-        if not page_text.strip():
-            continue
-        
-        # Split text into chunks
-        words = page_text.split()
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk_words = words[i:i + chunk_size]
-            if chunk_words:
-                chunks.append({
-                    "content": " ".join(chunk_words),
-                    "page_number": page_num + 1,  # 1-based page numbering
-                    "chunk_index": len(chunks)
-                })
-    return chunks
-
-
 # Endpoints
-@router.post("/", status_code=status.HTTP_201_CREATED)
+@router.post("/", status_code=status.HTTP_202_ACCEPTED)
 async def upload_document(
     file: UploadFile = File(...),
     title: Optional[str] = Form(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_principal)
 ):
-    """Upload a PDF document"""
+    """Upload a PDF document and queue it for background ingestion
+    
+    Files are stored once per content hash. Re-uploading a file whose
+    chunks were already ingested shares them instead of processing it again.
+    """
     # Validate file size
     if file.size and file.size > MAX_UPLOAD_SIZE:
         raise HTTPException(
@@ -87,118 +119,92 @@ async def upload_document(
             detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)}MB"
         )
     
-    # Create user upload directory if it doesn't exist
-    user_upload_dir = os.path.join(UPLOAD_DIR, str(current_user.id))
-    os.makedirs(user_upload_dir, exist_ok=True)
-    
-    # Generate a unique filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_name = f"{timestamp}_{file.filename}"
-    file_path = os.path.join(user_upload_dir, file_name)
+    # Save the file while fingerprinting it
+    tmp_path, content_hash, file_size = await store_upload(file)
     
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # The same user uploading the same bytes again gets their existing document
+    existing = db.query(Document).filter(
+        Document.user_id == current_user.id,
+        Document.content_hash == content_hash
+    ).first()
+    if existing:
+        os.remove(tmp_path)
+        return document_upload_response(existing)
     
     # Validate if the file is a PDF
-    if not validate_pdf(file_path):
-        os.remove(file_path)
+    if not validate_pdf(tmp_path):
+        os.remove(tmp_path)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Uploaded file is not a PDF"
         )
     
-    # Extract file information
-    file_size = os.path.getsize(file_path)
-    document_title = title or file.filename
-    
-    # Extract text and get page count
-    text_pages = extract_text_from_pdf(file_path)
-    page_count = len(text_pages)
+    # Keep a single copy of the bytes in the content-addressed store
+    file_path = blob_path(content_hash)
+    if os.path.exists(file_path):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        os.replace(tmp_path, file_path)
     
-    # Create document record
+    # Create document record; page and chunk counts are filled in by ingestion
     db_document = Document(
-        title=document_title,
+        title=title or file.filename,
         file_path=file_path,
         file_size=file_size,
-        page_count=page_count,
-        user_id=current_user.id
+        content_hash=content_hash,
+        user_id=current_user.id,
+        status=STATUS_QUEUED
     )
     
     db.add(db_document)
     db.commit()
     db.refresh(db_document)
     
-    # Process text into chunks for vector database
-    chunk_size = int(os.getenv("CHUNK_SIZE", "1000").split()[0])
-    chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "200").split()[0])
-    text_chunks = chunk_text(text_pages, chunk_size, chunk_overlap)
+    # Share the chunks and embeddings of an identical document that finished ingesting
+    source = db.query(Document).filter(
+        Document.content_hash == content_hash,
+        Document.status == STATUS_READY,
+        Document.chunks_from_id.is_(None),
+        Document.id != db_document.id
+    ).order_by(Document.id).first()
     
-    # Generate embeddings for chunks (batch process for efficiency)
-    chunk_contents = [chunk_data["content"] for chunk_data in text_chunks]
-    try:
-        # Generate embeddings in batches to avoid memory issues with large documents
-        batch_size = 32  # Adjust based on available memory
-        all_embeddings = []
-        
-        for i in range(0, len(chunk_contents), batch_size):
-            batch = chunk_contents[i:i+batch_size]
-            batch_embeddings = get_embeddings(batch)
-            all_embeddings.extend(batch_embeddings)
-        
-        # Store chunks with embeddings in database
-        for idx, chunk_data in enumerate(text_chunks):
-            try:
-                db_chunk = DocumentChunk(
-                    content=chunk_data["content"],
-                    page_number=chunk_data["page_number"],
-                    chunk_index=chunk_data["chunk_index"],
-                    document_id=db_document.id,
-                    embedding=all_embeddings[idx]  # Add the embedding vector
-                )
-                db.add(db_chunk)
-            except Exception as chunk_error:
-                print(f"Error storing chunk with embedding: {chunk_error}")
-                # Store chunk without embedding as fallback
-                db_chunk = DocumentChunk(
-                    content=chunk_data["content"],
-                    page_number=chunk_data["page_number"],
-                    chunk_index=chunk_data["chunk_index"],
-                    document_id=db_document.id
-                )
-                db.add(db_chunk)
-        
-        db.commit()
-    except Exception as e:
-        # If embedding generation fails, store chunks without embeddings
-        print(f"Error generating embeddings: {e}")
-        for chunk_data in text_chunks:
-            db_chunk = DocumentChunk(
-                content=chunk_data["content"],
-                page_number=chunk_data["page_number"],
-                chunk_index=chunk_data["chunk_index"],
-                document_id=db_document.id
-            )
-            db.add(db_chunk)
-        db.commit()
+    if source:
+        reuse_ingestion(db, db_document, source)
+    else:
+        # Extraction, chunking, embedding and insertion run on the ingestion worker pool
+        submit_ingestion(db, db_document)
     
-    return {
-        "id": db_document.id,
-        "title": db_document.title,
-        "file_size": db_document.file_size,
-        "page_count": db_document.page_count,
-        "chunk_count": len(text_chunks),
-        "created_at": db_document.created_at
-    }
+    return document_upload_response(db_document)
 
 
 @router.get("/")
 async def get_documents(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_principal)
 ):
-    """Get all documents uploaded by the current user"""
-    documents = db.query(Document).filter(Document.user_id == current_user.id).all()
+    """Get the documents uploaded by the current user, newest first
+    
+    Only the listed columns are selected. When more documents follow, the
+    X-Next-Cursor header holds the cursor for the next page.
+    """
+    query = db.query(
+        Document.id,
+        Document.title,
+        Document.file_size,
+        Document.page_count,
+        Document.status,
+        Document.created_at
+    ).filter(Document.user_id == current_user.id)
+    try:
+        documents, next_cursor = paginate(query, Document.created_at, Document.id, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return [
         {
@@ -206,6 +212,7 @@ async def get_documents(
             "title": doc.title,
             "file_size": doc.file_size,
             "page_count": doc.page_count,
+            "status": doc.status,
             "created_at": doc.created_at
         }
         for doc in documents
@@ -216,7 +223,7 @@ async def get_documents(
 async def get_document(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_principal)
 ):
     """Get document by ID"""
     document = db.query(Document).filter(
@@ -235,16 +242,125 @@ async def get_document(
         "title": document.title,
         "file_size": document.file_size,
         "page_count": document.page_count,
+        "chunk_count": document.chunk_count,
+        "status": document.status,
         "created_at": document.created_at,
         "updated_at": document.updated_at
     }
 
 
+@router.get("/{document_id}/status")
+async def get_document_status(
+    document_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_principal)
+):
+    """Get per-stage ingestion progress for a document"""
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    return get_ingestion_status(document)
+
+
+@router.post("/{document_id}/retry", status_code=status.HTTP_202_ACCEPTED)
+async def retry_document_ingestion(
+    document_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_principal)
+):
+    """Retry ingestion of a document
+
+    Retrying is idempotent: documents that are ready or still being processed
+    keep their current job, and only failed or abandoned jobs are restarted.
+    """
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    submit_ingestion(db, document)
+    db.refresh(document)
+    
+    return get_ingestion_status(document)
+
+
+@router.get("/{document_id}/search")
+async def search_document(
+    document_id: int,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(5, ge=1, le=100),
+    mode: str = Query("hybrid", pattern="^(hybrid|vector)$"),
+    vector_weight: Optional[float] = Query(None, ge=0, le=1),
+    ef_search: Optional[int] = Query(None, ge=1, le=1000),
+    probes: Optional[int] = Query(None, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_principal)
+):
+    """Find the chunks of a document most relevant to a query
+
+    ``hybrid`` mode fuses vector similarity with full-text matches, weighted
+    by ``vector_weight``; ``vector`` mode ranks by similarity alone.
+    ``ef_search`` (HNSW) and ``probes`` (IVFFlat) raise recall at the cost
+    of latency; they default to HNSW_EF_SEARCH and IVFFLAT_PROBES.
+    """
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == current_user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    try:
+        query_embedding = await embed_query_async(q)
+    except EmbeddingQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"}
+        )
+    if mode == "hybrid":
+        return hybrid_search(
+            db,
+            q,
+            query_embedding,
+            limit=limit,
+            document_id=document_id,
+            vector_weight=vector_weight,
+            ef_search=ef_search,
+            probes=probes,
+        )
+    return search_similar_chunks(
+        q,
+        db,
+        document_id=document_id,
+        limit=limit,
+        query_embedding=query_embedding,
+        ef_search=ef_search,
+        probes=probes,
+    )
+
+
 @router.get("/{document_id}/download")
 async def download_document(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_principal)
 ):
     """Download document file"""
     document = db.query(Document).filter(
@@ -275,7 +391,7 @@ async def download_document(
 async def delete_document(
     document_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_principal)
 ):
     """Delete document by ID"""
     document = db.query(Document).filter(
@@ -289,15 +405,20 @@ async def delete_document(
             detail="Document not found"
         )
     
-    # Delete associated chunks
-    db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete()
+    # Delete its chunks, or hand them on to the documents sharing them
+    moved = release_chunks(db, document)
     
     # Delete document from database
     db.delete(document)
     db.commit()
+    for moved_id in [document_id, *moved]:
+        document_index.invalidate(moved_id)
+    invalidate_retrieval_engine(document_id)
+    remove_store(document_id)
     
-    # Delete file from storage if it exists
-    if os.path.exists(document.file_path):
+    # Delete file from storage unless another document shares the same stored copy
+    shared = db.query(Document.id).filter(Document.file_path == document.file_path).first()
+    if not shared and os.path.exists(document.file_path):
         os.remove(document.file_path)
     
     return None
@@ -1,7 +1,15 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
-from ....database.session import get_db
+from ....database.session import get_db, pool_stats
+from ....utils.answer_cache import answer_cache
+from ....utils.document_index import document_index
+from ....utils.embedding_cache import embedding_cache
+from ....utils.embeddings import query_embedder
+from ....utils.llm import generation_stats, llm_client_stats
+from ....utils.principal_cache import principal_cache
+from ....utils.retrieval import retrieval_engine_stats
+from ....utils.vector_search import search_stats
 
 router = APIRouter()
 
@@ -21,3 +29,20 @@ async def health_check(db: Session = Depends(get_db)):
         "database": db_status,
         "version": "0.1.0"
     }
+
+
+@router.get("/metrics")
+async def metrics():
+    """Cache metrics for this worker process"""
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "query_embeddings": query_embedder.stats(),
+        "vector_search": search_stats(),
+        "document_index": document_index.stats(),
+        "retrieval_engines": retrieval_engine_stats(),
+        "llm_streaming": generation_stats.stats(),
+        "llm_client": llm_client_stats(),
+        "answer_cache": answer_cache.stats(),
+        "database_pool": pool_stats(),
+        "principal_cache": principal_cache.stats()
+    }
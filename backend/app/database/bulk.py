@@ -0,0 +1,132 @@
+import io
+import logging
+import os
+import struct
+from datetime import datetime
+from typing import Any, Iterable, List, Optional, Sequence
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from ..models.document import DocumentChunk
+from .vector import EMBEDDING_COLUMN, encode_vector_binary
+
+logger = logging.getLogger(__name__)
+
+# "copy" streams rows with COPY ... FORMAT binary, "executemany" uses batched INSERTs
+BULK_INSERT_METHOD = os.getenv("BULK_INSERT_METHOD", "copy").split()[0].lower()
+
+CHUNK_COLUMNS = ["content", "page_number", "chunk_index", "document_id", EMBEDDING_COLUMN, "created_at", "updated_at"]
+# Parameter key of the live embedding column in Core inserts
+EMBEDDING_KEY = DocumentChunk.__table__.c[EMBEDDING_COLUMN].key
+
+# PGCOPY binary format framing
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_TRAILER = struct.pack(">h", -1)
+_NULL_FIELD = struct.pack(">i", -1)
+_PG_EPOCH = datetime(2000, 1, 1)
+
+
+def _clean_text(value: str) -> str:
+    """Postgres text cannot contain NUL bytes, which PDF extraction sometimes yields"""
+    return value.replace("\x00", "")
+
+
+def _binary_field(payload: Optional[bytes]) -> bytes:
+    if payload is None:
+        return _NULL_FIELD
+    return struct.pack(">i", len(payload)) + payload
+
+
+def _binary_timestamp(value: datetime) -> bytes:
+    """Encode a naive timestamp as microseconds since 2000-01-01"""
+    delta = value - _PG_EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return struct.pack(">q", micros)
+
+
+def _encode_copy_rows(document_id: int, chunks: Sequence[dict], embeddings: Sequence[Any], now: datetime) -> bytes:
+    """Encode chunk rows in Postgres' binary COPY format"""
+    buffer = io.BytesIO()
+    buffer.write(_COPY_HEADER)
+    field_count = struct.pack(">h", len(CHUNK_COLUMNS))
+    document_field = _binary_field(struct.pack(">i", document_id))
+    timestamp_field = _binary_field(_binary_timestamp(now))
+    for chunk_data, embedding in zip(chunks, embeddings):
+        page_number = chunk_data.get("page_number")
+        buffer.write(field_count)
+        buffer.write(_binary_field(_clean_text(chunk_data["content"]).encode("utf-8")))
+        buffer.write(_binary_field(None if page_number is None else struct.pack(">i", page_number)))
+        buffer.write(_binary_field(struct.pack(">i", chunk_data["chunk_index"])))
+        buffer.write(document_field)
+        buffer.write(_binary_field(None if embedding is None else encode_vector_binary(embedding)))
+        buffer.write(timestamp_field)
+        buffer.write(timestamp_field)
+    buffer.write(_COPY_TRAILER)
+    return buffer.getvalue()
+
+
+def copy_document_chunks(db: Session, document_id: int, chunks: Sequence[dict], embeddings: Sequence[Any]) -> int:
+    """Stream chunk rows into document_chunk with a binary COPY"""
+    connection = db.connection()
+    # Match the timestamps the ORM's func.now() defaults would have produced
+    now = connection.execute(text("SELECT LOCALTIMESTAMP")).scalar()
+    payload = _encode_copy_rows(document_id, chunks, embeddings, now)
+    table = DocumentChunk.__table__.name
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(CHUNK_COLUMNS)}) FROM STDIN WITH (FORMAT binary)",
+            io.BytesIO(payload)
+        )
+    return len(chunks)
+
+
+def insert_document_chunks(db: Session, document_id: int, chunks: Sequence[dict], embeddings: Sequence[Any]) -> int:
+    """Insert chunk rows with a single executemany INSERT"""
+    db.execute(
+        insert(DocumentChunk.__table__),
+        [
+            {
+                "content": _clean_text(chunk_data["content"]),
+                "page_number": chunk_data.get("page_number"),
+                "chunk_index": chunk_data["chunk_index"],
+                "document_id": document_id,
+                EMBEDDING_KEY: embedding,
+            }
+            for chunk_data, embedding in zip(chunks, embeddings)
+        ]
+    )
+    return len(chunks)
+
+
+def write_document_chunks(db: Session, document_id: int, chunks: Sequence[dict],
+                          embeddings: Optional[Iterable[Any]] = None, method: Optional[str] = None) -> int:
+    """Bulk-write chunk rows and embeddings for a document
+
+    Uses COPY when the driver supports it and falls back to executemany if
+    the COPY fails. The caller owns the transaction.
+
+    Args:
+        db: Database session
+        document_id: Document the chunks belong to
+        chunks: Chunk dicts with content, page_number and chunk_index
+        embeddings: One embedding (or None) per chunk
+        method: "copy" or "executemany"; defaults to BULK_INSERT_METHOD
+
+    Returns:
+        Number of rows written
+    """
+    if not chunks:
+        return 0
+    embeddings: List[Any] = list(embeddings) if embeddings is not None else [None] * len(chunks)
+    method = method or BULK_INSERT_METHOD
+
+    if method == "copy" and db.get_bind().dialect.driver == "psycopg2":
+        try:
+            # Savepoint so a failed COPY does not abort the caller's transaction
+            with db.begin_nested():
+                return copy_document_chunks(db, document_id, chunks, embeddings)
+        except Exception as e:
+            logger.warning(f"COPY into document_chunk failed, falling back to executemany: {e}")
+
+    return insert_document_chunks(db, document_id, chunks, embeddings)
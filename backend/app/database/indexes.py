@@ -0,0 +1,153 @@
+import logging
+import math
+import os
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .session import engine
+from .vector import EMBEDDING_COLUMN
+
+logger = logging.getLogger(__name__)
+
+# Build configuration
+# Index on the original embedding column; vector_index_name() gives the live one
+VECTOR_INDEX_NAME = "document_chunk_embedding_idx"
+# "hnsw" or "ivfflat"
+VECTOR_INDEX_METHOD = os.getenv("VECTOR_INDEX_METHOD", "hnsw").split()[0].lower()
+HNSW_M = int(os.getenv("HNSW_M", "16").split()[0])
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64").split()[0])
+# 0 sizes the lists from the row count at build time
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "0").split()[0])
+# Memory for index builds, e.g. "1GB"; empty keeps the server default
+INDEX_MAINTENANCE_WORK_MEM = os.getenv("INDEX_MAINTENANCE_WORK_MEM", "").strip()
+
+# Query-time defaults; can be overridden per query
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40").split()[0])
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10").split()[0])
+
+# Cosine distance; queries must order by the matching <=> operator to use the index
+VECTOR_OPS = "vector_cosine_ops"
+
+
+def ivfflat_lists(row_count: int) -> int:
+    """pgvector's sizing guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond"""
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def vector_index_name(column: str = EMBEDDING_COLUMN) -> str:
+    """Name of the ANN index on one of the document_chunk embedding columns"""
+    return f"document_chunk_{column}_idx"
+
+
+def vector_index_sql(method: str, name: Optional[str] = None, concurrently: bool = True,
+                     m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION, lists: int = 1,
+                     column: str = EMBEDDING_COLUMN) -> str:
+    """CREATE INDEX statement for a document_chunk embedding column, the live one by default"""
+    name = name or vector_index_name(column)
+    if method == "hnsw":
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    elif method == "ivfflat":
+        options = f"lists = {int(lists)}"
+    else:
+        raise ValueError(f"Unknown vector index method '{method}', expected 'hnsw' or 'ivfflat'")
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}{name} "
+        f"ON document_chunk USING {method} ({column} {VECTOR_OPS}) WITH ({options})"
+    )
+
+
+def describe_vector_index(column: str = EMBEDDING_COLUMN) -> Dict[str, Any]:
+    """Definition, size and table row count for an embedding column's index, the live one by default"""
+    name = vector_index_name(column)
+    with engine.connect() as conn:
+        row = conn.execute(
+            text(
+                f"""
+                SELECT
+                    (SELECT indexdef FROM pg_indexes WHERE indexname = :name) AS definition,
+                    pg_size_pretty(pg_relation_size(to_regclass(:name))) AS size,
+                    (SELECT COUNT(*) FROM document_chunk WHERE {column} IS NOT NULL) AS rows
+                """
+            ),
+            {"name": name}
+        ).one()
+    return {"name": name, "definition": row.definition, "size": row.size, "rows": row.rows}
+
+
+def build_vector_index(method: Optional[str] = None, m: Optional[int] = None,
+                       ef_construction: Optional[int] = None, lists: Optional[int] = None,
+                       column: str = EMBEDDING_COLUMN) -> Dict[str, Any]:
+    """Build or rebuild an embedding column's index without blocking reads or writes
+
+    The new index is created concurrently under a temporary name, then
+    the old one is dropped concurrently and the new one takes its name.
+
+    Args:
+        method: "hnsw" or "ivfflat"; defaults to VECTOR_INDEX_METHOD
+        m: HNSW graph degree
+        ef_construction: HNSW build-time candidate list size
+        lists: IVFFlat list count; sized from the row count when omitted
+        column: Embedding column to index; defaults to the live EMBEDDING_COLUMN
+
+    Returns:
+        Description of the index that was built
+    """
+    method = method or VECTOR_INDEX_METHOD
+    name = vector_index_name(column)
+    new_name = f"{name}_new"
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        row_count = conn.execute(text(f"SELECT COUNT(*) FROM document_chunk WHERE {column} IS NOT NULL")).scalar()
+        if method == "ivfflat":
+            lists = lists or IVFFLAT_LISTS or ivfflat_lists(row_count)
+            if row_count < lists * 10:
+                # IVFFlat clusters on the rows present at build time
+                logger.warning(
+                    f"Building ivfflat with {lists} lists on only {row_count} rows gives poor recall; "
+                    f"rebuild once the table has grown or use hnsw"
+                )
+        if INDEX_MAINTENANCE_WORK_MEM:
+            conn.execute(text("SELECT set_config('maintenance_work_mem', :value, false)"),
+                         {"value": INDEX_MAINTENANCE_WORK_MEM})
+
+        # Left over from an interrupted rebuild
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {new_name}"))
+        conn.execute(text(vector_index_sql(
+            method,
+            name=new_name,
+            m=m or HNSW_M,
+            ef_construction=ef_construction or HNSW_EF_CONSTRUCTION,
+            lists=lists or 1,
+            column=column,
+        )))
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {name}"))
+
+    return describe_vector_index(column)
+
+
+def apply_search_params(db: Session, ef_search: Optional[int] = None, probes: Optional[int] = None,
+                        limit: int = 0, iterative_scan: Optional[str] = None) -> None:
+    """Set ANN recall/latency knobs for the rest of the current transaction
+
+    Args:
+        db: Database session
+        ef_search: HNSW candidate list size; raised to at least ``limit``
+        probes: IVFFlat lists scanned per query
+        limit: Number of results the query asks for
+        iterative_scan: hnsw.iterative_scan mode (pgvector >= 0.8), left unset when None
+    """
+    ef_search = max(ef_search or HNSW_EF_SEARCH, limit)
+    probes = probes or IVFFLAT_PROBES
+    # set_config(..., true) is SET LOCAL, and unlike SET it takes bind parameters
+    db.execute(
+        text("SELECT set_config('hnsw.ef_search', :ef_search, true), set_config('ivfflat.probes', :probes, true)"),
+        {"ef_search": str(ef_search), "probes": str(probes)}
+    )
+    if iterative_scan:
+        db.execute(text("SELECT set_config('hnsw.iterative_scan', :mode, true)"), {"mode": iterative_scan})
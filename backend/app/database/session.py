@@ -1,10 +1,11 @@
 import os
 import logging
+from typing import Any, Dict
 from sqlalchemy import create_engine, event, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.schema import DDL
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -19,19 +20,56 @@ print(f"Using DATABASE_URL: {DATABASE_URL}")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
-# Create SQLAlchemy engine with configuration for local development
+# Connection pool configuration, per engine and worker process
+# Disable when an external pooler (e.g. PgBouncer in transaction mode) already pools connections
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "true").split()[0].lower() == "true"
+# Connections kept open, and extra ones allowed under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10").split()[0])
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20").split()[0])
+# Seconds to wait for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30").split()[0])
+# Seconds after which a connection is replaced, before servers or proxies drop it
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800").split()[0])
+# Test connections on checkout so a restarted database doesn't fail the next request
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").split()[0].lower() == "true"
+DB_CONNECT_TIMEOUT = 10
+APPLICATION_NAME = "learnx-backend"
+
+
+def pool_options() -> Dict[str, Any]:
+    """Pool arguments for create_engine"""
+    if not DB_POOL_ENABLED:
+        return {"poolclass": NullPool}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# Create SQLAlchemy engine; connections are pooled and reused across requests
 engine = create_engine(
     DATABASE_URL,
-    # Use NullPool to disable connection pooling
-    poolclass=NullPool,
     # Connection settings
     connect_args={
         'sslmode': 'disable',  # Disable SSL for local development
-        'connect_timeout': 10,  # 10 second connection timeout
-        'application_name': 'learnx-backend'  # Identify this connection
-    }
+        'connect_timeout': DB_CONNECT_TIMEOUT,
+        'application_name': APPLICATION_NAME  # Identify this connection
+    },
+    **pool_options()
 )
 
+# Physical connections opened, to tell pool reuse from reconnecting
+_connection_stats = {"sync": 0}
+
+
+@event.listens_for(engine, "connect")
+def _count_connection(dbapi_connection, connection_record):
+    _connection_stats["sync"] += 1
+
+
 # Initialize pgvector extension on first connection
 # Note: In Neon, you need to enable the pgvector extension in the dashboard first
 # This is a no-op in Neon since extensions must be enabled through the dashboard
@@ -65,8 +103,8 @@ try:
                 except:
                     pass
 
-        # Initialize pgvector extension when the engine first connects
-        event.listens_for(engine, 'connect')(init_vector_extension)
+        # Initialize pgvector extension once, when the engine first connects
+        event.listens_for(engine, 'first_connect')(init_vector_extension)
 except Exception as e:
     logging.warning(f"Error setting up pgvector extension: {e}")
 
@@ -89,3 +127,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _pool_status(pool) -> Dict[str, Any]:
+    if not isinstance(pool, QueuePool):
+        return {"pooled": False}
+    return {
+        "pooled": True,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection pool usage and physical connections opened by this worker"""
+    return {"sync": {**_pool_status(engine.pool), "connections_opened": _connection_stats["sync"]}}
@@ -1,7 +1,50 @@
 from sqlalchemy.types import UserDefinedType
 import numpy as np
-from typing import Optional, List, Any, cast
+from functools import lru_cache
+from typing import Optional, List, Any, Sequence, Union, cast
 import logging
+import os
+import struct
+
+# Dimension of stored embeddings; must match the configured embedding model
+# (384 for the default all-MiniLM-L6-v2)
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384").split()[0])
+
+# document_chunk has room for two embedding columns: searches and ingestion use
+# EMBEDDING_COLUMN, while scripts/reembed.py fills the other one with a new model.
+# A deploy moves to the new model by switching EMBEDDING_MODEL, EMBEDDING_DIM
+# and EMBEDDING_COLUMN together.
+EMBEDDING_COLUMNS = ("embedding", "embedding_next")
+EMBEDDING_COLUMN = os.getenv("EMBEDDING_COLUMN", "embedding").split()[0]
+if EMBEDDING_COLUMN not in EMBEDDING_COLUMNS:
+    raise ValueError(f"EMBEDDING_COLUMN must be one of {', '.join(EMBEDDING_COLUMNS)}, not '{EMBEDDING_COLUMN}'")
+
+VectorLike = Union[np.ndarray, Sequence[float]]
+
+
+@lru_cache(maxsize=8)
+def _text_format(dim: int) -> str:
+    """printf-style template rendering a whole vector in one formatting call"""
+    # 9 significant digits round-trip float32 exactly
+    return "[" + ",".join(["%.9g"] * dim) + "]"
+
+
+def encode_vector_text(value: VectorLike) -> str:
+    """Encode a vector in pgvector's text format, e.g. '[1,2.5,3]'"""
+    array = np.asarray(value, dtype=np.float32).ravel()
+    return _text_format(array.shape[0]) % tuple(array.tolist())
+
+
+def encode_vector_binary(value: VectorLike) -> bytes:
+    """Encode a vector in pgvector's binary format
+
+    The layout is a big-endian int16 dimension, an unused int16, then the
+    float32 components in network byte order, read straight from the numpy
+    buffer.
+    """
+    array = np.asarray(value, dtype=">f4").ravel()
+    return struct.pack(">hh", array.shape[0], 0) + array.tobytes()
+
 
 class Vector(UserDefinedType):
     """Postgres vector type for SQLAlchemy with Neon compatibility"""
@@ -18,7 +61,7 @@ class Vector(UserDefinedType):
                 return None
             try:
                 # Convert to a string representation that works with pgvector
-                return f"[{','.join(str(float(x)) for x in value)}]"
+                return encode_vector_text(value)
             except (TypeError, ValueError) as e:
                 logging.error(f"Error processing vector value: {e}")
                 return None
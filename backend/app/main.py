@@ -11,6 +11,13 @@ from dotenv import load_dotenv
 
 from .database.session import get_db, engine, Base, SessionLocal
 from .api.v1.router import api_router
+from .utils.embeddings import (
+    EMBEDDING_WARMUP,
+    EmbeddingDimensionMismatch,
+    verify_embedding_dimension,
+    warm_up_model_async,
+)
+from .utils.llm import close_llm
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -104,7 +111,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Content-Disposition"],
+    expose_headers=["Content-Disposition", "X-Next-Cursor"],
 )
 
 # Include API router
@@ -117,6 +124,40 @@ os.makedirs(uploads_dir, exist_ok=True)
 # Mount static files for uploads
 app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
 
+@app.on_event("startup")
+async def verify_embedding_column():
+    """Refuse to start when the live embedding column does not match EMBEDDING_DIM"""
+    db = SessionLocal()
+    try:
+        verify_embedding_dimension(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def warm_up_embeddings():
+    """Load the embedding model before serving so request latency doesn't depend on it"""
+    if not EMBEDDING_WARMUP:
+        return
+    try:
+        start = time.perf_counter()
+        await warm_up_model_async()
+        logger.info(f"Embedding model warmed up in {time.perf_counter() - start:.1f}s")
+    except EmbeddingDimensionMismatch:
+        raise
+    except Exception as e:
+        # Requests will load the model lazily instead
+        logger.warning(f"Embedding model warm-up failed: {e}")
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    """Close pooled connections to the LLM provider"""
+    await close_llm()
+
+@app.on_event("shutdown")
+async def close_database_pools():
+    """Close pooled database connections"""
+    engine.dispose()
+
 @app.get("/")
 async def health():
     """Health check endpoint"""
@@ -2,6 +2,7 @@ from .base import BaseModel
 from .user import User
 from .document import Document, DocumentChunk
 from .conversation import Conversation, Message
+from .embedding_cache import EmbeddingCacheEntry
 
 # Export all models for easy import elsewhere
-__all__ = ['BaseModel', 'User', 'Document', 'DocumentChunk', 'Conversation', 'Message']
+__all__ = ['BaseModel', 'User', 'Document', 'DocumentChunk', 'Conversation', 'Message', 'EmbeddingCacheEntry']
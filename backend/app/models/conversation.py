@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import relationship
 
 from .base import BaseModel
@@ -8,10 +8,15 @@ from ..database.session import Base
 class Conversation(Base, BaseModel):
     """Conversation model for storing Q&A sessions"""
     
+    # A user's conversations are listed newest first through this index
+    __table_args__ = (Index("ix_conversation_user_id_created_at", "user_id", "created_at", "id"),)
+    
     title = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
     document_id = Column(Integer, ForeignKey("document.id"), nullable=True)
     preferences = Column(JSON, nullable=True)  # Store user preferences for this conversation
+    summary = Column(Text, nullable=True)  # Rolling summary of messages older than the history window
+    summary_message_id = Column(Integer, nullable=True)  # Last message folded into the summary
     
     # Relationships
     user = relationship("User", back_populates="conversations")
@@ -22,6 +27,12 @@ class Conversation(Base, BaseModel):
 class Message(Base, BaseModel):
     """Message model for storing individual Q&A exchanges"""
     
+    # Message pages walk (created_at, id); the conversation memory walks id
+    __table_args__ = (
+        Index("ix_message_conversation_id_created_at", "conversation_id", "created_at", "id"),
+        Index("ix_message_conversation_id_id", "conversation_id", "id"),
+    )
+    
     content = Column(Text, nullable=False)
     role = Column(String, nullable=False)  # 'user' or 'assistant'
     conversation_id = Column(Integer, ForeignKey("conversation.id"), nullable=False)
@@ -1,36 +1,74 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, String, Integer, ForeignKey, Text, JSON, Index, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import deferred, relationship
 import numpy as np
 
-from ..database.vector import Vector
+from ..database.vector import EMBEDDING_COLUMN, EMBEDDING_DIM, Vector
 
 from .base import BaseModel
 from ..database.session import Base
 
+# Text search configuration content_tsv is built with; lexical queries must parse with the same one
+FULLTEXT_CONFIG = "english"
+
 
 class Document(Base, BaseModel):
     """Document model for storing uploaded PDFs"""
     
+    __table_args__ = (
+        # A user's documents are listed newest first through this index
+        Index("ix_document_user_id_created_at", "user_id", "created_at", "id"),
+        # Finds the documents sharing a document's chunks when it is deleted
+        Index("ix_document_chunks_from_id", "chunks_from_id", postgresql_where=text("chunks_from_id IS NOT NULL")),
+    )
+    
     title = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
     file_size = Column(Integer, nullable=False)  # Size in bytes
     page_count = Column(Integer, nullable=True)  # Number of pages in PDF
     user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    chunk_count = Column(Integer, nullable=True)  # Number of chunks stored for this document
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the file bytes
+    # Document with the same content whose chunks this one searches; None when it has its own
+    chunks_from_id = Column(Integer, ForeignKey("document.id"), nullable=True)
+
+    # Background ingestion state
+    status = Column(String, nullable=False, default="ready")  # queued, processing, ready or failed
+    job_id = Column(String, nullable=True)  # Id of the most recent ingestion job
+    ingest_progress = Column(JSON, nullable=True)  # Per-stage progress of the ingestion job
     
     # Relationships
     owner = relationship("User", back_populates="documents")
     chunks = relationship("DocumentChunk", back_populates="document")
     conversations = relationship("Conversation", back_populates="document")
 
+    @hybrid_property
+    def chunk_owner_id(self):
+        """Id of the document whose document_chunk rows hold this document's chunks"""
+        return self.chunks_from_id if self.chunks_from_id is not None else self.id
+
+    @chunk_owner_id.expression
+    def chunk_owner_id(cls):
+        return func.coalesce(cls.chunks_from_id, cls.id)
+
 
 class DocumentChunk(Base, BaseModel):
     """Model for storing chunks of text extracted from documents with embeddings"""
     
+    __tablename__ = "document_chunk"
+    # Also serves every lookup of a document's chunks
+    __table_args__ = (
+        Index("uq_document_chunk_document_id_chunk_index", "document_id", "chunk_index", unique=True),
+    )
+    
     content = Column(Text, nullable=False)
     page_number = Column(Integer, nullable=True)
     chunk_index = Column(Integer, nullable=False)
     document_id = Column(Integer, ForeignKey("document.id"), nullable=False)
-    embedding = Column(Vector(768), nullable=True)  # For sentence-transformers 768 dimensions
+    embedding = Column(EMBEDDING_COLUMN, Vector(EMBEDDING_DIM), nullable=True)  # Live column and dimension come from config
+    # Maintained by Postgres on every insert; only lexical search reads it
+    content_tsv = deferred(Column(TSVECTOR, Computed(f"to_tsvector('{FULLTEXT_CONFIG}', content)", persisted=True)))
     
     # Relationships
     document = relationship("Document", back_populates="chunks")
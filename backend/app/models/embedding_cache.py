@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String, UniqueConstraint, func
+
+from .base import BaseModel
+from ..database.session import Base
+
+
+class EmbeddingCacheEntry(Base, BaseModel):
+    """Persistent tier of the embedding cache, keyed by model and text hash"""
+
+    __tablename__ = "embedding_cache"
+    __table_args__ = (UniqueConstraint("model_name", "text_hash", name="uq_embedding_cache_key"),)
+
+    model_name = Column(String, nullable=False)
+    text_hash = Column(String(64), nullable=False)  # SHA-256 of the normalized text
+    embedding = Column(LargeBinary, nullable=False)  # float32 buffer, independent of the vector dimension
+    hit_count = Column(Integer, nullable=False, default=0)
+    last_used_at = Column(DateTime, default=func.now(), nullable=False, index=True)
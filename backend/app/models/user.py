@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Boolean, Column, String
+from sqlalchemy import JSON, Boolean, Column, Integer, String
 from sqlalchemy.orm import relationship
 
 from ..database.session import Base
@@ -14,6 +14,8 @@ class User(Base, BaseModel):
     first_name = Column(String, nullable=True)
     last_name = Column(String, nullable=True)
     preferences = Column(JSON, nullable=True)
+    # Part of every access token; incrementing it revokes the user's outstanding tokens
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     documents = relationship("Document", back_populates="owner")
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session, aliased
+
+from ..models.document import Document
+
+# Configuration
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").split()[0].lower() == "true"
+# Cosine similarity between questions above which a stored answer is reused
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95").split()[0])
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400").split()[0])
+# Answers kept per (document, preferences) pair, and pairs kept per worker
+ANSWER_CACHE_MAX_ANSWERS = int(os.getenv("ANSWER_CACHE_MAX_ANSWERS", "200").split()[0])
+ANSWER_CACHE_MAX_SCOPES = int(os.getenv("ANSWER_CACHE_MAX_SCOPES", "1000").split()[0])
+# Documents listed individually in the metrics, by number of lookups
+STATS_TOP_DOCUMENTS = 20
+
+Version = Tuple[Optional[str], Optional[int]]
+
+
+class _Scope:
+    """Answers to one document under one preference set, with their question embeddings"""
+
+    __slots__ = ("embeddings", "answers", "expires")
+
+    def __init__(self, dim: int):
+        self.embeddings = np.empty((0, dim), dtype=np.float32)
+        self.answers: List[Dict[str, Any]] = []
+        self.expires = np.empty(0, dtype=np.float64)
+
+    def keep(self, rows: np.ndarray) -> None:
+        self.embeddings = self.embeddings[rows]
+        self.answers = [self.answers[row] for row in rows]
+        self.expires = self.expires[rows]
+
+
+def document_version(db: Session, document_id: int) -> Optional[Version]:
+    """Ingestion job and chunk count of a document's chunks, or None if it doesn't exist"""
+    owner = aliased(Document)
+    row = db.query(owner.job_id, owner.chunk_count).join(owner, owner.id == Document.chunk_owner_id).filter(
+        Document.id == document_id
+    ).first()
+    return None if row is None else (row.job_id, row.chunk_count)
+
+
+def _unit(embedding: Any) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+class SemanticAnswerCache:
+    """Reuses answers to near-identical questions about the same document
+
+    Answers are grouped by document, its ingestion version and the
+    conversation's preference set; within a group a question hits when its
+    embedding is within ``threshold`` cosine similarity of a stored one.
+    Keying on the version means a re-ingested document is never answered
+    from its old content, even by workers that missed the invalidation.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, ttl_seconds: float = ANSWER_CACHE_TTL,
+                 max_answers: int = ANSWER_CACHE_MAX_ANSWERS, max_scopes: int = ANSWER_CACHE_MAX_SCOPES):
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_answers = max_answers
+        self.max_scopes = max_scopes
+        self._scopes: "OrderedDict[tuple, _Scope]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"stores": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+        self._documents: Dict[int, Dict[str, int]] = {}
+
+    def _count(self, document_id: int, outcome: str) -> None:
+        counts = self._documents.setdefault(document_id, {"hits": 0, "misses": 0})
+        counts[outcome] += 1
+
+    def _expire(self, scope: _Scope, now: float) -> None:
+        live = np.flatnonzero(scope.expires > now)
+        if live.size < len(scope.answers):
+            self._stats["expirations"] += len(scope.answers) - live.size
+            scope.keep(live)
+
+    def _best(self, scope: _Scope, query: np.ndarray) -> Tuple[int, float]:
+        if not scope.answers or scope.embeddings.shape[1] != query.shape[0]:
+            return -1, -1.0
+        scores = scope.embeddings @ query
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def lookup(self, document_id: int, version: Version, preferences: Hashable,
+               query_embedding: Any) -> Optional[Dict[str, Any]]:
+        """Stored answer to a question similar enough to this one, if any
+
+        Returns:
+            The stored value plus its ``similarity`` to the question
+        """
+        query = _unit(query_embedding)
+        key = (document_id, version, preferences)
+        with self._lock:
+            scope = self._scopes.get(key)
+            if scope is not None:
+                self._scopes.move_to_end(key)
+                self._expire(scope, time.monotonic())
+                row, similarity = self._best(scope, query)
+                if row >= 0 and similarity >= self.threshold:
+                    self._count(document_id, "hits")
+                    return {**scope.answers[row], "similarity": similarity}
+            self._count(document_id, "misses")
+            return None
+
+    def store(self, document_id: int, version: Version, preferences: Hashable,
+              query_embedding: Any, value: Dict[str, Any]) -> None:
+        """Remember an answer, replacing any stored for a near-identical question"""
+        query = _unit(query_embedding)
+        key = (document_id, version, preferences)
+        now = time.monotonic()
+        with self._lock:
+            scope = self._scopes.get(key)
+            if scope is None or scope.embeddings.shape[1] != query.shape[0]:
+                scope = self._scopes[key] = _Scope(query.shape[0])
+            self._scopes.move_to_end(key)
+            self._expire(scope, now)
+
+            row, similarity = self._best(scope, query)
+            if row >= 0 and similarity >= self.threshold:
+                scope.keep(np.array([i for i in range(len(scope.answers)) if i != row], dtype=np.int64))
+            scope.embeddings = np.vstack([scope.embeddings, query[None, :]])
+            scope.answers.append(value)
+            scope.expires = np.append(scope.expires, now + self.ttl)
+            if len(scope.answers) > self.max_answers:
+                # Oldest answers go first
+                scope.keep(np.arange(len(scope.answers) - self.max_answers, len(scope.answers)))
+                self._stats["evictions"] += 1
+            self._stats["stores"] += 1
+
+            while len(self._scopes) > self.max_scopes:
+                _, evicted = self._scopes.popitem(last=False)
+                self._stats["evictions"] += len(evicted.answers)
+
+    def invalidate(self, document_id: int) -> None:
+        """Drop every answer about a document, e.g. after it was re-ingested or deleted"""
+        with self._lock:
+            for key in [key for key in self._scopes if key[0] == document_id]:
+                del self._scopes[key]
+            self._documents.pop(document_id, None)
+            self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scopes.clear()
+            self._documents.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals plus hit rates of the most queried documents"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["scopes"] = len(self._scopes)
+            stats["answers"] = sum(len(scope.answers) for scope in self._scopes.values())
+            documents = {document_id: dict(counts) for document_id, counts in self._documents.items()}
+
+        def hit_rate(counts):
+            lookups = counts["hits"] + counts["misses"]
+            return counts["hits"] / lookups if lookups else 0.0
+
+        stats["hits"] = sum(counts["hits"] for counts in documents.values())
+        stats["misses"] = sum(counts["misses"] for counts in documents.values())
+        stats["hit_rate"] = hit_rate(stats)
+        busiest = sorted(documents.items(), key=lambda item: item[1]["hits"] + item[1]["misses"], reverse=True)
+        stats["documents"] = {
+            str(document_id): {**counts, "hit_rate": round(hit_rate(counts), 4)}
+            for document_id, counts in busiest[:STATS_TOP_DOCUMENTS]
+        }
+        return stats
+
+
+answer_cache = SemanticAnswerCache()
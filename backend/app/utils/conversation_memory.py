@@ -0,0 +1,160 @@
+import logging
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..database.session import SessionLocal
+from ..models.conversation import Conversation, Message
+from .llm import get_llm
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Recent messages are sent verbatim up to this many tokens; older ones live on in the summary
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1000").split()[0])
+# Most recent unsummarized messages read per turn
+MEMORY_MAX_MESSAGES = int(os.getenv("MEMORY_MAX_MESSAGES", "20").split()[0])
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "300").split()[0])
+# "llm" asks the model to rewrite the summary, "extractive" keeps the latest lines that fit
+MEMORY_SUMMARY_MODE = os.getenv("MEMORY_SUMMARY_MODE", "llm").split()[0].lower()
+# Rough size of a token in English text; close enough for budgeting without a tokenizer
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """Progressively summarize a tutoring conversation about a document. \
+Extend the current summary with the new lines, keeping the student's questions, the key points \
+of the answers and anything the student found difficult. Use at most {words} words.
+
+Current summary:
+{summary}
+
+New lines:
+{lines}
+
+New summary:"""
+
+History = List[Tuple[str, str]]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_tokens(text: str, budget: int, keep_end: bool = False) -> str:
+    """Cut text to about ``budget`` tokens, keeping its start or its end"""
+    limit = budget * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    return "..." + text[-limit:] if keep_end else text[:limit] + "..."
+
+
+def format_lines(messages: Sequence[Tuple[str, str]]) -> str:
+    return "\n".join(f"{'Student' if role == 'user' else 'Assistant'}: {content}" for role, content in messages)
+
+
+class ConversationMemory:
+    """What a turn knows about its conversation: a summary plus the latest messages
+
+    ``window`` holds the newest messages that fit MEMORY_TOKEN_BUDGET, oldest
+    first. ``overflow`` holds messages read this turn that fell out of the
+    window but are not summarized yet; fold() merges them into the summary.
+    """
+
+    def __init__(self, conversation_id: int, summary: Optional[str], summarized_through: Optional[int],
+                 window: History, overflow: List[Tuple[int, str, str]]):
+        self.conversation_id = conversation_id
+        self.summary = summary
+        self.summarized_through = summarized_through
+        self.window = window
+        self.overflow = overflow
+
+    async def fold(self) -> bool:
+        """Fold overflow messages into the stored summary
+
+        Runs after the answer was sent, in its own session. The update only
+        applies if no other turn has moved the summary on in the meantime.
+
+        Returns:
+            Whether the summary was updated
+        """
+        if not self.overflow:
+            return False
+        summary = await summarize(self.summary, [(role, content) for _, role, content in self.overflow])
+        db = SessionLocal()
+        try:
+            unchanged = (
+                Conversation.summary_message_id.is_(None) if self.summarized_through is None
+                else Conversation.summary_message_id == self.summarized_through
+            )
+            updated = db.query(Conversation).filter(Conversation.id == self.conversation_id, unchanged).update(
+                {"summary": summary, "summary_message_id": self.overflow[-1][0]}, synchronize_session=False
+            )
+            db.commit()
+            return bool(updated)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not update summary of conversation {self.conversation_id}: {e}")
+            return False
+        finally:
+            db.close()
+
+
+def load_memory(db: Session, conversation: Conversation, before_id: Optional[int] = None,
+                token_budget: int = MEMORY_TOKEN_BUDGET, max_messages: int = MEMORY_MAX_MESSAGES) -> ConversationMemory:
+    """Read a bounded slice of a conversation for the next answer
+
+    At most ``max_messages`` unsummarized messages are read, newest first,
+    however long the conversation is. The newest message is always kept,
+    truncated if it alone exceeds the budget. When the read is full, the
+    window keeps at most half of it so the rest is folded into the summary
+    even if every message is short; otherwise the next turn would push the
+    oldest ones out of the read unsummarized. Unsummarized messages beyond
+    ``max_messages``, as in conversations that predate the summary, are
+    skipped rather than summarized.
+
+    Args:
+        db: Database session
+        conversation: The conversation being answered
+        before_id: Only consider messages older than this one, e.g. the
+            question being answered
+    """
+    query = db.query(Message.id, Message.role, Message.content).filter(Message.conversation_id == conversation.id)
+    if conversation.summary_message_id is not None:
+        query = query.filter(Message.id > conversation.summary_message_id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    rows = query.order_by(Message.id.desc()).limit(max_messages).all()
+
+    window_cap = max(max_messages // 2, 1) if len(rows) == max_messages else len(rows)
+    window, used = [], 0
+    for row in rows:
+        tokens = min(estimate_tokens(row.content), token_budget)
+        if window and (used + tokens > token_budget or len(window) == window_cap):
+            break
+        window.append((row.role, truncate_tokens(row.content, token_budget)))
+        used += tokens
+    overflow = [(row.id, row.role, row.content) for row in reversed(rows[len(window):])]
+
+    return ConversationMemory(
+        conversation.id, conversation.summary, conversation.summary_message_id, window[::-1], overflow
+    )
+
+
+async def summarize(previous: Optional[str], messages: Sequence[Tuple[str, str]],
+                    budget: int = SUMMARY_TOKEN_BUDGET) -> str:
+    """Extend a summary with new messages, staying within ``budget`` tokens"""
+    lines = format_lines(messages)
+    if MEMORY_SUMMARY_MODE == "llm":
+        try:
+            prompt = SUMMARY_PROMPT.format(
+                words=budget * 3 // 4,
+                summary=previous or "(none)",
+                # Bound the prompt too; each message is cut to the summary budget
+                lines=format_lines([(role, truncate_tokens(content, budget)) for role, content in messages]),
+            )
+            summary = (await get_llm().ainvoke(prompt)).strip()
+            if summary:
+                return truncate_tokens(summary, budget)
+        except Exception as e:
+            logger.warning(f"Summarizing conversation failed, keeping the latest lines instead: {e}")
+    return truncate_tokens("\n".join(part for part in (previous, lines) if part), budget, keep_end=True)
@@ -0,0 +1,281 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session, aliased
+
+from ..models.document import Document, DocumentChunk
+from .embedding_store import EMBEDDING_STORE_ENABLED, open_store, write_store
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Memory for cached embedding matrices and chunk text, per worker process
+VECTOR_INDEX_CACHE_MB = int(os.getenv("VECTOR_INDEX_CACHE_MB", "128").split()[0])
+# Documents with more chunks than this are left to Postgres
+VECTOR_INDEX_MAX_CHUNKS = int(os.getenv("VECTOR_INDEX_MAX_CHUNKS", "20000").split()[0])
+# How long a cached document is trusted before its ingestion version is re-checked;
+# catches re-ingests done by other worker processes
+VECTOR_INDEX_VERIFY_SECONDS = float(os.getenv("VECTOR_INDEX_VERIFY_SECONDS", "30").split()[0])
+
+Version = Tuple[Optional[str], Optional[int]]
+
+
+class _Entry:
+    """One document's unit-normalized embeddings and the chunk fields searches return"""
+
+    __slots__ = ("version", "title", "ids", "positions", "matrix", "contents", "pages", "nbytes", "verified_at")
+
+    def __init__(self, version: Version, title: str, ids: np.ndarray, matrix: np.ndarray,
+                 contents: List[str], pages: List[Optional[int]]):
+        self.version = version
+        self.title = title
+        self.ids = ids
+        self.positions = {int(chunk_id): row for row, chunk_id in enumerate(ids.tolist())}
+        self.matrix = matrix
+        self.contents = contents
+        self.pages = pages
+        # Memory-mapped matrices live in the shared page cache, not this process
+        matrix_bytes = 0 if isinstance(matrix, np.memmap) else matrix.nbytes
+        self.nbytes = ids.nbytes + matrix_bytes + sum(len(content) for content in contents)
+        self.verified_at = time.monotonic()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so a dot product is cosine similarity"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def cosine_scores(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of a unit-normalized matrix to the query"""
+    query = np.asarray(query, dtype=np.float32).ravel()
+    return matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+
+
+def top_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first
+
+    argpartition finds the top k in linear time; only those k are then sorted.
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row indices and cosine similarities of the k rows closest to the query
+
+    ``matrix`` rows must be unit-normalized.
+    """
+    if matrix.shape[0] == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    scores = cosine_scores(matrix, query)
+    rows = top_rows(scores, k)
+    return rows, scores[rows]
+
+
+def entry_chunk(entry: _Entry, document_id: int, row: int, similarity: Optional[float]) -> Dict[str, Any]:
+    """A cached chunk in the shape search_similar_chunks returns"""
+    return {
+        "id": int(entry.ids[row]),
+        "content": entry.contents[row],
+        "page_number": entry.pages[row],
+        "document_title": entry.title,
+        "document_id": document_id,
+        "similarity": None if similarity is None else float(similarity)
+    }
+
+
+class DocumentVectorIndex:
+    """Exact in-process search over one document's chunk embeddings
+
+    Each document's embeddings are loaded once into a contiguous float32
+    matrix, memory-mapped from its embedding store when one exists, and kept
+    in an LRU bounded by bytes. Entries are versioned by the
+    document's ingestion job and chunk count: invalidate() drops them
+    immediately in this process, and other processes notice the new version
+    within VECTOR_INDEX_VERIFY_SECONDS.
+    """
+
+    def __init__(self, max_bytes: int = VECTOR_INDEX_CACHE_MB * 1024 * 1024,
+                 max_chunks: int = VECTOR_INDEX_MAX_CHUNKS, verify_seconds: float = VECTOR_INDEX_VERIFY_SECONDS):
+        self.max_bytes = max_bytes
+        self.max_chunks = max_chunks
+        self.verify_seconds = verify_seconds
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load_locks: Dict[int, threading.Lock] = {}
+        self._stats = {"hits": 0, "loads": 0, "evictions": 0, "invalidations": 0, "skipped": 0}
+
+    # LRU
+    def _get(self, document_id: int) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is not None:
+                self._entries.move_to_end(document_id)
+            return entry
+
+    def _put(self, document_id: int, entry: _Entry) -> None:
+        with self._lock:
+            previous = self._entries.pop(document_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[document_id] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+                self._stats["evictions"] += 1
+
+    def invalidate(self, document_id: int) -> None:
+        """Drop a document whose chunks were deleted or re-ingested"""
+        with self._lock:
+            entry = self._entries.pop(document_id, None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+                self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # Loading
+    def _load_lock(self, document_id: int) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(document_id, threading.Lock())
+
+    def _load(self, db: Session, document_id: int, version: Version, title: str) -> _Entry:
+        """Load a document from its memory-mapped store, or from document_chunk"""
+        if EMBEDDING_STORE_ENABLED:
+            entry = self._load_from_store(db, document_id, version, title)
+            if entry is not None:
+                return entry
+        return self._load_from_db(db, document_id, version, title)
+
+    def _load_from_store(self, db: Session, document_id: int, version: Version, title: str) -> Optional[_Entry]:
+        """Map the stored matrix; only chunk text is read from the database"""
+        try:
+            stored = open_store(document_id, version[0])
+        except Exception as e:
+            logger.warning(f"Could not open embedding store for document {document_id}: {e}")
+            return None
+        if stored is None:
+            return None
+        ids, matrix = stored
+
+        rows = db.query(DocumentChunk.id, DocumentChunk.content, DocumentChunk.page_number).filter(
+            DocumentChunk.document_id == document_id,
+            DocumentChunk.embedding.isnot(None)
+        ).all()
+        chunks = {row.id: row for row in rows}
+        if len(chunks) != ids.size or not all(int(chunk_id) in chunks for chunk_id in ids):
+            logger.warning(f"Embedding store for document {document_id} does not match its chunks; reloading")
+            return None
+        ordered = [chunks[int(chunk_id)] for chunk_id in ids]
+        return _Entry(version, title, ids, matrix, [row.content for row in ordered], [row.page_number for row in ordered])
+
+    def _load_from_db(self, db: Session, document_id: int, version: Version, title: str) -> _Entry:
+        """Read a document's embeddings from document_chunk, writing its store for next time"""
+        rows = db.query(
+            DocumentChunk.id,
+            DocumentChunk.content,
+            DocumentChunk.page_number,
+            DocumentChunk.embedding
+        ).filter(
+            DocumentChunk.document_id == document_id,
+            DocumentChunk.embedding.isnot(None)
+        ).order_by(DocumentChunk.id).all()
+        ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+        if rows:
+            matrix = normalize_rows(np.vstack([row.embedding for row in rows]).astype(np.float32))
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+
+        # Chunks can still be missing an embedding in the live column, e.g. ones
+        # ingested on the previous model during a rollout until scripts/reembed.py
+        # catches up. Such entries are not stored and are reloaded at the next check.
+        complete = version[1] is None or len(rows) >= version[1]
+        if EMBEDDING_STORE_ENABLED and rows and complete:
+            try:
+                write_store(document_id, version[0], ids, matrix)
+            except Exception as e:
+                logger.warning(f"Could not write embedding store for document {document_id}: {e}")
+        if not complete:
+            version = (version[0], len(rows))
+        return _Entry(version, title, ids, matrix, [row.content for row in rows], [row.page_number for row in rows])
+
+    def get_entry(self, db: Session, document_id: int) -> Optional[_Entry]:
+        """Cached entry for a ready document, loading or refreshing it as needed
+
+        Returns None when the document is missing, still ingesting or too
+        large to hold in memory.
+        """
+        entry = self._get(document_id)
+        if entry is not None and time.monotonic() - entry.verified_at < self.verify_seconds:
+            with self._lock:
+                self._stats["hits"] += 1
+            return entry
+
+        # Documents sharing another's chunks load them, and are versioned, through it
+        owner = aliased(Document)
+        document = db.query(
+            Document.title, owner.id.label("owner_id"), owner.status, owner.job_id, owner.chunk_count
+        ).join(owner, owner.id == Document.chunk_owner_id).filter(Document.id == document_id).first()
+        if document is None or document.status != "ready":
+            self.invalidate(document_id)
+            return None
+        if document.chunk_count is not None and document.chunk_count > self.max_chunks:
+            with self._lock:
+                self._stats["skipped"] += 1
+            return None
+
+        version = (document.job_id, document.chunk_count)
+        if entry is not None and entry.version == version:
+            entry.verified_at = time.monotonic()
+            with self._lock:
+                self._stats["hits"] += 1
+            return entry
+
+        # One loader per document; concurrent searches wait and reuse its result
+        with self._load_lock(document_id):
+            entry = self._get(document_id)
+            if entry is None or entry.version != version:
+                entry = self._load(db, document.owner_id, version, document.title)
+                with self._lock:
+                    self._stats["loads"] += 1
+                if entry.nbytes <= self.max_bytes:
+                    self._put(document_id, entry)
+        return entry
+
+    # Search
+    def search(self, db: Session, document_id: int, query_embedding: Any, limit: int = 5) -> Optional[List[Dict[str, Any]]]:
+        """Top-``limit`` chunks of a document by cosine similarity
+
+        Returns:
+            Chunks in the same shape as search_similar_chunks, or None when
+            the document cannot be served from memory
+        """
+        entry = self.get_entry(db, document_id)
+        if entry is None:
+            return None
+        rows, similarities = top_k(entry.matrix, query_embedding, limit)
+        return [entry_chunk(entry, document_id, row, similarity) for row, similarity in zip(rows, similarities)]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["documents"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        return stats
+
+
+document_index = DocumentVectorIndex()
@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+from typing import Any, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# "torch" runs SentenceTransformer in PyTorch, "onnx" runs an exported model with ONNX Runtime
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").split()[0].lower()
+# Directory holding the exported model; exported on first load if missing.
+# Defaults to models/onnx/<model name> under the working directory
+EMBEDDING_ONNX_PATH = os.getenv("EMBEDDING_ONNX_PATH", "").strip()
+# Use a dynamically int8-quantized copy of the ONNX model
+EMBEDDING_ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "false").split()[0].lower() == "true"
+# Intra-op threads for ONNX Runtime; 0 lets the runtime decide
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0").split()[0])
+
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_QUANTIZED_MODEL_FILE = "model.int8.onnx"
+
+
+class SentenceTransformerBackend:
+    """Full-precision PyTorch inference through sentence-transformers"""
+
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs: Any) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, **kwargs)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = False) -> str:
+    """Export a sentence-transformers model to ONNX
+
+    The tokenizer and pooling/normalization config are saved alongside
+    ``model.onnx`` so OnnxBackend can reproduce the full pipeline.
+
+    Returns:
+        Path of the exported (or quantized) ONNX file
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name, device="cpu")
+    model.save(output_dir)
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    onnx_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+        )
+
+    if quantize:
+        return quantize_onnx_model(output_dir)
+    return onnx_path
+
+
+def quantize_onnx_model(model_dir: str) -> str:
+    """Write an int8 dynamically quantized copy of the exported model"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = os.path.join(model_dir, ONNX_QUANTIZED_MODEL_FILE)
+    quantize_dynamic(
+        os.path.join(model_dir, ONNX_MODEL_FILE),
+        quantized_path,
+        weight_type=QuantType.QInt8,
+    )
+    return quantized_path
+
+
+class OnnxBackend:
+    """CPU inference of an exported sentence-transformers model with ONNX Runtime
+
+    Reproduces the sentence-transformers pipeline: tokenize, run the
+    transformer, pool token embeddings and optionally L2-normalize.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, model_dir: str = EMBEDDING_ONNX_PATH,
+                 quantize: bool = EMBEDDING_ONNX_QUANTIZE, threads: int = EMBEDDING_ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_dir = model_dir or os.path.join(os.getcwd(), "models", "onnx", model_name.replace("/", "__"))
+        onnx_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(onnx_path):
+            logger.info(f"Exporting {model_name} to ONNX in {model_dir}")
+            export_onnx_model(model_name, model_dir)
+        if quantize:
+            onnx_path = os.path.join(model_dir, ONNX_QUANTIZED_MODEL_FILE)
+            if not os.path.exists(onnx_path):
+                quantize_onnx_model(model_dir)
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        self.max_seq_length = self._read_config(model_dir, "sentence_bert_config.json").get("max_seq_length", 512)
+        self.pooling = self._read_pooling(model_dir)
+        modules = self._read_config(model_dir, "modules.json") or []
+        self.normalize = any(module.get("type", "").endswith("Normalize") for module in modules)
+        self.dimension = self._read_config(
+            model_dir, os.path.join("1_Pooling", "config.json")
+        ).get("word_embedding_dimension")
+
+    @staticmethod
+    def _read_config(model_dir: str, file_name: str) -> Any:
+        path = os.path.join(model_dir, file_name)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _read_pooling(self, model_dir: str) -> str:
+        config = self._read_config(model_dir, os.path.join("1_Pooling", "config.json"))
+        if config.get("pooling_mode_cls_token"):
+            return "cls"
+        if config.get("pooling_mode_max_tokens"):
+            return "max"
+        return "mean"
+
+    def _pool(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        mask = attention_mask[..., None].astype(np.float32)
+        if self.pooling == "cls":
+            return token_embeddings[:, 0]
+        if self.pooling == "max":
+            return np.where(mask > 0, token_embeddings, -1e9).max(axis=1)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs: Any) -> np.ndarray:
+        single = isinstance(texts, str)
+        batch_texts = [texts] if single else list(texts)
+        if not batch_texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        outputs = []
+        for start in range(0, len(batch_texts), batch_size):
+            encoded = self.tokenizer(
+                batch_texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feed = {name: encoded[name].astype(np.int64) for name in self.input_names if name in encoded}
+            token_embeddings = self.session.run(None, feed)[0]
+            outputs.append(self._pool(token_embeddings, encoded["attention_mask"]))
+
+        embeddings = np.concatenate(outputs).astype(np.float32)
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings[0] if single else embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self.dimension is None:
+            self.dimension = int(self.encode(["dimension probe"]).shape[1])
+        return self.dimension
+
+
+def backend_cache_key(model_name: str, backend: Optional[str] = None) -> str:
+    """Name embeddings are cached under; quantized outputs differ from full precision"""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "onnx" and EMBEDDING_ONNX_QUANTIZE:
+        return f"{model_name}:onnx-int8"
+    return model_name
+
+
+def load_backend(model_name: str, backend: Optional[str] = None):
+    """Load the configured embedding backend for a model"""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "onnx":
+        return OnnxBackend(model_name)
+    if backend != "torch":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}', expected 'torch' or 'onnx'")
+    return SentenceTransformerBackend(model_name)
@@ -0,0 +1,205 @@
+import hashlib
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert
+
+from ..database.session import SessionLocal
+from ..models.embedding_cache import EmbeddingCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").split()[0].lower() == "true"
+# Entries held in the in-process LRU tier
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "20000").split()[0])
+# Whether to back the LRU with the embedding_cache table
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "true").split()[0].lower() == "true"
+# Row bound for the embedding_cache table; least recently used rows are evicted beyond it
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "1000000").split()[0])
+# Check the row bound after this many inserted rows rather than on every write
+EMBEDDING_CACHE_EVICT_EVERY = int(os.getenv("EMBEDDING_CACHE_EVICT_EVERY", "1000").split()[0])
+
+CacheKey = Tuple[str, str]
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different copies share a cache entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of the normalized text"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by (model name, normalized text hash)
+
+    The first tier is an in-process LRU bounded by entry count. The second is
+    the ``embedding_cache`` table, shared across workers and restarts and
+    bounded by row count with least-recently-used eviction.
+    """
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE, persist: bool = EMBEDDING_CACHE_PERSIST,
+                 max_rows: int = EMBEDDING_CACHE_MAX_ROWS):
+        self.max_entries = max_entries
+        self.persist = persist
+        self.max_rows = max_rows
+        self._lru: "OrderedDict[CacheKey, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserted_since_evict = 0
+        self._stats = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "evictions": 0, "persistent_evictions": 0}
+
+    # In-process tier
+    def _lru_get(self, key: CacheKey) -> Optional[np.ndarray]:
+        with self._lock:
+            embedding = self._lru.get(key)
+            if embedding is not None:
+                self._lru.move_to_end(key)
+            return embedding
+
+    def _lru_put(self, key: CacheKey, embedding: np.ndarray) -> None:
+        with self._lock:
+            self._lru[key] = embedding
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    # Persistent tier
+    def _db_get(self, model_name: str, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        db = SessionLocal()
+        try:
+            rows = db.query(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).filter(
+                EmbeddingCacheEntry.model_name == model_name,
+                EmbeddingCacheEntry.text_hash.in_(list(hashes))
+            ).all()
+            found = {row.text_hash: np.frombuffer(row.embedding, dtype=np.float32) for row in rows}
+            if found:
+                db.execute(
+                    update(EmbeddingCacheEntry)
+                    .where(
+                        EmbeddingCacheEntry.model_name == model_name,
+                        EmbeddingCacheEntry.text_hash.in_(list(found))
+                    )
+                    .values(last_used_at=func.now(), hit_count=EmbeddingCacheEntry.hit_count + 1)
+                )
+                db.commit()
+            return found
+        finally:
+            db.close()
+
+    def _db_put(self, model_name: str, entries: Dict[str, np.ndarray]) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(
+                insert(EmbeddingCacheEntry.__table__)
+                .values([
+                    {
+                        "model_name": model_name,
+                        "text_hash": digest,
+                        "embedding": np.asarray(embedding, dtype=np.float32).tobytes(),
+                        "hit_count": 0,
+                    }
+                    for digest, embedding in entries.items()
+                ])
+                .on_conflict_do_nothing(constraint="uq_embedding_cache_key")
+            )
+            db.commit()
+
+            with self._lock:
+                self._inserted_since_evict += len(entries)
+                should_evict = self._inserted_since_evict >= EMBEDDING_CACHE_EVICT_EVERY
+                if should_evict:
+                    self._inserted_since_evict = 0
+            if should_evict:
+                self._db_evict(db)
+        finally:
+            db.close()
+
+    def _db_evict(self, db) -> None:
+        """Delete least recently used rows beyond the row bound"""
+        row_count = db.query(func.count(EmbeddingCacheEntry.id)).scalar()
+        excess = row_count - self.max_rows
+        if excess <= 0:
+            return
+        oldest = (
+            db.query(EmbeddingCacheEntry.id)
+            .order_by(EmbeddingCacheEntry.last_used_at)
+            .limit(excess)
+            .subquery()
+        )
+        deleted = db.query(EmbeddingCacheEntry).filter(
+            EmbeddingCacheEntry.id.in_(oldest.select())
+        ).delete(synchronize_session=False)
+        db.commit()
+        with self._lock:
+            self._stats["persistent_evictions"] += deleted
+
+    # Public API
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Look up embeddings for texts; missing entries are returned as None"""
+        hashes = [text_hash(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [self._lru_get((model_name, digest)) for digest in hashes]
+        memory_hits = sum(1 for result in results if result is not None)
+
+        missing = {digest for digest, result in zip(hashes, results) if result is None}
+        persistent_hits = 0
+        if missing and self.persist:
+            try:
+                found = self._db_get(model_name, missing)
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed: {e}")
+                found = {}
+            for i, digest in enumerate(hashes):
+                if results[i] is None and digest in found:
+                    results[i] = found[digest]
+                    persistent_hits += 1
+            for digest, embedding in found.items():
+                self._lru_put((model_name, digest), embedding)
+
+        with self._lock:
+            self._stats["memory_hits"] += memory_hits
+            self._stats["persistent_hits"] += persistent_hits
+            self._stats["misses"] += len(texts) - memory_hits - persistent_hits
+        return results
+
+    def put_many(self, model_name: str, texts: Sequence[str], embeddings: Sequence[Any]) -> None:
+        """Store freshly computed embeddings in both tiers"""
+        entries = {}
+        for text, embedding in zip(texts, embeddings):
+            digest = text_hash(text)
+            embedding = np.asarray(embedding, dtype=np.float32)
+            self._lru_put((model_name, digest), embedding)
+            entries[digest] = embedding
+        if entries and self.persist:
+            try:
+                self._db_put(model_name, entries)
+            except Exception as e:
+                logger.warning(f"Embedding cache write failed: {e}")
+
+    def clear(self) -> None:
+        """Empty the in-process tier"""
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics for both tiers"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._lru)
+        lookups = stats["memory_hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["lookups"] = lookups
+        stats["hit_rate"] = (stats["memory_hits"] + stats["persistent_hits"]) / lookups if lookups else 0.0
+        stats["memory_hit_rate"] = stats["memory_hits"] / lookups if lookups else 0.0
+        return stats
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,235 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# How long the batcher waits for more queries after the first one arrives
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5").split()[0])
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "64").split()[0])
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096").split()[0])
+# Embedding requests allowed to wait for the model before queries are turned away
+EMBEDDING_MAX_PENDING = int(os.getenv("EMBEDDING_MAX_PENDING", "64").split()[0])
+# Number of recent requests kept for latency percentiles
+LATENCY_WINDOW = 10000
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class EmbeddingQueueFull(Exception):
+    """Raised when too many embedding requests are already waiting for the model"""
+
+
+class QueryEmbeddingService:
+    """Micro-batching embedder for single query strings, and the one queue in front of the model
+
+    Concurrent callers enqueue their text and block on a future. A background
+    thread takes the first queued text, waits up to ``window_ms`` for more to
+    arrive, and embeds the whole group with one ``encode`` call. Repeated
+    queries are answered from an LRU without touching the model.
+
+    Ingestion batches go through the same queue with submit_many() and are
+    encoded on their own. The queue holds at most ``max_pending`` requests:
+    beyond that submit() raises EmbeddingQueueFull, while submit_many()
+    waits for room, so ingestion slows down instead of failing.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], Any], window_ms: float = QUERY_BATCH_WINDOW_MS,
+                 max_batch_size: int = QUERY_BATCH_MAX_SIZE, cache_size: int = QUERY_CACHE_SIZE,
+                 max_pending: int = EMBEDDING_MAX_PENDING):
+        self.encode = encode
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache_size = cache_size
+        # Items are (query, future, enqueued at); bulk requests carry a tuple of texts instead
+        self._queue: "queue.Queue[Tuple[Any, Future, float]]" = queue.Queue(maxsize=max_pending)
+        # Bulk request taken off the queue while collecting a query batch; runs next
+        self._held = None
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._batch_sizes: Counter = Counter()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._bulk_batches = 0
+        self._rejected = 0
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+                self._worker.start()
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            embedding = self._cache.get(key)
+            if embedding is None:
+                self._cache_misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self._cache_hits += 1
+            return embedding
+
+    def _cache_put(self, key: str, embedding: np.ndarray) -> None:
+        with self._lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for embedding and return a future for its vector
+
+        Raises:
+            EmbeddingQueueFull: If ``max_pending`` requests are already queued
+        """
+        key = " ".join(text.split())
+        cached = self._cache_get(key)
+        future: Future = Future()
+        if cached is not None:
+            future.set_result(cached)
+            return future
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((key, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise EmbeddingQueueFull(f"{self._queue.maxsize} embedding requests are already pending")
+        return future
+
+    def embed(self, text: str, timeout: float = None) -> np.ndarray:
+        """Embed a single query, blocking until its batch has been encoded"""
+        return self.submit(text).result(timeout=timeout)
+
+    def submit_many(self, texts: List[str]) -> Future:
+        """Queue a batch of texts, e.g. document chunks, waiting for room in the queue"""
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((tuple(texts), future, time.perf_counter()))
+        return future
+
+    def embed_many(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts, blocking until it has been encoded"""
+        return self.submit_many(texts).result()
+
+    def _collect_batch(self) -> List[Tuple[Any, Future, float]]:
+        """Take the next requests off the queue
+
+        Each future is marked running as it is taken, so a caller that gives
+        up afterwards can no longer cancel it, and requests cancelled while
+        queued are dropped.
+        """
+        if self._held is not None:
+            batch, self._held = [self._held], None
+            return batch
+        item = self._queue.get()
+        while not item[1].set_running_or_notify_cancel():
+            item = self._queue.get()
+        batch = [item]
+        if isinstance(item[0], tuple):
+            return batch
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if not item[1].set_running_or_notify_cancel():
+                continue
+            if isinstance(item[0], tuple):
+                # Queries already collected go first; the bulk request runs next
+                self._held = item
+                break
+            batch.append(item)
+        return batch
+
+    def _run_bulk(self, texts: Tuple[str, ...], future: Future) -> None:
+        try:
+            embeddings = self.encode(list(texts))
+        except Exception as e:
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._bulk_batches += 1
+        future.set_result(embeddings)
+
+    def _run_queries(self, batch: List[Tuple[Any, Future, float]]) -> None:
+        # Identical queries in the same window share one slot in the batch
+        texts = list(dict.fromkeys(key for key, _, _ in batch))
+        try:
+            embeddings = dict(zip(texts, self.encode(texts)))
+        except Exception as e:
+            logger.warning(f"Query embedding batch of {len(texts)} failed: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        for key, embedding in embeddings.items():
+            self._cache_put(key, embedding)
+        finished = time.perf_counter()
+        with self._lock:
+            self._batch_sizes[len(texts)] += 1
+            for _, _, enqueued in batch:
+                self._latencies.append(finished - enqueued)
+        for key, future, _ in batch:
+            future.set_result(embeddings[key])
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            try:
+                if isinstance(batch[0][0], tuple):
+                    self._run_bulk(*batch[0][:2])
+                else:
+                    self._run_queries(batch)
+            except Exception as e:
+                # Whatever went wrong, fail this batch's callers and keep serving the queue
+                logger.exception("Embedding batch failed unexpectedly")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency percentiles, batch-size histogram, LRU hit rate and queue pressure"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            batch_sizes = dict(sorted(self._batch_sizes.items()))
+            hits, misses = self._cache_hits, self._cache_misses
+            cache_entries = len(self._cache)
+            bulk_batches, rejected = self._bulk_batches, self._rejected
+        batches = sum(batch_sizes.values())
+        return {
+            "latency_ms": {
+                f"p{pct}": round(_percentile(latencies, pct) * 1000, 3)
+                for pct in (50, 90, 95, 99)
+            },
+            "batches": batches,
+            "batch_size_histogram": batch_sizes,
+            "mean_batch_size": sum(size * count for size, count in batch_sizes.items()) / batches if batches else 0.0,
+            "cache_entries": cache_entries,
+            "cache_hits": hits,
+            "cache_misses": misses,
+            "cache_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "queue_depth": self._queue.qsize(),
+            "max_pending": self._queue.maxsize,
+            "bulk_batches": bulk_batches,
+            "rejected": rejected,
+        }
@@ -0,0 +1,198 @@
+import logging
+import os
+import shutil
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..database.vector import EMBEDDING_COLUMN, EMBEDDING_COLUMNS
+from ..models.document import Document, DocumentChunk
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").split()[0].lower() == "true"
+# Per-document embedding files live under uploads/ alongside the stored PDFs
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "").strip() or os.path.join(os.getcwd(), "uploads", "embeddings")
+
+VECTORS_SUFFIX = ".f32"
+IDS_SUFFIX = ".ids.npy"
+
+
+def store_root(column: str = EMBEDDING_COLUMN) -> str:
+    """Directory holding the stores copied from one embedding column
+
+    Each column gets its own tree, so a deploy that switches EMBEDDING_COLUMN
+    never maps vectors written for the previous model.
+    """
+    return os.path.join(EMBEDDING_STORE_DIR, column)
+
+
+def store_paths(document_id: int, job_id: Optional[str]) -> Tuple[str, str]:
+    """Vector and chunk-id file paths for one ingestion of a document
+
+    Files are named after the ingestion job, so a re-ingest writes new files
+    and readers never see a half-replaced matrix.
+    """
+    stem = os.path.join(store_root(), str(document_id), job_id or "initial")
+    return stem + VECTORS_SUFFIX, stem + IDS_SUFFIX
+
+
+def _normalized(embeddings: Any) -> np.ndarray:
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    return matrix / np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+
+
+class EmbeddingStoreWriter:
+    """Streams a document's embeddings to disk as they are computed
+
+    Rows are appended unit-normalized to a temporary raw float32 file.
+    commit() publishes it together with the chunk ids; the ids file is
+    written last, so its presence marks a complete store.
+    """
+
+    def __init__(self, document_id: int, job_id: Optional[str]):
+        self.document_id = document_id
+        self.vectors_path, self.ids_path = store_paths(document_id, job_id)
+        os.makedirs(os.path.dirname(self.vectors_path), exist_ok=True)
+        self._tmp_path = self.vectors_path + ".part"
+        self._file = open(self._tmp_path, "wb")
+        self.rows = 0
+        self.dim = None
+
+    def append(self, embeddings: Any) -> None:
+        matrix = _normalized(embeddings)
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim embeddings, got {matrix.shape[1]}")
+        matrix.tofile(self._file)
+        self.rows += matrix.shape[0]
+
+    def commit(self, chunk_ids: Sequence[int]) -> None:
+        """Publish the store; ``chunk_ids`` must follow the order rows were appended in"""
+        self._file.close()
+        try:
+            if len(chunk_ids) != self.rows:
+                raise ValueError(f"{len(chunk_ids)} chunk ids for {self.rows} stored embeddings")
+            os.replace(self._tmp_path, self.vectors_path)
+            tmp_ids_path = self.ids_path + ".part"
+            with open(tmp_ids_path, "wb") as f:
+                np.save(f, np.asarray(chunk_ids, dtype=np.int64))
+            os.replace(tmp_ids_path, self.ids_path)
+        except Exception:
+            self.abort()
+            raise
+        _remove_other_versions(self.document_id, keep=(self.vectors_path, self.ids_path))
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+def _remove_other_versions(document_id: int, keep: Sequence[str]) -> None:
+    directory = os.path.join(store_root(), str(document_id))
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if path not in keep and not name.endswith(".part"):
+            os.remove(path)
+
+
+def write_store(document_id: int, job_id: Optional[str], chunk_ids: Sequence[int], embeddings: Any) -> None:
+    """Write a complete store in one go, e.g. for documents ingested before the store existed"""
+    writer = EmbeddingStoreWriter(document_id, job_id)
+    try:
+        writer.append(embeddings)
+    except Exception:
+        writer.abort()
+        raise
+    writer.commit(chunk_ids)
+
+
+def open_store(document_id: int, job_id: Optional[str]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Memory-map a document's stored embeddings
+
+    The matrix is a read-only np.memmap, so every worker process shares the
+    same pages through the OS page cache and nothing is parsed or copied.
+
+    Returns:
+        Chunk ids and the unit-normalized (rows, dim) matrix, or None when
+        no complete store exists for this ingestion
+    """
+    vectors_path, ids_path = store_paths(document_id, job_id)
+    if not os.path.exists(ids_path):
+        return None
+    ids = np.load(ids_path)
+    if ids.size == 0:
+        return ids, np.empty((0, 0), dtype=np.float32)
+    size = os.path.getsize(vectors_path)
+    row_bytes, remainder = divmod(size, ids.size)
+    if remainder or row_bytes % 4:
+        logger.warning(f"Embedding store for document {document_id} is truncated; ignoring it")
+        return None
+    matrix = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(ids.size, row_bytes // 4))
+    return ids, matrix
+
+
+def remove_store(document_id: int) -> None:
+    """Delete every stored version of a document's embeddings"""
+    for column in EMBEDDING_COLUMNS:
+        shutil.rmtree(os.path.join(store_root(column), str(document_id)), ignore_errors=True)
+
+
+def remove_column_stores(column: str) -> None:
+    """Delete every store copied from an embedding column, e.g. before it is refilled"""
+    shutil.rmtree(store_root(column), ignore_errors=True)
+
+
+def verify_store(db: Session, document_id: int, sample: Optional[int] = 100, atol: float = 1e-5) -> Dict[str, Any]:
+    """Check a document's store against its document_chunk rows
+
+    Chunk ids must match the embedded rows exactly. Stored vectors are compared
+    with the normalized database embeddings for ``sample`` random rows, or for
+    every row when ``sample`` is None.
+
+    Returns:
+        ``ok`` plus a list of ``problems`` found
+    """
+    job_id = db.query(Document.job_id).filter(Document.id == document_id).scalar()
+    stored = open_store(document_id, job_id)
+    if stored is None:
+        return {"document_id": document_id, "ok": False, "problems": ["missing"]}
+    ids, matrix = stored
+
+    problems = []
+    db_ids = {
+        row.id for row in db.query(DocumentChunk.id).filter(
+            DocumentChunk.document_id == document_id,
+            DocumentChunk.embedding.isnot(None)
+        )
+    }
+    stored_ids = set(ids.tolist())
+    if len(stored_ids) != ids.size:
+        problems.append("duplicate chunk ids")
+    if stored_ids - db_ids:
+        problems.append(f"{len(stored_ids - db_ids)} stored chunks not in the database")
+    if db_ids - stored_ids:
+        problems.append(f"{len(db_ids - stored_ids)} database chunks not stored")
+
+    positions = np.arange(ids.size)
+    if sample is not None and ids.size > sample:
+        positions = np.random.default_rng().choice(ids.size, sample, replace=False)
+    checked = {int(ids[i]): i for i in positions if int(ids[i]) in db_ids}
+    if checked:
+        rows = db.query(DocumentChunk.id, DocumentChunk.embedding).filter(DocumentChunk.id.in_(list(checked))).all()
+        mismatched = sum(
+            1 for row in rows
+            if row.embedding is None
+            or row.embedding.shape[0] != matrix.shape[1]
+            or not np.allclose(matrix[checked[row.id]], _normalized(row.embedding)[0], atol=atol)
+        )
+        if mismatched:
+            problems.append(f"{mismatched} of {len(rows)} sampled embeddings differ")
+
+    return {"document_id": document_id, "ok": not problems, "problems": problems, "rows": int(ids.size)}
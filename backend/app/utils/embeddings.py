@@ -1,117 +1,215 @@
-from sentence_transformers import SentenceTransformer
+import asyncio
+import logging
 import os
-from typing import List, Union, Dict, Any
+import threading
+from typing import List, Optional, Union, Dict, Any
 import numpy as np
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from ..database.vector import EMBEDDING_COLUMN, EMBEDDING_DIM
+from .embedding_backends import backend_cache_key, load_backend
+from .embedding_cache import EMBEDDING_CACHE_ENABLED, embedding_cache, text_hash
+from .embedding_service import QueryEmbeddingService
+from .vector_search import search_chunks
+
+logger = logging.getLogger(__name__)
+
 # Load the model name from environment variables or use a default
 MODEL_NAME = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Backend (torch or onnx) is selected with EMBEDDING_BACKEND, see embedding_backends
+CACHE_MODEL_KEY = backend_cache_key(MODEL_NAME)
+
+# Load the model and run one forward pass at application startup
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "true").split()[0].lower() == "true"
 
 # Initialize the model (lazy-loaded on first use)
 _model = None
+_model_lock = threading.Lock()
+
+
+class EmbeddingDimensionMismatch(ValueError):
+    """Raised when the model's output dimension differs from EMBEDDING_DIM"""
+
 
 def get_model():
-    """Get or initialize the sentence transformer model"""
+    """Get or initialize the embedding model for the configured backend"""
     global _model
     if _model is None:
-        _model = SentenceTransformer(MODEL_NAME)
+        with _model_lock:
+            if _model is None:
+                model = load_backend(MODEL_NAME)
+                model_dim = model.get_sentence_embedding_dimension()
+                if model_dim != EMBEDDING_DIM:
+                    raise EmbeddingDimensionMismatch(
+                        f"EMBEDDING_MODEL {MODEL_NAME} produces {model_dim}-dim vectors but "
+                        f"EMBEDDING_DIM is {EMBEDDING_DIM}; re-embed stored chunks with scripts/reembed.py "
+                        f"and deploy with the EMBEDDING_DIM and EMBEDDING_COLUMN it prints"
+                    )
+                _model = model
     return _model
 
-def get_embeddings(texts: Union[str, List[str]]) -> Union[np.ndarray, List[np.ndarray]]:
+def encode_cached(model: Any, cache_key: str, texts: Union[str, List[str]]) -> np.ndarray:
+    """Encode texts with a model, going through the embedding cache
+    
+    Only distinct texts that miss the cache are sent to the model.
+    """
+    # Handle both single texts and lists
+    batch = [texts] if isinstance(texts, str) else list(texts)
+    embeddings = embedding_cache.get_many(cache_key, batch)
+    
+    # Encode each distinct missing text once, even if it repeats within the batch
+    missing: Dict[str, str] = {}
+    for content, embedding in zip(batch, embeddings):
+        if embedding is None:
+            missing.setdefault(text_hash(content), content)
+    if missing:
+        encoded = model.encode(list(missing.values()))
+        embedding_cache.put_many(cache_key, list(missing.values()), encoded)
+        encoded_by_hash = dict(zip(missing.keys(), encoded))
+        embeddings = [
+            embedding if embedding is not None else encoded_by_hash[text_hash(content)]
+            for content, embedding in zip(batch, embeddings)
+        ]
+    
+    result = np.stack(embeddings).astype(np.float32, copy=False)
+    return result[0] if isinstance(texts, str) else result
+
+
+def get_embeddings(texts: Union[str, List[str]], use_cache: bool = True) -> Union[np.ndarray, List[np.ndarray]]:
     """Generate embeddings for a text or list of texts
     
+    Embeddings are looked up in the content-hash embedding cache first, and
+    only distinct texts that miss the cache are sent to the model.
+    
     Args:
         texts: A single text string or a list of text strings
+        use_cache: Whether to read and populate the embedding cache
         
     Returns:
         Embeddings as numpy arrays
     """
-    model = get_model()
-    
-    # Handle both single texts and lists
-    if isinstance(texts, str):
-        return model.encode(texts)
-    else:
-        return model.encode(texts)
+    if not use_cache or not EMBEDDING_CACHE_ENABLED or not texts:
+        return get_model().encode(texts)
+    return encode_cached(get_model(), CACHE_MODEL_KEY, texts)
+
+
+# Batches concurrent single-query embeddings into one model call; the
+# batcher runs on its own thread, so queries never block the event loop.
+# Its bounded queue is also the only way ingestion reaches the model.
+query_embedder = QueryEmbeddingService(lambda texts: get_embeddings(texts))
+
+
+def embed_query(query: str) -> np.ndarray:
+    """Embed a search query through the micro-batching query embedder
+
+    Raises:
+        EmbeddingQueueFull: If the embedding queue is full
+    """
+    return query_embedder.embed(query)
+
+
+def embed_documents(texts: List[str]) -> np.ndarray:
+    """Embed a batch of document chunks, waiting for room in the embedding queue"""
+    return query_embedder.embed_many(texts)
+
     
+def warm_up_model() -> None:
+    """Load the model and run one forward pass so first requests are not slowed down"""
+    get_model().encode(["warm-up"])
+
+
+async def embed_query_async(query: str) -> np.ndarray:
+    """Embed a search query without blocking the event loop
+
+    Raises:
+        EmbeddingQueueFull: If the embedding queue is full
+    """
+    return await asyncio.wrap_future(query_embedder.submit(query))
+
+
+async def warm_up_model_async() -> None:
+    """Run the model warm-up off the event loop"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, warm_up_model)
+
+
 def get_embedding_dimension() -> int:
     """Get the dimension of the embeddings from the model"""
     model = get_model()
     return model.get_sentence_embedding_dimension()
 
 
-def search_similar_chunks(query: str, db: Session, document_id: int = None, limit: int = 5) -> List[Dict[str, Any]]:
+def get_column_dimension(db: Session, column: str = EMBEDDING_COLUMN) -> Optional[int]:
+    """Get the declared dimension of a vector column on document_chunk"""
+    result = db.execute(
+        text(
+            """
+            SELECT atttypmod FROM pg_attribute
+            WHERE attrelid = to_regclass('document_chunk') AND attname = :column AND NOT attisdropped
+            """
+        ),
+        {"column": column}
+    ).scalar()
+    return result if result and result > 0 else None
+
+
+def verify_embedding_dimension(db: Session) -> None:
+    """Check the live embedding column exists and matches EMBEDDING_DIM
+
+    The model itself is checked against EMBEDDING_DIM when it is loaded, see
+    get_model(). Nothing is checked before document_chunk has been created.
+
+    Raises:
+        EmbeddingDimensionMismatch: If the column is missing or has another
+            dimension, e.g. because a deploy switched models without
+            switching EMBEDDING_COLUMN to the column scripts/reembed.py filled
+    """
+    if db.execute(text("SELECT to_regclass('document_chunk')")).scalar() is None:
+        return
+    column_dim = get_column_dimension(db)
+    if column_dim is None:
+        raise EmbeddingDimensionMismatch(
+            f"document_chunk has no {EMBEDDING_COLUMN} column; set EMBEDDING_COLUMN to the column "
+            f"scripts/reembed.py filled for EMBEDDING_MODEL {MODEL_NAME}"
+        )
+    if column_dim != EMBEDDING_DIM:
+        raise EmbeddingDimensionMismatch(
+            f"document_chunk.{EMBEDDING_COLUMN} is vector({column_dim}) but EMBEDDING_DIM is {EMBEDDING_DIM}; "
+            f"set EMBEDDING_COLUMN to the column scripts/reembed.py filled for EMBEDDING_MODEL {MODEL_NAME}"
+        )
+
+
+def search_similar_chunks(query: str, db: Session, document_id: int = None, limit: int = 5,
+                          query_embedding: Optional[np.ndarray] = None, ef_search: Optional[int] = None,
+                          probes: Optional[int] = None, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
     """Search for document chunks similar to the query using vector similarity
     
+    Scoped searches pick their strategy by scope size, see vector_search.search_chunks.
+    
     Args:
         query: The search query
         db: Database session
         document_id: Optional filter for specific document
         limit: Maximum number of results to return
+        query_embedding: Precomputed embedding of the query, e.g. from embed_query_async
+        ef_search: HNSW candidate list size; higher trades latency for recall
+        probes: IVFFlat lists to scan; higher trades latency for recall
+        user_id: Optional filter for one user's documents
     
     Returns:
         List of similar document chunks with metadata
     """
     # Generate embedding for the query
-    query_embedding = get_embeddings(query)
-    
-    # Convert numpy array to list for SQL query
-    embedding_list = query_embedding.tolist()
-    
-    # Construct the SQL query with vector similarity search
-    sql = text(
-        """
-        SELECT 
-            dc.id,
-            dc.content,
-            dc.page_number,
-            d.title as document_title,
-            d.id as document_id,
-            1 - (dc.embedding <-> :embedding) as similarity
-        FROM 
-            document_chunk dc
-        JOIN 
-            document d ON dc.document_id = d.id
-        WHERE 
-            dc.embedding IS NOT NULL
-        """
-    )
+    if query_embedding is None:
+        query_embedding = embed_query(query)
     
-    # Add document filter if provided
-    if document_id is not None:
-        sql = text(sql.text + " AND dc.document_id = :document_id")
-    
-    # Add ordering and limit
-    sql = text(
-        sql.text + """
-        ORDER BY 
-            dc.embedding <-> :embedding
-        LIMIT :limit
-        """
+    return search_chunks(
+        db,
+        query_embedding,
+        limit=limit,
+        document_id=document_id,
+        user_id=user_id,
+        ef_search=ef_search,
+        probes=probes,
     )
-    
-    # Execute the query with parameters
-    params = {
-        "embedding": str(embedding_list),
-        "limit": limit
-    }
-    
-    if document_id is not None:
-        params["document_id"] = document_id
-    
-    result = db.execute(sql, params)
-    
-    # Process results
-    chunks = []
-    for row in result:
-        chunks.append({
-            "id": row.id,
-            "content": row.content,
-            "page_number": row.page_number,
-            "document_title": row.document_title,
-            "document_id": row.document_id,
-            "similarity": float(row.similarity)
-        })
-    
-    return chunks
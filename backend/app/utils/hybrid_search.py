@@ -0,0 +1,269 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..database.indexes import apply_search_params
+from ..database.vector import EMBEDDING_COLUMN, encode_vector_text
+from ..models.document import FULLTEXT_CONFIG
+from .document_index import cosine_scores, document_index, entry_chunk, top_rows
+from .vector_search import (
+    RESULT_COLUMNS,
+    STRATEGY_EXACT,
+    STRATEGY_FILTERED_INDEX,
+    VECTOR_SEARCH_BACKEND,
+    choose_strategy,
+    filtered_scan_params,
+    record_strategy,
+    scope_filter,
+    scope_size,
+)
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Share of the fused score given to the vector ranking; the lexical ranking gets the rest
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "0.5").split()[0])
+# Candidates each ranking contributes before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "40").split()[0])
+# Reciprocal rank fusion constant; larger values flatten the advantage of top ranks
+RRF_K = int(os.getenv("RRF_K", "60").split()[0])
+
+STRATEGY_HYBRID_MEMORY = "hybrid_memory"
+STRATEGY_HYBRID_SQL = "hybrid_sql"
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], weights: Sequence[float],
+                           k: int = RRF_K) -> List[tuple]:
+    """Fuse ranked id lists into (id, score) pairs, best first
+
+    Each list contributes ``weight / (k + rank)`` for every id it ranks,
+    with ranks starting at 1.
+    """
+    scores: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _vector_leg_sql(strategy: str, scope: str) -> str:
+    """Vector candidates ranked by cosine distance, shaped as (id, rank)"""
+    if strategy == STRATEGY_EXACT:
+        # Materialized so the scope is scored exactly rather than through the ANN index
+        return f"""
+            vector_scored AS MATERIALIZED (
+                SELECT dc.id, dc.{EMBEDDING_COLUMN} <=> CAST(:embedding AS vector) AS distance
+                FROM document_chunk dc
+                WHERE {scope} AND dc.{EMBEDDING_COLUMN} IS NOT NULL
+            ),
+            vector_hits AS (
+                SELECT id, row_number() OVER (ORDER BY distance) AS rank
+                FROM (SELECT id, distance FROM vector_scored ORDER BY distance LIMIT :candidates) nearest
+            )"""
+    return f"""
+            vector_hits AS (
+                SELECT id, row_number() OVER (ORDER BY distance) AS rank
+                FROM (
+                    SELECT dc.id, dc.{EMBEDDING_COLUMN} <=> CAST(:embedding AS vector) AS distance
+                    FROM document_chunk dc
+                    WHERE {scope} AND dc.{EMBEDDING_COLUMN} IS NOT NULL
+                    ORDER BY dc.{EMBEDDING_COLUMN} <=> CAST(:embedding AS vector)
+                    LIMIT :candidates
+                ) nearest
+            )"""
+
+
+LEXICAL_LEG_SQL = """
+            lexical_hits AS (
+                SELECT id, row_number() OVER (ORDER BY score DESC, id) AS rank
+                FROM (
+                    SELECT dc.id, ts_rank_cd(dc.content_tsv, q.query) AS score
+                    FROM document_chunk dc, websearch_to_tsquery(CAST(:config AS regconfig), :query) AS q(query)
+                    WHERE {scope} AND dc.content_tsv @@ q.query
+                    ORDER BY score DESC
+                    LIMIT :candidates
+                ) matches
+            )"""
+
+
+def _fused_sql(strategy: str, scope: str, join: str):
+    return text(
+        f"""
+        WITH {_vector_leg_sql(strategy, scope)},
+        {LEXICAL_LEG_SQL.format(scope=scope)},
+            fused AS (
+                SELECT
+                    COALESCE(v.id, l.id) AS id,
+                    COALESCE(CAST(:vector_weight AS float8) / (:rrf_k + v.rank), 0)
+                        + COALESCE(CAST(:lexical_weight AS float8) / (:rrf_k + l.rank), 0) AS score,
+                    v.rank AS vector_rank,
+                    l.rank AS lexical_rank
+                FROM vector_hits v
+                FULL OUTER JOIN lexical_hits l ON l.id = v.id
+                ORDER BY score DESC
+                LIMIT :limit
+            )
+        SELECT
+            {RESULT_COLUMNS},
+            1 - (dc.{EMBEDDING_COLUMN} <=> CAST(:embedding AS vector)) AS similarity,
+            f.score, f.vector_rank, f.lexical_rank,
+            (SELECT count(*) FROM vector_hits) AS vector_hit_count
+        FROM fused f
+        JOIN document_chunk dc ON dc.id = f.id
+        {join}
+        ORDER BY f.score DESC
+        """
+    )
+
+
+def _sql_hybrid(db: Session, query: str, embedding: str, limit: int, candidates: int, vector_weight: float,
+                document_id: Optional[int], user_id: Optional[int], ef_search: Optional[int],
+                probes: Optional[int]) -> List[Dict[str, Any]]:
+    """Both rankings and their fusion in a single statement
+
+    Like search_chunks, a filtered index scan that runs out of candidates
+    before enough pass the scope filter is redone with exact scoring.
+    """
+    scope, join, params = scope_filter(document_id, user_id)
+    size = scope_size(db, document_id, user_id)
+    strategy = choose_strategy(size)
+    if strategy == STRATEGY_FILTERED_INDEX:
+        apply_search_params(db, **filtered_scan_params(db, size, candidates, ef_search, probes))
+    elif strategy != STRATEGY_EXACT:
+        apply_search_params(db, ef_search=ef_search, probes=probes, limit=candidates)
+
+    values = {
+        **params,
+        "embedding": embedding,
+        "query": query,
+        "config": FULLTEXT_CONFIG,
+        "candidates": candidates,
+        "limit": limit,
+        "vector_weight": vector_weight,
+        "lexical_weight": 1 - vector_weight,
+        "rrf_k": RRF_K,
+    }
+    rows = db.execute(_fused_sql(strategy, scope, join), values).all()
+    if strategy == STRATEGY_FILTERED_INDEX:
+        vector_hits = rows[0].vector_hit_count if rows else 0
+        if vector_hits < min(candidates, size):
+            logger.debug(f"Filtered index scan returned {vector_hits} of {candidates} candidates; "
+                         f"rescoring scope exactly")
+            rows = db.execute(_fused_sql(STRATEGY_EXACT, scope, join), values).all()
+    return [
+        {
+            "id": row.id,
+            "content": row.content,
+            "page_number": row.page_number,
+            "document_title": row.document_title,
+            "document_id": row.document_id,
+            "similarity": None if row.similarity is None else float(row.similarity),
+            "score": float(row.score),
+            "vector_rank": row.vector_rank,
+            "lexical_rank": row.lexical_rank,
+        }
+        for row in rows
+    ]
+
+
+def _lexical_matches(db: Session, query: str, document_id: int, candidates: int) -> List[Any]:
+    scope, join, params = scope_filter(document_id, None)
+    sql = text(
+        f"""
+        WITH {LEXICAL_LEG_SQL.format(scope=scope)}
+        SELECT {RESULT_COLUMNS}, l.rank
+        FROM lexical_hits l
+        JOIN document_chunk dc ON dc.id = l.id
+        {join}
+        ORDER BY l.rank
+        """
+    )
+    return db.execute(sql, {**params, "query": query, "config": FULLTEXT_CONFIG, "candidates": candidates}).all()
+
+
+def _memory_hybrid(db: Session, query: str, query_embedding: np.ndarray, limit: int, candidates: int,
+                   vector_weight: float, document_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Vector ranking from the in-process index, lexical ranking in one query"""
+    entry = document_index.get_entry(db, document_id)
+    if entry is None:
+        return None
+
+    scores = cosine_scores(entry.matrix, query_embedding) if entry.ids.size else np.empty(0, dtype=np.float32)
+    vector_ranking = [int(entry.ids[row]) for row in top_rows(scores, candidates)]
+    lexical = {row.id: row for row in _lexical_matches(db, query, document_id, candidates)}
+    lexical_ranking = sorted(lexical, key=lambda chunk_id: lexical[chunk_id].rank)
+
+    vector_ranks = {chunk_id: rank for rank, chunk_id in enumerate(vector_ranking, start=1)}
+    results = []
+    for chunk_id, score in reciprocal_rank_fusion(
+        [vector_ranking, lexical_ranking], [vector_weight, 1 - vector_weight]
+    )[:limit]:
+        row = entry.positions.get(chunk_id)
+        if row is not None:
+            chunk = entry_chunk(entry, document_id, row, scores[row])
+        else:
+            # Matched lexically but has no embedding
+            match = lexical[chunk_id]
+            chunk = {
+                "id": match.id,
+                "content": match.content,
+                "page_number": match.page_number,
+                "document_title": match.document_title,
+                "document_id": match.document_id,
+                "similarity": None,
+            }
+        chunk.update(
+            score=score,
+            vector_rank=vector_ranks.get(chunk_id),
+            lexical_rank=lexical[chunk_id].rank if chunk_id in lexical else None,
+        )
+        results.append(chunk)
+    return results
+
+
+def hybrid_search(db: Session, query: str, query_embedding: np.ndarray, limit: int = 5,
+                  document_id: Optional[int] = None, user_id: Optional[int] = None,
+                  vector_weight: Optional[float] = None, ef_search: Optional[int] = None,
+                  probes: Optional[int] = None, backend: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Fuse vector similarity and full-text ranking with reciprocal rank fusion
+
+    Exact terms such as formula names or course codes that embeddings blur
+    are caught by the lexical ranking over the content_tsv GIN index. The two
+    rankings are computed in one round trip: a single SQL statement, or the
+    in-process index plus one lexical query for documents it holds.
+
+    Args:
+        db: Database session
+        query: Search text, parsed with websearch_to_tsquery
+        query_embedding: Embedding of the query
+        limit: Maximum number of results to return
+        document_id: Restrict to one document
+        user_id: Restrict to one user's documents (ignored when document_id is given)
+        vector_weight: Weight of the vector ranking in [0, 1]; defaults to HYBRID_VECTOR_WEIGHT
+        ef_search: HNSW candidate list size for index scans
+        probes: IVFFlat lists to scan for index scans
+        backend: "memory" or "postgres"; defaults to VECTOR_SEARCH_BACKEND
+
+    Returns:
+        Chunks as returned by search_similar_chunks, plus the fused ``score``
+        and each ranking's ``vector_rank`` and ``lexical_rank`` (None when absent)
+    """
+    vector_weight = HYBRID_VECTOR_WEIGHT if vector_weight is None else min(max(vector_weight, 0.0), 1.0)
+    candidates = max(limit, HYBRID_CANDIDATES)
+
+    if (backend or VECTOR_SEARCH_BACKEND) == "memory" and document_id is not None:
+        chunks = _memory_hybrid(db, query, query_embedding, limit, candidates, vector_weight, document_id)
+        if chunks is not None:
+            record_strategy(STRATEGY_HYBRID_MEMORY)
+            return chunks
+
+    chunks = _sql_hybrid(
+        db, query, encode_vector_text(query_embedding), limit, candidates, vector_weight,
+        document_id, user_id, ef_search, probes
+    )
+    record_strategy(STRATEGY_HYBRID_SQL)
+    return chunks
@@ -0,0 +1,341 @@
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+
+from ..database.bulk import write_document_chunks
+from ..database.session import SessionLocal
+from ..models.document import Document, DocumentChunk
+from .answer_cache import answer_cache
+from .document_index import document_index
+from .embedding_store import EMBEDDING_STORE_ENABLED, EmbeddingStoreWriter
+from .embeddings import embed_documents
+from .pdf import batched, get_page_count, iter_chunks, iter_pdf_pages
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2").split()[0])
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32").split()[0])
+# Jobs that have not reported progress for this long are considered abandoned
+INGEST_STALE_SECONDS = int(os.getenv("INGEST_STALE_SECONDS", "600").split()[0])
+
+# Pipeline stages, in execution order
+STAGES = ["extract", "chunk", "embed", "insert"]
+
+# Document.status values
+STATUS_QUEUED = "queued"
+STATUS_PROCESSING = "processing"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+# Local worker pool and the jobs it is currently running, keyed by document id
+_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+_jobs: Dict[int, Future] = {}
+_jobs_lock = threading.Lock()
+
+
+class JobSuperseded(Exception):
+    """Raised when a newer ingestion job has taken over the document"""
+
+
+def new_progress(job_id: str) -> Dict[str, Any]:
+    """Build the initial per-stage progress record for a job"""
+    return {
+        "job_id": job_id,
+        "stages": {
+            stage: {"status": "pending", "done": 0, "total": None}
+            for stage in STAGES
+        },
+        "error": None,
+    }
+
+
+def _is_stale(document: Document) -> bool:
+    """Whether a queued/processing document has stopped reporting progress"""
+    if document.updated_at is None:
+        return True
+    return datetime.utcnow() - document.updated_at > timedelta(seconds=INGEST_STALE_SECONDS)
+
+
+def is_job_running(document_id: int) -> bool:
+    """Whether this process is currently running a job for the document"""
+    with _jobs_lock:
+        future = _jobs.get(document_id)
+        return future is not None and not future.done()
+
+
+def submit_ingestion(db: Session, document: Document, force: bool = False) -> str:
+    """Queue a document for background ingestion and return the job id
+
+    Submitting is idempotent: a document that is already ready, or whose job is
+    still in flight, keeps its current job id unless ``force`` is set. Failed
+    and abandoned jobs are restarted under a new job id.
+    """
+    if not force and document.job_id:
+        if document.status == STATUS_READY:
+            return document.job_id
+        if document.status in (STATUS_QUEUED, STATUS_PROCESSING):
+            if is_job_running(document.id) or not _is_stale(document):
+                return document.job_id
+
+    job_id = uuid.uuid4().hex
+    document.job_id = job_id
+    document.status = STATUS_QUEUED
+    document.ingest_progress = new_progress(job_id)
+    db.add(document)
+    db.commit()
+
+    future = _executor.submit(run_ingestion, document.id, job_id)
+    with _jobs_lock:
+        _jobs[document.id] = future
+    future.add_done_callback(lambda f, document_id=document.id: _forget_job(document_id, f))
+    return job_id
+
+
+def _forget_job(document_id: int, future: Future) -> None:
+    """Drop a finished job from the registry unless a newer one replaced it"""
+    with _jobs_lock:
+        if _jobs.get(document_id) is future:
+            del _jobs[document_id]
+
+
+def reuse_ingestion(db: Session, document: Document, source: Document) -> str:
+    """Complete a document by sharing the chunks of an identical, ready document
+
+    No chunk rows are written: the document points at the chunk set of
+    ``source`` (Document.chunks_from_id) and searches read it from there,
+    so completing a duplicate costs one row update however large it is.
+    """
+    job_id = uuid.uuid4().hex
+    # Keeps the source from being deleted, and its chunks handed on, meanwhile
+    source = db.query(Document).filter(Document.id == source.chunk_owner_id).with_for_update().one()
+
+    progress = new_progress(job_id)
+    for stage in STAGES:
+        progress["stages"][stage] = {"status": "done", "done": source.chunk_count, "total": source.chunk_count}
+    progress["stages"]["extract"].update(done=source.page_count, total=source.page_count)
+    progress["reused_from"] = source.id
+
+    document.chunks_from_id = source.id
+    document.job_id = job_id
+    document.status = STATUS_READY
+    document.page_count = source.page_count
+    document.chunk_count = source.chunk_count
+    document.ingest_progress = progress
+    db.add(document)
+    db.commit()
+    return job_id
+
+
+def release_chunks(db: Session, document: Document) -> List[int]:
+    """Detach a document that is about to be deleted from its chunk set
+
+    A document's own chunks are deleted, unless other documents share them:
+    then the oldest of those takes the chunk rows over and the rest point at
+    it. Does not commit.
+
+    Returns:
+        Ids of the documents whose chunks moved
+    """
+    if document.chunks_from_id is not None:
+        return []
+    db.query(Document.id).filter(Document.id == document.id).with_for_update().first()
+    sharing = [
+        document_id for document_id, in db.query(Document.id)
+        .filter(Document.chunks_from_id == document.id)
+        .order_by(Document.id)
+    ]
+    chunks = db.query(DocumentChunk).filter(DocumentChunk.document_id == document.id)
+    if not sharing:
+        chunks.delete(synchronize_session=False)
+        return []
+
+    heir = sharing[0]
+    chunks.update({DocumentChunk.document_id: heir}, synchronize_session=False)
+    db.query(Document).filter(Document.id.in_(sharing)).update(
+        {Document.chunks_from_id: case((Document.id == heir, None), else_=heir)}, synchronize_session=False
+    )
+    return sharing
+
+
+class _JobContext:
+    """Reports progress for one ingestion job through its own DB session"""
+
+    def __init__(self, db: Session, document_id: int, job_id: str):
+        self.db = db
+        self.document_id = document_id
+        self.job_id = job_id
+
+    def document(self, lock: bool = False) -> Document:
+        """Load the document, failing if a newer job has taken it over"""
+        query = self.db.query(Document).filter(Document.id == self.document_id)
+        if lock:
+            query = query.with_for_update()
+        document = query.first()
+        if document is None or document.job_id != self.job_id:
+            raise JobSuperseded()
+        return document
+
+    def update(self, stages: Dict[str, Dict[str, Any]], document: Optional[Document] = None,
+               commit: bool = True, **progress_fields: Any) -> Document:
+        """Merge per-stage progress fields into the document's progress record"""
+        document = document or self.document()
+        progress = dict(document.ingest_progress or new_progress(self.job_id))
+        merged = dict(progress["stages"])
+        for stage, fields in stages.items():
+            merged[stage] = {**merged[stage], **fields}
+        progress["stages"] = merged
+        progress.update(progress_fields)
+        # Reassign so SQLAlchemy notices the JSON change
+        document.ingest_progress = progress
+        if commit:
+            self.db.commit()
+        return document
+
+
+def run_ingestion(document_id: int, job_id: str) -> None:
+    """Run the extract, chunk, embed and insert stages for a document
+
+    The stages are streamed: pages feed a generator chunker, chunks are
+    grouped into embedding batches as soon as enough are ready, and each
+    embedded batch is written before the next one is built. Memory stays
+    flat for huge documents and the first chunks become searchable early.
+    """
+    db = SessionLocal()
+    ctx = _JobContext(db, document_id, job_id)
+    counts = {"extract": 0, "chunk": 0, "embed": 0, "insert": 0}
+    store = None
+    try:
+        document = ctx.document(lock=True)
+        file_path = document.file_path
+        page_count = get_page_count(file_path)
+
+        # Clear chunks from any earlier attempt so retries never duplicate rows
+        db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete()
+        document_index.invalidate(document_id)
+        answer_cache.invalidate(document_id)
+        document.status = STATUS_PROCESSING
+        # Re-ingesting a document that shared chunks gives it its own
+        document.chunks_from_id = None
+        document.page_count = page_count
+        document.chunk_count = 0
+        ctx.update({
+            stage: {"status": "running", "done": 0, "total": page_count if stage == "extract" else None}
+            for stage in STAGES
+        }, document=document)
+
+        def counted(items, stage):
+            for item in items:
+                counts[stage] += 1
+                yield item
+
+        chunk_size = int(os.getenv("CHUNK_SIZE", "1000").split()[0])
+        chunk_overlap = int(os.getenv("CHUNK_OVERLAP", "200").split()[0])
+        pages = counted(iter_pdf_pages(file_path), "extract")
+        chunks = counted(iter_chunks(pages, chunk_size, chunk_overlap), "chunk")
+
+        # Embeddings are also streamed to the document's memory-mapped store
+        store = EmbeddingStoreWriter(document_id, job_id) if EMBEDDING_STORE_ENABLED else None
+        embed_error = None
+        for batch in batched(chunks, EMBEDDING_BATCH_SIZE):
+            embeddings = [None] * len(batch)
+            if embed_error is None:
+                try:
+                    embeddings = embed_documents([chunk_data["content"] for chunk_data in batch])
+                    counts["embed"] += len(batch)
+                except Exception as e:
+                    # Store chunks without embeddings rather than failing the document
+                    logger.warning(f"Error generating embeddings for document {document_id}: {e}")
+                    embed_error = str(e)
+                    if store is not None:
+                        store.abort()
+                        store = None
+            _insert_batch(ctx, batch, embeddings, counts)
+            if store is not None and embed_error is None:
+                store.append(embeddings)
+
+        if store is not None:
+            _commit_store(db, store, document_id)
+            store = None
+
+        document = ctx.document()
+        document.chunk_count = counts["insert"]
+        document.status = STATUS_READY
+        ctx.update({
+            "extract": {"status": "done", "done": counts["extract"]},
+            "chunk": {"status": "done", "done": counts["chunk"], "total": counts["chunk"]},
+            "embed": {"status": "skipped" if embed_error else "done", "done": counts["embed"],
+                      "total": counts["chunk"], "error": embed_error},
+            "insert": {"status": "done", "done": counts["insert"], "total": counts["chunk"]},
+        }, document=document)
+        logger.info(f"Ingestion job {job_id} for document {document_id} completed")
+    except JobSuperseded:
+        db.rollback()
+        logger.info(f"Ingestion job {job_id} for document {document_id} was superseded")
+    except Exception as e:
+        db.rollback()
+        logger.exception(f"Ingestion job {job_id} for document {document_id} failed")
+        try:
+            document = ctx.document()
+            document.status = STATUS_FAILED
+            ctx.update({
+                stage: {"status": "failed"}
+                for stage, stage_progress in document.ingest_progress["stages"].items()
+                if stage_progress["status"] == "running"
+            }, document=document, error=str(e))
+        except JobSuperseded:
+            db.rollback()
+    finally:
+        if store is not None:
+            store.abort()
+        db.close()
+
+
+def _commit_store(db: Session, store: EmbeddingStoreWriter, document_id: int) -> None:
+    """Publish the embedding store before the document is marked ready
+
+    The store only speeds up searches, so failing to write it never fails ingestion.
+    """
+    try:
+        chunk_ids = [
+            chunk_id for chunk_id, in db.query(DocumentChunk.id)
+            .filter(DocumentChunk.document_id == document_id)
+            .order_by(DocumentChunk.chunk_index)
+        ]
+        store.commit(chunk_ids)
+    except Exception as e:
+        logger.warning(f"Could not write embedding store for document {document_id}: {e}")
+
+
+def _insert_batch(ctx: _JobContext, batch: List[dict], embeddings: List[Optional[Any]],
+                  counts: Dict[str, int]) -> None:
+    """Write one batch of chunks in bulk and record pipeline progress"""
+    db = ctx.db
+    # Lock the document row so a concurrent retry cannot interleave its inserts
+    document = ctx.document(lock=True)
+    write_document_chunks(db, ctx.document_id, batch, embeddings)
+    counts["insert"] += len(batch)
+    document.chunk_count = counts["insert"]
+    ctx.update({stage: {"done": done} for stage, done in counts.items()}, document=document)
+
+
+def get_ingestion_status(document: Document) -> Dict[str, Any]:
+    """Describe the ingestion state of a document for the status endpoint"""
+    progress = document.ingest_progress or {}
+    return {
+        "document_id": document.id,
+        "job_id": document.job_id,
+        "status": document.status,
+        "page_count": document.page_count,
+        "chunk_count": document.chunk_count,
+        "stages": progress.get("stages", {}),
+        "error": progress.get("error"),
+        "updated_at": document.updated_at,
+    }
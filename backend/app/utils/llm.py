@@ -0,0 +1,286 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# "openai" or "stub" (a local model that needs no network, for tests and benchmarks)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").split()[0].lower()
+# Any OpenAI-compatible completions API, e.g. scripts/mock_llm_server.py for load tests
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.openai.com/v1").split()[0].rstrip("/")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo-instruct").split()[0]
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "256").split()[0])
+# Seconds to wait for a connection, and for each read, write or pooled connection
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5").split()[0])
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60").split()[0])
+# Retries after a timeout, connection error, 429 or 5xx, with jittered exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2").split()[0])
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5").split()[0])
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8").split()[0])
+# Generations in flight per worker; further requests queue for up to LLM_QUEUE_TIMEOUT seconds
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16").split()[0])
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "30").split()[0])
+# Pooled keep-alive connections to the provider
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32").split()[0])
+# Delay between tokens streamed by the stub model
+STUB_LLM_TOKEN_DELAY_MS = float(os.getenv("STUB_LLM_TOKEN_DELAY_MS", "0").split()[0])
+# Number of recent generations kept for latency percentiles
+LATENCY_WINDOW = 10000
+
+# Shared by every request; the client is safe to reuse
+_llm = None
+_llm_lock = threading.Lock()
+
+
+class StubLLM:
+    """Deterministic local model with the ainvoke/astream interface of LangChain LLMs"""
+
+    def __init__(self, response: Optional[str] = None, token_delay: float = STUB_LLM_TOKEN_DELAY_MS / 1000):
+        self.response = response
+        self.token_delay = token_delay
+
+    def _respond(self, prompt: str) -> str:
+        if self.response is not None:
+            return self.response
+        question = re.findall(r"^Question: (.*)$", prompt, flags=re.MULTILINE)
+        return f"This is a stub answer to: {question[-1] if question else prompt[-200:]}"
+
+    async def ainvoke(self, prompt: str, **kwargs: Any) -> str:
+        return self._respond(prompt)
+
+    async def astream(self, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        for token in re.findall(r"\s*\S+", self._respond(prompt)):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
+
+
+class LLMError(RuntimeError):
+    """Raised when a completion fails after its retries, or waits too long for a slot"""
+
+
+# Worth retrying: request timeout, conflict, rate limit and transient server errors
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+def backoff_delay(attempt: int, base: float = LLM_RETRY_BASE_SECONDS, cap: float = LLM_RETRY_MAX_SECONDS) -> float:
+    """Full-jitter exponential backoff, so retrying workers don't hit the provider in lockstep"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AsyncLLMClient:
+    """Non-blocking client for an OpenAI-compatible completions endpoint
+
+    One httpx.AsyncClient is shared by every request, so connections are
+    pooled and kept alive instead of opened per message. A semaphore caps the
+    generations in flight; each request gets connect/read timeouts and is
+    retried on transient failures. Streams are only retried before their
+    first token.
+    """
+
+    def __init__(self, base_url: str = LLM_BASE_URL, api_key: Optional[str] = OPENAI_API_KEY,
+                 model: str = LLM_MODEL, max_tokens: int = LLM_MAX_TOKENS, timeout: float = LLM_TIMEOUT,
+                 connect_timeout: float = LLM_CONNECT_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 retry_base: float = LLM_RETRY_BASE_SECONDS, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT, max_connections: int = LLM_MAX_CONNECTIONS,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.max_tokens = max_tokens
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_connections = max_connections
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._stats = {"requests": 0, "retries": 0, "failures": 0, "rejected": 0, "in_flight": 0, "waiting": 0}
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Hold one of the max_concurrency generation slots"""
+        self._stats["waiting"] += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._stats["rejected"] += 1
+            raise LLMError(f"No generation slot free after {self.queue_timeout}s")
+        finally:
+            self._stats["waiting"] -= 1
+        self._stats["in_flight"] += 1
+        try:
+            yield
+        finally:
+            self._stats["in_flight"] -= 1
+            self._semaphore.release()
+
+    def _payload(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "max_tokens": self.max_tokens,
+            "temperature": 0,
+            "stream": stream,
+        }
+
+    async def _send(self, payload: Dict[str, Any]) -> httpx.Response:
+        """POST a completion request, retrying transient failures
+
+        The response is returned unread with a successful status; callers
+        must close it.
+        """
+        client = self._http()
+        self._stats["requests"] += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.send(client.build_request("POST", "/completions", json=payload), stream=True)
+            except httpx.TransportError as e:
+                error = LLMError(f"Completion request failed: {e!r}")
+            else:
+                if response.status_code < 400:
+                    return response
+                body = (await response.aread()).decode(errors="replace")
+                await response.aclose()
+                error = LLMError(f"Completion request failed with {response.status_code}: {body[:200]}")
+                if response.status_code not in RETRY_STATUSES:
+                    self._stats["failures"] += 1
+                    raise error
+
+            if attempt == self.max_retries:
+                self._stats["failures"] += 1
+                raise error
+            self._stats["retries"] += 1
+            delay = backoff_delay(attempt, self.retry_base)
+            logger.warning(f"{error}; retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+    async def ainvoke(self, prompt: str, **kwargs: Any) -> str:
+        async with self._slot():
+            response = await self._send(self._payload(prompt, stream=False))
+            try:
+                data = json.loads(await response.aread())
+            except httpx.TransportError as e:
+                self._stats["failures"] += 1
+                raise LLMError(f"Completion response was interrupted: {e!r}") from e
+            finally:
+                await response.aclose()
+        return data["choices"][0]["text"]
+
+    async def astream(self, prompt: str, **kwargs: Any) -> AsyncIterator[str]:
+        async with self._slot():
+            response = await self._send(self._payload(prompt, stream=True))
+            try:
+                # Server-Sent Events: "data: {...}" lines, ended by "data: [DONE]"
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    text = json.loads(data)["choices"][0].get("text")
+                    if text:
+                        yield text
+            except httpx.TransportError as e:
+                self._stats["failures"] += 1
+                raise LLMError(f"Completion stream was interrupted: {e!r}") from e
+            finally:
+                await response.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "max_concurrency": self.max_concurrency}
+
+
+def get_llm():
+    """Get or initialize the completion model used for answers"""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                if LLM_PROVIDER == "stub":
+                    _llm = StubLLM()
+                elif LLM_PROVIDER == "openai":
+                    _llm = AsyncLLMClient()
+                else:
+                    raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}', expected 'openai' or 'stub'")
+    return _llm
+
+
+async def close_llm() -> None:
+    """Close pooled provider connections, e.g. on shutdown"""
+    if isinstance(_llm, AsyncLLMClient):
+        await _llm.aclose()
+
+
+def llm_client_stats() -> Dict[str, Any]:
+    return _llm.stats() if isinstance(_llm, AsyncLLMClient) else {}
+
+
+class GenerationStats:
+    """Time-to-first-token and total generation time of streamed answers"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._first_token = deque(maxlen=window)
+        self._total = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._streams = 0
+
+    def record(self, first_token_seconds: Optional[float], total_seconds: float) -> None:
+        with self._lock:
+            self._streams += 1
+            if first_token_seconds is not None:
+                self._first_token.append(first_token_seconds)
+            self._total.append(total_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            first_token, total, streams = list(self._first_token), list(self._total), self._streams
+
+        def percentiles(values):
+            if not values:
+                return {f"p{pct}": 0.0 for pct in (50, 90, 95, 99)}
+            return {
+                f"p{pct}": round(float(value) * 1000, 3)
+                for pct, value in zip((50, 90, 95, 99), np.percentile(values, [50, 90, 95, 99]))
+            }
+
+        return {
+            "streams": streams,
+            "first_token_ms": percentiles(first_token),
+            "total_ms": percentiles(total),
+        }
+
+
+generation_stats = GenerationStats()
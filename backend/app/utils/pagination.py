@@ -0,0 +1,64 @@
+import base64
+import os
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+# Configuration
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50").split()[0])
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200").split()[0])
+
+# List endpoints keep returning plain lists; the cursor for the next page travels in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just past a row"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception:
+        raise InvalidCursor(f"Invalid cursor '{cursor}'")
+
+
+def paginate(query: Query, created_at_column: Any, id_column: Any, cursor: Optional[str] = None,
+             limit: int = DEFAULT_PAGE_SIZE, descending: bool = True) -> Tuple[List[Any], Optional[str]]:
+    """One page of a query by keyset on (created_at, id)
+
+    The cursor is the position of the last row returned, so each page is a
+    range scan on a (created_at, id) index: no OFFSET, and the cost of a
+    page does not depend on how far into the list it is. Rows must expose
+    ``created_at`` and ``id``.
+
+    Raises:
+        InvalidCursor: If ``cursor`` is malformed
+
+    Returns:
+        The rows of the page and the cursor of the next one, or None on the last page
+    """
+    key = tuple_(created_at_column, id_column)
+    if cursor:
+        position = tuple_(*decode_cursor(cursor))
+        query = query.filter(key < position if descending else key > position)
+    if descending:
+        query = query.order_by(created_at_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_at_column.asc(), id_column.asc())
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.id)
@@ -0,0 +1,170 @@
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+import pdfplumber
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Configuration
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)).split()[0])
+# Pages handed to a worker at a time; also bounds how much text is held in memory
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16").split()[0])
+
+# Extraction process pools keyed by worker count, created on first use
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Get or create the extraction process pool for a worker count"""
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # Spawn rather than fork: the parent runs DB and model threads
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pools[workers] = pool
+        return pool
+
+
+def _worker_ready() -> int:
+    # Unpickling this function imports the module, and pdfplumber with it
+    return os.getpid()
+
+
+def warm_pool(workers: Optional[int] = None) -> None:
+    """Start every process of an extraction pool ahead of the first document"""
+    workers = workers or PDF_EXTRACT_WORKERS
+    if workers <= 1:
+        return
+    pool = _get_pool(workers)
+    # One concurrent task per worker makes the pool spawn all of them
+    for future in [pool.submit(_worker_ready) for _ in range(workers)]:
+        future.result()
+
+
+def get_page_count(file_path: str) -> int:
+    """Get the number of pages in a PDF"""
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract text for pages [start, stop) of a PDF
+
+    Runs inside a pool worker, which opens the file itself so only the
+    extracted text crosses the process boundary.
+    """
+    pages = []
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            pages.append(page.extract_text() or "")
+            # Drop parsed layout objects as soon as the page is done
+            page.flush_cache()
+    return pages
+
+
+def iter_pdf_pages(
+    file_path: str,
+    workers: Optional[int] = None,
+    pages_per_task: Optional[int] = None
+) -> Iterator[str]:
+    """Yield the text of each PDF page, in page order
+
+    Page ranges are extracted in parallel on a process pool. At most two
+    ranges per worker are in flight, so memory stays bounded on large PDFs.
+    """
+    workers = workers or PDF_EXTRACT_WORKERS
+    pages_per_task = pages_per_task or PDF_PAGES_PER_TASK
+    page_count = get_page_count(file_path)
+
+    if workers <= 1 or page_count <= pages_per_task:
+        with pdfplumber.open(file_path) as pdf:
+            for page in pdf.pages:
+                yield page.extract_text() or ""
+                page.flush_cache()
+        return
+
+    ranges = iter(
+        (start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    )
+    pool = _get_pool(workers)
+    pending = deque()
+
+    def submit_next() -> None:
+        page_range = next(ranges, None)
+        if page_range is not None:
+            pending.append(pool.submit(extract_page_range, file_path, *page_range))
+
+    for _ in range(workers * 2):
+        submit_next()
+
+    try:
+        while pending:
+            # Results are consumed in submission order, which is page order
+            pages = pending.popleft().result()
+            submit_next()
+            yield from pages
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def extract_text_from_pdf(file_path: str, workers: Optional[int] = None) -> List[str]:
+    """Extract text from PDF, return list of pages"""
+    try:
+        pages = list(iter_pdf_pages(file_path, workers=workers))
+    except Exception:
+        logger.exception(f"Error extracting text from {file_path}")
+        pages = []
+    return pages
+
+
+def iter_chunks(text_pages: Iterable[str], chunk_size: int = 1000, overlap: int = 200) -> Iterator[dict]:
+    """Yield chunks of page text as pages arrive, with page tracking
+
+    Produces exactly the same chunks and chunk indexes as ``chunk_text``
+    without holding the whole document in memory.
+    """
+    chunk_index = 0
+    for page_num, page_text in enumerate(text_pages):
+        if not page_text.strip():
+            continue
+
+        # Split text into chunks
+        words = page_text.split()
+        for i in range(0, len(words), chunk_size - overlap):
+            chunk_words = words[i:i + chunk_size]
+            if chunk_words:
+                yield {
+                    "content": " ".join(chunk_words),
+                    "page_number": page_num + 1,  # 1-based page numbering
+                    "chunk_index": chunk_index
+                }
+                chunk_index += 1
+
+
+def chunk_text(text_pages: List[str], chunk_size: int = 1000, overlap: int = 200) -> List[dict]:
+    """Chunk text into smaller pieces with page tracking"""
+    return list(iter_chunks(text_pages, chunk_size, overlap))
+
+
+def batched(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """Group an iterable into lists of at most ``batch_size`` items"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
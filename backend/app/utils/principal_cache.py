@@ -0,0 +1,72 @@
+import os
+from typing import Any, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from ..models.user import User
+from .ttl_cache import TTLCache
+
+# Configuration
+# Seconds a cached principal is trusted; bounds how long other workers can
+# miss a deactivation or token revocation
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60").split()[0])
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000").split()[0])
+
+
+class Principal:
+    """The authenticated user as most endpoints need it: no profile, no session"""
+
+    __slots__ = ("id", "email", "is_active", "token_version")
+
+    def __init__(self, id: int, email: str, is_active: bool, token_version: int):
+        self.id = id
+        self.email = email
+        self.is_active = is_active
+        self.token_version = token_version
+
+
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+
+
+def load_principal(db: Session, condition: Any) -> Optional[Principal]:
+    """Read a principal's columns, and only those, for the user matching ``condition``"""
+    row = db.query(User.id, User.email, User.is_active, User.token_version).filter(condition).first()
+    if row is None:
+        return None
+    principal = Principal(row.id, row.email, bool(row.is_active), row.token_version or 0)
+    principal_cache.set(principal.id, principal)
+    return principal
+
+
+def invalidate_principal(user_id: int) -> None:
+    principal_cache.pop(user_id)
+
+
+# Session.info key collecting users whose principal changed in the current transaction
+_CHANGED_USERS = "principal_cache.changed_users"
+
+
+@event.listens_for(User, "after_update")
+def _record_changed_user(mapper, connection, target):
+    """Note a deactivated, revoked or edited user, to be dropped from the cache once the transaction ends
+
+    Invalidating here, at flush time, would let a concurrent request re-cache
+    the old row before the change is committed.
+    """
+    state = inspect(target)
+    if any(state.attrs[name].history.has_changes()
+           for name in ("is_active", "token_version", "email", "preferences")):
+        state.session.info.setdefault(_CHANGED_USERS, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_changed_users(session):
+    """Drop the principals changed in the transaction that just ended
+
+    After a rollback the cache may hold a principal loaded from the
+    uncommitted change in this session, so those are dropped too.
+    """
+    for user_id in session.info.pop(_CHANGED_USERS, ()):
+        invalidate_principal(user_id)
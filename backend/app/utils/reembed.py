@@ -0,0 +1,147 @@
+import logging
+from typing import Any, Callable, Optional, Tuple
+
+from sqlalchemy import bindparam, column as sql_column, select, table, text, update
+from sqlalchemy.orm import Session
+
+from ..database.indexes import vector_index_name
+from ..database.session import engine
+from ..database.vector import EMBEDDING_COLUMN, EMBEDDING_COLUMNS, Vector
+from .embedding_store import remove_column_stores
+from .embeddings import encode_cached, get_column_dimension
+
+logger = logging.getLogger(__name__)
+
+
+def target_column(live: str = EMBEDDING_COLUMN) -> str:
+    """The embedding column a new model is written to: whichever one is not live"""
+    return next(name for name in EMBEDDING_COLUMNS if name != live)
+
+
+def column_model(db: Session, column: str) -> Optional[str]:
+    """Cache key of the model an embedding column was filled with, from its comment"""
+    return db.execute(
+        text(
+            """
+            SELECT col_description(attrelid, attnum) FROM pg_attribute
+            WHERE attrelid = to_regclass('document_chunk') AND attname = :column AND NOT attisdropped
+            """
+        ),
+        {"column": column}
+    ).scalar()
+
+
+def prepare_column(db: Session, column: str, dim: int, cache_key: str) -> None:
+    """Add the column new-model embeddings are written to, or check a resumed one
+
+    The column is tagged with the model's cache key, so re-running the job
+    resumes its backfill while leftover vectors from another model are
+    refused rather than mixed in.
+    """
+    existing_dim = get_column_dimension(db, column)
+    if existing_dim is not None:
+        existing_model = column_model(db, column)
+        if existing_dim != dim or existing_model != cache_key:
+            raise ValueError(
+                f"{column} already holds vector({existing_dim}) embeddings from "
+                f"{existing_model or 'an untagged model'}; drop it before re-embedding with {cache_key}"
+            )
+        return
+    if column == EMBEDDING_COLUMN:
+        raise ValueError(f"{column} is the live embedding column and does not exist; check EMBEDDING_COLUMN")
+
+    db.execute(text(f"ALTER TABLE document_chunk ADD COLUMN IF NOT EXISTS {column} vector({dim})"))
+    # COMMENT takes a literal, not a bind parameter
+    quoted_key = cache_key.replace("'", "''")
+    db.execute(text(f"COMMENT ON COLUMN document_chunk.{column} IS '{quoted_key}'"))
+    db.commit()
+    # Stores copied from an earlier use of this column hold another model's vectors
+    remove_column_stores(column)
+
+
+def _fill_batch(db: Session, model: Any, cache_key: str, column: str, after_id: int,
+                batch_size: int) -> Tuple[Optional[int], int]:
+    """Embed one batch of chunks missing an embedding in ``column``
+
+    Returns:
+        Last chunk id in the batch (None when nothing was left) and the batch size
+    """
+    chunks = table("document_chunk", sql_column("id"), sql_column("content"), sql_column(column))
+    target = chunks.c[column]
+    rows = db.execute(
+        select(chunks.c.id, chunks.c.content)
+        .where(chunks.c.id > after_id, target.is_(None))
+        .order_by(chunks.c.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return None, 0
+
+    embeddings = encode_cached(model, cache_key, [row.content for row in rows])
+    db.execute(
+        update(chunks)
+        .where(chunks.c.id == bindparam("chunk_id"))
+        .values({column: bindparam("embedding", type_=Vector(embeddings.shape[1]))}),
+        [{"chunk_id": row.id, "embedding": embedding} for row, embedding in zip(rows, embeddings)]
+    )
+    return rows[-1].id, len(rows)
+
+
+def backfill_column(db: Session, model: Any, cache_key: str, column: str, batch_size: int = 256,
+                    on_batch: Optional[Callable[[int], None]] = None) -> int:
+    """Embed every chunk missing an embedding in ``column``, one committed batch at a time
+
+    Nothing is locked beyond the rows of the batch being written, so reads
+    and ingestion carry on throughout. The job is resumable: chunks that
+    already have an embedding are skipped, which also makes it the catch-up
+    pass for chunks ingested by workers still on the previous model.
+
+    Returns:
+        Number of chunks embedded
+    """
+    total = 0
+    last_id = 0
+    while True:
+        last_id, embedded = _fill_batch(db, model, cache_key, column, last_id, batch_size)
+        if last_id is None:
+            return total
+        db.commit()
+        total += embedded
+        if on_batch:
+            on_batch(total)
+
+
+def build_column_index(column: str) -> None:
+    """Build an index on ``column`` matching the live one, without blocking writes"""
+    live_name = vector_index_name(EMBEDDING_COLUMN)
+    if column == EMBEDDING_COLUMN:
+        return
+    with engine.connect() as conn:
+        indexdef = conn.execute(
+            text("SELECT indexdef FROM pg_indexes WHERE indexname = :name"),
+            {"name": live_name}
+        ).scalar()
+    if indexdef is None:
+        logger.warning(f"No {live_name} to mirror; {column} will be unindexed")
+        return
+
+    column_indexdef = (
+        indexdef
+        .replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+        .replace(f" {live_name} ", f" {vector_index_name(column)} ", 1)
+        .replace(f"({EMBEDDING_COLUMN} ", f"({column} ", 1)
+    )
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(column_indexdef))
+
+
+def drop_column(db: Session, column: str) -> None:
+    """Drop a previous model's embeddings, with their index and stores, once no deploy reads them"""
+    if column == EMBEDDING_COLUMN:
+        raise ValueError(f"{column} is the live embedding column")
+    if column not in EMBEDDING_COLUMNS:
+        raise ValueError(f"{column} is not an embedding column")
+    db.execute(text(f"ALTER TABLE document_chunk DROP COLUMN IF EXISTS {column}"))
+    db.commit()
+    remove_column_stores(column)
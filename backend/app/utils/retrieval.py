@@ -0,0 +1,242 @@
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sqlalchemy.orm import Session
+
+from ..models.document import Document, DocumentChunk
+from .answer_cache import ANSWER_CACHE_ENABLED, answer_cache, document_version
+from .conversation_memory import format_lines
+from .embeddings import embed_query_async, search_similar_chunks
+from .hybrid_search import hybrid_search
+from .llm import get_llm
+from .ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Chunks retrieved as context for each answer
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3").split()[0])
+# "hybrid" fuses full-text and vector rankings, "vector" uses similarity alone
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").split()[0].lower()
+RETRIEVAL_ENGINE_CACHE_SIZE = int(os.getenv("RETRIEVAL_ENGINE_CACHE_SIZE", "256").split()[0])
+RETRIEVAL_ENGINE_TTL = float(os.getenv("RETRIEVAL_ENGINE_TTL", "900").split()[0])
+
+QA_PROMPT = """Use the following excerpts from "{title}" to answer the question at the end. \
+If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+{history}Question: {question}
+Helpful Answer:"""
+
+
+class DocumentNotSearchable(LookupError):
+    """Raised when a document has no chunks to answer from"""
+
+
+def format_context(sources: Sequence[Dict[str, Any]]) -> str:
+    return "\n\n".join(f"[Page {source['page_number'] or '?'}] {source['content']}" for source in sources)
+
+
+def format_history(history: Sequence[Tuple[str, str]], summary: Optional[str] = None) -> str:
+    """Render a conversation summary and recent (role, content) pairs for the prompt
+
+    Both are already bounded by the conversation memory's token budgets.
+    """
+    parts = []
+    if summary:
+        parts.append(f"Summary of the earlier conversation:\n{summary}\n\n")
+    if history:
+        parts.append("Conversation so far:\n" + format_lines(history) + "\n\n")
+    return "".join(parts)
+
+
+def citations_from_sources(sources: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Message citations for the chunks an answer was based on"""
+    return [
+        {"page": source["page_number"] or "Unknown", "text": source["content"][:100] + "..."}
+        for source in sources
+    ]
+
+
+class PendingAnswer:
+    """A question that is ready to be answered, returned by RetrievalEngine.begin
+
+    ``cached`` holds the result of a near-identical earlier question when
+    the answer cache had one. Otherwise the answer is generated from
+    ``prompt`` and passed to finish(). ``sources`` is set either way.
+    """
+
+    def __init__(self, engine: "RetrievalEngine", cache_key: Optional[tuple], query_embedding: np.ndarray,
+                 sources: List[Dict[str, Any]], prompt: Optional[str] = None,
+                 cached: Optional[Dict[str, Any]] = None):
+        self.engine = engine
+        self.cache_key = cache_key
+        self.query_embedding = query_embedding
+        self.sources = sources
+        self.prompt = prompt
+        self.cached = cached
+
+    def finish(self, answer: str) -> Dict[str, Any]:
+        """Result for the generated answer, stored in the answer cache when it may be shared"""
+        return self.engine.remember(self.cache_key, self.query_embedding, answer, self.sources)
+
+
+class RetrievalEngine:
+    """Answers questions about one document from its stored chunk embeddings
+
+    Nothing is rebuilt per message: each question costs one query embedding,
+    one search over document_chunk and one completion call.
+    """
+
+    def __init__(self, document_id: int, title: str, k: int = RETRIEVAL_TOP_K, mode: str = RETRIEVAL_MODE):
+        self.document_id = document_id
+        self.title = title
+        self.k = k
+        self.mode = mode
+
+    async def retrieve(self, db: Session, question: str,
+                       query_embedding: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """The ``k`` chunks most relevant to a question"""
+        if query_embedding is None:
+            query_embedding = await embed_query_async(question)
+        if self.mode == "hybrid":
+            return hybrid_search(db, question, query_embedding, limit=self.k, document_id=self.document_id)
+        return search_similar_chunks(
+            question, db, document_id=self.document_id, limit=self.k, query_embedding=query_embedding
+        )
+
+    def build_prompt(self, question: str, sources: Sequence[Dict[str, Any]],
+                     history: Sequence[Tuple[str, str]] = (), summary: Optional[str] = None) -> str:
+        return QA_PROMPT.format(
+            title=self.title,
+            context=format_context(sources),
+            history=format_history(history, summary),
+            question=question,
+        )
+
+    async def prepare(self, db: Session, question: str, prompt_question: Optional[str] = None,
+                      history: Sequence[Tuple[str, str]] = (), query_embedding: Optional[np.ndarray] = None,
+                      summary: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+        """Retrieve context for a question and build the answer prompt
+
+        Args:
+            db: Database session
+            question: The student's question, used for retrieval
+            prompt_question: Question as put to the model, e.g. with learning
+                preferences appended; defaults to ``question``
+            history: Recent (role, content) messages of the conversation
+            query_embedding: Embedding of ``question``, if already computed
+            summary: Summary of the conversation before ``history``
+
+        Returns:
+            The prompt and the chunks it was built from
+        """
+        sources = await self.retrieve(db, question, query_embedding)
+        return self.build_prompt(prompt_question or question, sources, history, summary), sources
+
+    def cache_key(self, db: Session, preferences: Optional[Hashable],
+                  history: Sequence[Tuple[str, str]] = ()) -> Optional[tuple]:
+        """Answer cache scope for a question, or None when its answer must not be shared
+
+        Only opening questions are cached: a follow-up such as "explain that
+        again" means something different in every conversation. ``history``
+        is never empty once a conversation has earlier messages.
+        """
+        if not ANSWER_CACHE_ENABLED or preferences is None or history:
+            return None
+        version = document_version(db, self.document_id)
+        return None if version is None else (self.document_id, version, preferences)
+
+    def remember(self, cache_key: Optional[tuple], query_embedding: np.ndarray, answer: str,
+                 sources: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build an answer result, storing it in the answer cache when ``cache_key`` is set"""
+        result = {
+            "answer": answer.strip(),
+            "sources": list(sources),
+            "citations": citations_from_sources(sources),
+        }
+        if cache_key is not None:
+            answer_cache.store(*cache_key, query_embedding, result)
+        return result
+
+    async def begin(self, db: Session, question: str, prompt_question: Optional[str] = None,
+                    history: Sequence[Tuple[str, str]] = (), preferences: Optional[Hashable] = None,
+                    summary: Optional[str] = None) -> PendingAnswer:
+        """Find a cached answer to a question, or retrieve its context and build the prompt
+
+        Arguments are as for prepare(); ``preferences`` identifies the answer
+        style for the semantic answer cache, which is skipped when it is None.
+        """
+        query_embedding = await embed_query_async(question)
+        cache_key = self.cache_key(db, preferences, history)
+        if cache_key is not None:
+            cached = answer_cache.lookup(*cache_key, query_embedding)
+            if cached is not None:
+                return PendingAnswer(self, cache_key, query_embedding, cached["sources"], cached=cached)
+
+        prompt, sources = await self.prepare(db, question, prompt_question, history, query_embedding, summary)
+        return PendingAnswer(self, cache_key, query_embedding, sources, prompt=prompt)
+
+    async def answer(self, db: Session, question: str, prompt_question: Optional[str] = None,
+                     history: Sequence[Tuple[str, str]] = (), preferences: Optional[Hashable] = None,
+                     summary: Optional[str] = None) -> Dict[str, Any]:
+        """Answer a question, reusing the answer to a near-identical earlier one if possible
+
+        Arguments are as for begin().
+
+        Returns:
+            The answer, the chunks it was based on, their citations and
+            whether it came from the cache
+        """
+        pending = await self.begin(db, question, prompt_question, history, preferences, summary)
+        if pending.cached is not None:
+            return {**pending.cached, "cached": True}
+
+        answer = await get_llm().ainvoke(pending.prompt)
+        return {**pending.finish(answer), "cached": False}
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Answer tokens for a prepared prompt as the model generates them"""
+        async for token in get_llm().astream(prompt):
+            yield token
+
+
+_engines = TTLCache(RETRIEVAL_ENGINE_CACHE_SIZE, RETRIEVAL_ENGINE_TTL)
+
+
+def get_retrieval_engine(db: Session, document_id: int) -> RetrievalEngine:
+    """Cached engine for a document
+
+    Raises:
+        DocumentNotSearchable: If the document has no chunks
+    """
+    engine = _engines.get(document_id)
+    if engine is not None:
+        return engine
+
+    document = db.query(Document.title, Document.chunk_owner_id.label("owner_id")).filter(
+        Document.id == document_id
+    ).first()
+    has_chunks = document is not None and db.query(DocumentChunk.id).filter(
+        DocumentChunk.document_id == document.owner_id
+    ).first() is not None
+    if not has_chunks:
+        raise DocumentNotSearchable("No chunks found for this document")
+
+    engine = RetrievalEngine(document_id, document.title)
+    _engines.set(document_id, engine)
+    return engine
+
+
+def invalidate_retrieval_engine(document_id: int) -> None:
+    """Drop a document's engine and cached answers, e.g. after it was deleted"""
+    _engines.pop(document_id)
+    answer_cache.invalidate(document_id)
+
+
+def retrieval_engine_stats() -> Dict[str, Any]:
+    return _engines.stats()
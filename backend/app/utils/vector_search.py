@@ -0,0 +1,240 @@
+import logging
+import math
+import os
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from ..database.indexes import HNSW_EF_SEARCH, IVFFLAT_PROBES, apply_search_params
+from ..database.vector import EMBEDDING_COLUMN, encode_vector_text
+from ..models.document import Document, DocumentChunk
+from .document_index import document_index
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+# Scopes with at most this many chunks are scored exactly instead of through the ANN index
+EXACT_SEARCH_MAX_CHUNKS = int(os.getenv("EXACT_SEARCH_MAX_CHUNKS", "5000").split()[0])
+# Extra candidates a filtered index scan requests on top of the scope's share of the table
+SEARCH_OVERFETCH = float(os.getenv("SEARCH_OVERFETCH", "2").split()[0])
+# pgvector >= 0.8 can keep scanning the HNSW graph until enough rows pass the filter:
+# "strict_order" or "relaxed_order"; empty leaves it off
+HNSW_ITERATIVE_SCAN = os.getenv("HNSW_ITERATIVE_SCAN", "").strip()
+# pgvector's upper bound for hnsw.ef_search
+MAX_EF_SEARCH = 1000
+# "memory" answers document-scoped searches from the in-process DocumentVectorIndex,
+# "postgres" always queries the database
+VECTOR_SEARCH_BACKEND = os.getenv("VECTOR_SEARCH_BACKEND", "memory").split()[0].lower()
+
+STRATEGY_MEMORY = "memory"
+STRATEGY_EXACT = "exact"
+STRATEGY_FILTERED_INDEX = "filtered_index"
+STRATEGY_INDEX = "index"
+
+RESULT_COLUMNS = "dc.id, dc.content, dc.page_number, d.title AS document_title, d.id AS document_id"
+
+# Strategy usage for this worker process, reported by /health/metrics
+_strategy_counts: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def scope_filter(document_id: Optional[int], user_id: Optional[int]) -> Tuple[str, str, Dict[str, Any]]:
+    """SQL restricting a search to its scope
+
+    Documents sharing another's chunks (Document.chunks_from_id) search
+    those chunk rows but are still reported as the results' document.
+
+    Returns:
+        A condition on ``dc`` (document_chunk), the join that names each
+        result's document ``d``, and their parameters
+    """
+    if document_id is not None:
+        return (
+            "dc.document_id = (SELECT COALESCE(chunks_from_id, id) FROM document WHERE id = :document_id)",
+            "JOIN document d ON d.id = :document_id",
+            {"document_id": document_id},
+        )
+    if user_id is not None:
+        return (
+            "dc.document_id IN (SELECT COALESCE(chunks_from_id, id) FROM document WHERE user_id = :user_id)",
+            "JOIN document d ON d.user_id = :user_id AND COALESCE(d.chunks_from_id, d.id) = dc.document_id",
+            {"user_id": user_id},
+        )
+    return "TRUE", "JOIN document d ON d.id = dc.document_id", {}
+
+
+def scope_size(db: Session, document_id: Optional[int] = None, user_id: Optional[int] = None) -> Optional[int]:
+    """Number of chunks in the search scope, or None for an unscoped search
+
+    Read from Document.chunk_count, falling back to counting rows for
+    documents ingested before chunk counts were recorded.
+    """
+    if document_id is not None:
+        size = db.query(Document.chunk_count).filter(Document.id == document_id).scalar()
+        if size is None:
+            owner = db.query(Document.chunk_owner_id).filter(Document.id == document_id).scalar_subquery()
+            size = db.query(func.count(DocumentChunk.id)).filter(DocumentChunk.document_id == owner).scalar()
+        return size
+    if user_id is not None:
+        return db.query(func.coalesce(func.sum(Document.chunk_count), 0)).filter(Document.user_id == user_id).scalar()
+    return None
+
+
+def _rows_to_chunks(rows) -> List[Dict[str, Any]]:
+    return [
+        {
+            "id": row.id,
+            "content": row.content,
+            "page_number": row.page_number,
+            "document_title": row.document_title,
+            "document_id": row.document_id,
+            "similarity": float(row.similarity)
+        }
+        for row in rows
+    ]
+
+
+def exact_search(db: Session, embedding: str, limit: int, scope: str, join: str,
+                 params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Score every chunk in scope and return the true top ``limit``
+
+    The MATERIALIZED CTE keeps the planner from pushing the ORDER BY into
+    the ANN index, so the scope is read through the document_id index and
+    scored directly. Only the winning rows are joined back for content.
+    """
+    sql = text(
+        f"""
+        WITH scored AS MATERIALIZED (
+            SELECT dc.id, dc.{EMBEDDING_COLUMN} <=> CAST(:embedding AS vector) AS distance
+            FROM document_chunk dc
+            WHERE {scope} AND dc.{EMBEDDING_COLUMN} IS NOT NULL
+        ), nearest AS (
+            SELECT id, distance FROM scored ORDER BY distance LIMIT :limit
+        )
+        SELECT {RESULT_COLUMNS}, 1 - n.distance AS similarity
+        FROM nearest n
+        JOIN document_chunk dc ON dc.id = n.id
+        {join}
+        ORDER BY n.distance
+        """
+    )
+    return _rows_to_chunks(db.execute(sql, {**params, "embedding": embedding, "limit": limit}))
+
+
+def index_search(db: Session, embedding: str, limit: int, scope: str, join: str, params: Dict[str, Any],
+                 ef_search: Optional[int] = None, probes: Optional[int] = None,
+                 iterative_scan: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Approximate search through the embedding index with the scope as a filter"""
+    sql = text(
+        f"""
+        SELECT {RESULT_COLUMNS}, 1 - (dc.{EMBEDDING_COLUMN} <=> CAST(:embedding AS vector)) AS similarity
+        FROM document_chunk dc
+        {join}
+        WHERE dc.{EMBEDDING_COLUMN} IS NOT NULL AND {scope}
+        ORDER BY dc.{EMBEDDING_COLUMN} <=> CAST(:embedding AS vector)
+        LIMIT :limit
+        """
+    )
+    apply_search_params(db, ef_search=ef_search, probes=probes, limit=limit, iterative_scan=iterative_scan)
+    return _rows_to_chunks(db.execute(sql, {**params, "embedding": embedding, "limit": limit}))
+
+
+def _estimated_rows(db: Session) -> int:
+    """Planner estimate of the document_chunk row count; cheap, unlike COUNT(*)"""
+    estimate = db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass('document_chunk')")
+    ).scalar()
+    return max(int(estimate or 0), 0)
+
+
+def _overfetch_factor(db: Session, size: int) -> float:
+    """How many index candidates per wanted row a filter keeping ``size`` rows needs"""
+    total = _estimated_rows(db)
+    if not total or size >= total:
+        return 1.0
+    return total / max(size, 1) * SEARCH_OVERFETCH
+
+
+def filtered_scan_params(db: Session, size: int, limit: int, ef_search: Optional[int] = None,
+                         probes: Optional[int] = None) -> Dict[str, Any]:
+    """apply_search_params arguments for an index scan filtered down to ``size`` rows"""
+    factor = _overfetch_factor(db, size)
+    return {
+        "ef_search": min(MAX_EF_SEARCH, max(ef_search or HNSW_EF_SEARCH, math.ceil(limit * factor))),
+        "probes": min(MAX_EF_SEARCH, math.ceil((probes or IVFFLAT_PROBES) * factor)),
+        "iterative_scan": HNSW_ITERATIVE_SCAN or None,
+    }
+
+
+def choose_strategy(size: Optional[int]) -> str:
+    """Exact scoring for small scopes, filtered index scans for large ones"""
+    if size is None:
+        return STRATEGY_INDEX
+    if size <= EXACT_SEARCH_MAX_CHUNKS:
+        return STRATEGY_EXACT
+    return STRATEGY_FILTERED_INDEX
+
+
+def search_chunks(db: Session, query_embedding: np.ndarray, limit: int = 5, document_id: Optional[int] = None,
+                  user_id: Optional[int] = None, ef_search: Optional[int] = None, probes: Optional[int] = None,
+                  strategy: Optional[str] = None, backend: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Top-``limit`` chunks for an embedding, scoped to a document or a user's documents
+
+    Args:
+        db: Database session
+        query_embedding: Query vector
+        limit: Maximum number of results to return
+        document_id: Restrict to one document
+        user_id: Restrict to one user's documents (ignored when document_id is given)
+        ef_search: HNSW candidate list size for index scans
+        probes: IVFFlat lists to scan for index scans
+        strategy: Force "exact", "filtered_index" or "index" instead of choosing by scope size
+        backend: "memory" or "postgres"; defaults to VECTOR_SEARCH_BACKEND
+
+    Returns:
+        Chunks with document metadata, most similar first. Scoped searches
+        return ``limit`` results whenever the scope holds that many embedded chunks.
+    """
+    if (backend or VECTOR_SEARCH_BACKEND) == "memory" and document_id is not None and strategy is None:
+        chunks = document_index.search(db, document_id, query_embedding, limit)
+        if chunks is not None:
+            record_strategy(STRATEGY_MEMORY)
+            return chunks
+
+    embedding = encode_vector_text(query_embedding)
+    scope, join, params = scope_filter(document_id, user_id)
+    size = scope_size(db, document_id, user_id)
+    strategy = strategy or choose_strategy(size)
+
+    if strategy == STRATEGY_EXACT:
+        chunks = exact_search(db, embedding, limit, scope, join, params)
+    elif strategy == STRATEGY_FILTERED_INDEX:
+        chunks = index_search(
+            db, embedding, limit, scope, join, params,
+            **filtered_scan_params(db, size or 0, limit, ef_search, probes)
+        )
+        if size and len(chunks) < min(limit, size):
+            # The index ran out of candidates before enough passed the filter
+            logger.debug(f"Filtered index scan returned {len(chunks)} of {limit}; rescoring scope exactly")
+            strategy = STRATEGY_EXACT
+            chunks = exact_search(db, embedding, limit, scope, join, params)
+    else:
+        chunks = index_search(db, embedding, limit, scope, join, params, ef_search=ef_search, probes=probes)
+
+    record_strategy(strategy)
+    return chunks
+
+
+def record_strategy(strategy: str) -> None:
+    with _stats_lock:
+        _strategy_counts[strategy] += 1
+
+
+def search_stats() -> Dict[str, int]:
+    """How often each strategy served a search in this worker"""
+    with _stats_lock:
+        return dict(_strategy_counts)
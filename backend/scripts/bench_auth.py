@@ -0,0 +1,96 @@
+"""Measure authenticated request throughput with and without the principal cache
+
+Serves two no-op endpoints, one behind the cached principal dependency and
+one behind the full user lookup, and calls each from concurrent clients
+in-process with a token for an existing user. Reports requests per second,
+latency percentiles and database statements per request.
+
+Usage:
+    DATABASE_URL=postgresql://... JWT_SECRET=... python scripts/bench_auth.py --email student@example.com --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+
+import httpx
+import numpy as np
+from fastapi import Depends, FastAPI
+from sqlalchemy import event
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.api.v1.endpoints.auth import create_access_token, get_current_active_principal, get_current_active_user
+from app.database.session import SessionLocal, engine
+from app.models.user import User
+from app.utils.principal_cache import principal_cache
+
+app = FastAPI()
+
+
+@app.get("/principal")
+async def principal_noop(current_user=Depends(get_current_active_principal)):
+    return {"id": current_user.id}
+
+
+@app.get("/user")
+async def user_noop(current_user=Depends(get_current_active_user)):
+    return {"id": current_user.id}
+
+
+async def bench(path, token, requests, concurrency, statements):
+    limit = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up, so the principal is cached as it would be in steady state
+        (await client.get(path, headers=headers)).raise_for_status()
+
+        async def request():
+            async with limit:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                response.raise_for_status()
+                return time.perf_counter() - started
+
+        statements[0] = 0
+        started = time.perf_counter()
+        seconds = await asyncio.gather(*(request() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000
+    print(f"{path:<11} {requests / elapsed:8.1f} req/s   p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   "
+          f"p99 {p99:7.2f} ms   statements/request {statements[0] / requests:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--email", required=True, help="Email of an existing user")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == args.email).first()
+        if user is None:
+            parser.error(f"No user with email {args.email}")
+        token = create_access_token(
+            {"sub": user.email, "uid": user.id, "ver": user.token_version or 0}, timedelta(minutes=30)
+        )
+    finally:
+        db.close()
+
+    statements = [0]
+    event.listen(engine, "before_cursor_execute",
+                 lambda *a, **k: statements.__setitem__(0, statements[0] + 1))
+    asyncio.run(bench("/user", token, args.requests, args.concurrency, statements))
+    asyncio.run(bench("/principal", token, args.requests, args.concurrency, statements))
+    print(f"principal cache: {principal_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
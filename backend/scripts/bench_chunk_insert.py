@@ -0,0 +1,93 @@
+"""Benchmark document_chunk insertion paths
+
+Compares the per-row ORM path with bulk executemany and binary COPY, and
+reports rows/sec for each. Every run happens inside a transaction that is
+rolled back, so the database is left untouched.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_chunk_insert.py --rows 5000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.bulk import write_document_chunks
+from app.database.session import SessionLocal
+from app.models.document import Document, DocumentChunk
+from app.models.user import User
+
+
+def make_rows(count: int, dim: int):
+    rng = np.random.default_rng(0)
+    chunks = [
+        {
+            "content": " ".join(f"word{(i * 7 + j) % 5000}" for j in range(200)),
+            "page_number": i // 4 + 1,
+            "chunk_index": i,
+        }
+        for i in range(count)
+    ]
+    embeddings = rng.standard_normal((count, dim)).astype(np.float32)
+    return chunks, embeddings
+
+
+def orm_insert(db, document_id, chunks, embeddings):
+    """The original path: one DocumentChunk object per row"""
+    for chunk_data, embedding in zip(chunks, embeddings):
+        db.add(DocumentChunk(
+            content=chunk_data["content"],
+            page_number=chunk_data["page_number"],
+            chunk_index=chunk_data["chunk_index"],
+            document_id=document_id,
+            embedding=embedding
+        ))
+    db.flush()
+
+
+def run(name, writer, chunks, embeddings):
+    db = SessionLocal()
+    try:
+        user = User(email=f"bench-{time.time_ns()}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        document = Document(title="bench", file_path="bench.pdf", file_size=0, user_id=user.id)
+        db.add(document)
+        db.flush()
+
+        start = time.perf_counter()
+        writer(db, document.id, chunks, embeddings)
+        db.flush()
+        elapsed = time.perf_counter() - start
+
+        written = db.query(DocumentChunk).filter(DocumentChunk.document_id == document.id).count()
+        assert written == len(chunks), f"{name} wrote {written} of {len(chunks)} rows"
+        print(f"{name:<12} {len(chunks) / elapsed:10.0f} rows/sec  ({elapsed:.2f}s)")
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    dim = DocumentChunk.__table__.c.embedding.type.dim
+    chunks, embeddings = make_rows(args.rows, dim)
+    print(f"Inserting {args.rows} chunks with {dim}-dim embeddings")
+
+    run("orm", orm_insert, chunks, embeddings)
+    run("executemany", lambda db, doc_id, c, e: write_document_chunks(db, doc_id, c, e, method="executemany"),
+        chunks, embeddings)
+    run("copy", lambda db, doc_id, c, e: write_document_chunks(db, doc_id, c, e, method="copy"),
+        chunks, embeddings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Measure connection-setup overhead with and without connection pooling
+
+Runs the same short request (open a session, run a small query, close it)
+from concurrent workers against an unpooled engine and the pooled engine.
+Reports request latency percentiles and how many physical connections each
+one opened.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_db_connections.py --requests 500 --concurrency 20
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.session import DATABASE_URL, DB_CONNECT_TIMEOUT, pool_options
+
+QUERY = text("SELECT count(*) FROM pg_extension WHERE extname = 'vector'")
+
+
+def counted(engine):
+    opened = [0]
+    event.listen(engine, "connect", lambda *args: opened.__setitem__(0, opened[0] + 1))
+    return opened
+
+
+def report(label, seconds, elapsed, opened):
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000
+    print(f"{label:<8} {len(seconds) / elapsed:8.1f} req/s   p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   "
+          f"p99 {p99:7.2f} ms   connections opened {opened}")
+
+
+def bench_sync(label, engine, requests, concurrency):
+    opened = counted(engine)
+    factory = sessionmaker(bind=engine)
+
+    def request(_):
+        started = time.perf_counter()
+        db = factory()
+        try:
+            db.execute(QUERY).scalar()
+        finally:
+            db.close()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        seconds = list(pool.map(request, range(requests)))
+    report(label, seconds, time.perf_counter() - started, opened[0])
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    connect_args = {"connect_timeout": DB_CONNECT_TIMEOUT}
+    bench_sync("nullpool", create_engine(DATABASE_URL, poolclass=NullPool, connect_args=connect_args),
+               args.requests, args.concurrency)
+    bench_sync("pooled", create_engine(DATABASE_URL, connect_args=connect_args, **pool_options()),
+               args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
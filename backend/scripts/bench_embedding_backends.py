@@ -0,0 +1,71 @@
+"""Benchmark embedding backends on CPU
+
+Reports texts/sec and texts/sec per core for PyTorch, ONNX Runtime and
+int8-quantized ONNX Runtime, plus cosine agreement with PyTorch.
+
+Usage:
+    python scripts/bench_embedding_backends.py --texts 512 --threads 1 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.embedding_backends import OnnxBackend, SentenceTransformerBackend
+
+
+def make_texts(count: int):
+    words = "cell energy derivative integral theorem proof enzyme protein algorithm matrix vector".split()
+    return [
+        " ".join(words[(i * 3 + j) % len(words)] for j in range(20 + i % 60))
+        for i in range(count)
+    ]
+
+
+def measure(backend, texts, batch_size):
+    backend.encode(texts[:batch_size], batch_size=batch_size)  # Warm-up
+    start = time.perf_counter()
+    embeddings = backend.encode(texts, batch_size=batch_size)
+    return embeddings, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"))
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    import torch
+
+    texts = make_texts(args.texts)
+    with tempfile.TemporaryDirectory() as model_dir:
+        for threads in sorted(set(args.threads)):
+            torch.set_num_threads(threads)
+            reference, elapsed = measure(SentenceTransformerBackend(args.model), texts, args.batch_size)
+            results = [("torch", reference, elapsed)]
+            for quantize in (False, True):
+                backend = OnnxBackend(args.model, model_dir=model_dir, quantize=quantize, threads=threads)
+                embeddings, elapsed = measure(backend, texts, args.batch_size)
+                results.append(("onnx-int8" if quantize else "onnx", embeddings, elapsed))
+
+            for name, embeddings, elapsed in results:
+                agreement = np.sum(embeddings * reference, axis=1) / (
+                    np.linalg.norm(embeddings, axis=1) * np.linalg.norm(reference, axis=1)
+                )
+                rate = len(texts) / elapsed
+                print(
+                    f"threads={threads:<3} {name:<10} {rate:8.1f} texts/sec  "
+                    f"{rate / threads:8.1f} texts/sec/core  min cosine vs torch={agreement.min():.4f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Load-test the async LLM client against a completions endpoint
+
+Fires concurrent streamed completions and reports throughput, time to
+first token and total latency percentiles, plus retries and the peak
+number of generations in flight. Run it against scripts/mock_llm_server.py
+to measure client overhead without provider cost.
+
+Usage:
+    python scripts/mock_llm_server.py --port 8100 &
+    python scripts/bench_llm_client.py --base-url http://127.0.0.1:8100/v1 --requests 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.llm import LLM_MAX_CONCURRENCY, AsyncLLMClient
+
+
+def summarize(label, seconds):
+    p50, p95, p99 = np.percentile(seconds, [50, 95, 99]) * 1000
+    print(f"{label:<12} p50 {p50:8.1f} ms   p95 {p95:8.1f} ms   p99 {p99:8.1f} ms")
+
+
+async def run(args):
+    client = AsyncLLMClient(base_url=args.base_url, api_key=args.api_key or "test",
+                            max_concurrency=args.max_concurrency)
+    first_token, total, peak, errors = [], [], 0, 0
+
+    async def one(i):
+        nonlocal peak, errors
+        started = time.perf_counter()
+        first = None
+        try:
+            async for _ in client.astream(f"Question: benchmark {i}\nHelpful Answer:"):
+                if first is None:
+                    first = time.perf_counter() - started
+                peak = max(peak, client.stats()["in_flight"])
+        except Exception as e:
+            errors += 1
+            print(f"Request {i} failed: {e}")
+            return
+        first_token.append(first or 0.0)
+        total.append(time.perf_counter() - started)
+
+    queue = asyncio.Semaphore(args.concurrency)
+
+    async def limited(i):
+        async with queue:
+            await one(i)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(limited(i) for i in range(args.requests)))
+    finally:
+        await client.aclose()
+    elapsed = time.perf_counter() - started
+
+    stats = client.stats()
+    print(f"{len(total)} completions in {elapsed:.2f}s ({len(total) / elapsed:.1f}/s), {errors} failed")
+    print(f"retries {stats['retries']}, peak in flight {peak} (cap {stats['max_concurrency']})")
+    if total:
+        summarize("first token", first_token)
+        summarize("total", total)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8100/v1")
+    parser.add_argument("--api-key", default=os.getenv("OPENAI_API_KEY"))
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests issued at once by the benchmark")
+    parser.add_argument("--max-concurrency", type=int, default=LLM_MAX_CONCURRENCY,
+                        help="Client generation cap (LLM_MAX_CONCURRENCY)")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
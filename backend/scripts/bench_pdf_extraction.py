@@ -0,0 +1,95 @@
+"""Benchmark parallel PDF text extraction
+
+Generates a synthetic multi-hundred-page PDF and reports pages/sec for each
+worker count.
+
+Usage:
+    python scripts/bench_pdf_extraction.py --pages 400 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.pdf import iter_pdf_pages, warm_pool
+
+
+def write_synthetic_pdf(path: str, page_count: int, lines_per_page: int = 45) -> None:
+    """Write a plain-text PDF with the given number of pages"""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(b"")  # Filled in once the page tree exists
+    pages_id = add(b"")
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for page_num in range(page_count):
+        lines = [
+            f"Page {page_num + 1} line {line}: the quick brown fox jumps over the lazy dog {line * page_num}"
+            for line in range(lines_per_page)
+        ]
+        text_ops = "".join(f"({line}) Tj T* " for line in lines)
+        stream = f"BT /F1 10 Tf 12 TL 50 780 Td {text_ops}ET".encode()
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (pages_id, font_id, content_id)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+    objects[catalog_id - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for object_id, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (object_id, body))
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, catalog_id, xref_offset)
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--pages-per-task", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "synthetic.pdf")
+        write_synthetic_pdf(pdf_path, args.pages)
+        print(f"Synthetic PDF: {args.pages} pages, {os.path.getsize(pdf_path) / 1024:.0f} KiB")
+
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            # Start every pool process first so start-up is not counted
+            warm_pool(workers)
+
+            start = time.perf_counter()
+            pages = sum(1 for _ in iter_pdf_pages(pdf_path, workers=workers, pages_per_task=args.pages_per_task))
+            elapsed = time.perf_counter() - start
+
+            rate = pages / elapsed
+            baseline = baseline or rate
+            print(f"workers={workers:<3} pages={pages:<5} {rate:8.1f} pages/sec  speedup={rate / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
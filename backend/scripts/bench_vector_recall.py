@@ -0,0 +1,103 @@
+"""Benchmark recall@k and latency of the embedding index against exact search
+
+Query vectors are sampled from stored chunk embeddings. Ground truth comes
+from an exact scan with index scans disabled; each ef_search (HNSW) or
+probes (IVFFlat) setting is then measured against it.
+
+Usage:
+    DATABASE_URL=postgresql://... python scripts/bench_vector_recall.py --queries 100 -k 10
+    python scripts/bench_vector_recall.py --ef-search 10 20 40 80 160 --probes 1 5 10 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.indexes import apply_search_params, describe_vector_index
+from app.database.session import SessionLocal
+from app.database.vector import EMBEDDING_COLUMN
+
+NEAREST_SQL = text(
+    f"""
+    SELECT id FROM document_chunk
+    WHERE {EMBEDDING_COLUMN} IS NOT NULL
+    ORDER BY {EMBEDDING_COLUMN} <=> CAST(:embedding AS vector)
+    LIMIT :k
+    """
+)
+
+
+def sample_queries(db, count: int):
+    rows = db.execute(
+        text(f"SELECT {EMBEDDING_COLUMN}::text AS embedding FROM document_chunk WHERE {EMBEDDING_COLUMN} IS NOT NULL "
+             "ORDER BY random() LIMIT :count"),
+        {"count": count}
+    ).all()
+    return [row.embedding for row in rows]
+
+
+def search(db, queries, k, exact=False, **params):
+    """Run every query in its own transaction; returns (result id sets, latencies)"""
+    results, latencies = [], []
+    for embedding in queries:
+        if exact:
+            db.execute(text("SELECT set_config('enable_indexscan', 'off', true)"))
+        else:
+            apply_search_params(db, limit=k, **params)
+        start = time.perf_counter()
+        ids = db.execute(NEAREST_SQL, {"embedding": embedding, "k": k}).scalars().all()
+        latencies.append(time.perf_counter() - start)
+        db.rollback()
+        results.append(set(ids))
+    return results, latencies
+
+
+def report(label, results, latencies, truth, k):
+    recall = np.mean([len(found & expected) / min(k, len(expected) or 1) for found, expected in zip(results, truth)])
+    latencies_ms = np.array(latencies) * 1000
+    print(f"{label:<16} recall@{k} {recall:6.3f}   "
+          f"p50 {np.percentile(latencies_ms, 50):7.2f} ms   p95 {np.percentile(latencies_ms, 95):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="*", default=[10, 20, 40, 80, 160, 320])
+    parser.add_argument("--probes", type=int, nargs="*", default=[1, 5, 10, 20, 50])
+    args = parser.parse_args()
+
+    info = describe_vector_index()
+    print(f"Index: {info['definition'] or 'none'} ({info['size']}, {info['rows']} rows)")
+    definition = (info["definition"] or "").lower()
+
+    db = SessionLocal()
+    try:
+        queries = sample_queries(db, args.queries)
+        if not queries:
+            print("No embedded chunks to benchmark")
+            return
+
+        truth, latencies = search(db, queries, args.k, exact=True)
+        report("exact", truth, latencies, truth, args.k)
+
+        if "using hnsw" in definition:
+            for ef_search in args.ef_search:
+                results, latencies = search(db, queries, args.k, ef_search=ef_search)
+                report(f"ef_search={ef_search}", results, latencies, truth, args.k)
+        elif "using ivfflat" in definition:
+            for probes in args.probes:
+                results, latencies = search(db, queries, args.k, probes=probes)
+                report(f"probes={probes}", results, latencies, truth, args.k)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
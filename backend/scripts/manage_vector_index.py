@@ -0,0 +1,58 @@
+"""Build, rebuild or inspect the document_chunk embedding index
+
+Rebuilds run concurrently: the new index is built next to the old one and
+takes over its name, so searches and ingestion keep running throughout.
+
+Usage:
+    python scripts/manage_vector_index.py describe
+    python scripts/manage_vector_index.py build --method hnsw --m 16 --ef-construction 64
+    python scripts/manage_vector_index.py build --method ivfflat            # lists sized from row count
+    python scripts/manage_vector_index.py build --method ivfflat --lists 200
+    python scripts/manage_vector_index.py build --column embedding_next    # not the live column
+"""
+import argparse
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.indexes import build_vector_index, describe_vector_index
+from app.database.vector import EMBEDDING_COLUMN, EMBEDDING_COLUMNS
+
+
+def print_index(info):
+    for key, value in info.items():
+        print(f"{key:<12} {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    describe = subparsers.add_parser("describe", help="Show the current index definition and size")
+    build = subparsers.add_parser("build", help="Build or concurrently rebuild the index")
+    for subparser in (describe, build):
+        subparser.add_argument("--column", choices=EMBEDDING_COLUMNS, default=EMBEDDING_COLUMN,
+                               help="Embedding column (defaults to EMBEDDING_COLUMN)")
+    build.add_argument("--method", choices=["hnsw", "ivfflat"], default=None,
+                       help="Index type (defaults to VECTOR_INDEX_METHOD)")
+    build.add_argument("--m", type=int, default=None, help="HNSW graph degree")
+    build.add_argument("--ef-construction", type=int, default=None, help="HNSW build candidate list size")
+    build.add_argument("--lists", type=int, default=None, help="IVFFlat list count")
+    args = parser.parse_args()
+
+    if args.command == "describe":
+        print_index(describe_vector_index(args.column))
+        return
+
+    print_index(build_vector_index(
+        method=args.method,
+        m=args.m,
+        ef_construction=args.ef_construction,
+        lists=args.lists,
+        column=args.column,
+    ))
+
+
+if __name__ == "__main__":
+    main()
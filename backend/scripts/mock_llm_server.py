@@ -0,0 +1,73 @@
+"""Local OpenAI-compatible completions server for tests and load benchmarks
+
+Answers POST /v1/completions, streamed or not, after a configurable delay
+and token rate, and can fail a share of requests with 503 to exercise
+client retries.
+
+Usage:
+    python scripts/mock_llm_server.py --port 8100 --first-token-ms 300 --token-ms 20
+    LLM_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=test uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import Body, FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(first_token_ms: float = 300, token_ms: float = 20, tokens: int = 50,
+               failure_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Mock LLM")
+    words = [f" token{i}" for i in range(tokens)]
+
+    def choice(text: str, finish_reason=None):
+        return {"text": text, "index": 0, "logprobs": None, "finish_reason": finish_reason}
+
+    @app.post("/v1/completions")
+    async def completions(payload: dict = Body(...)):
+        if random.random() < failure_rate:
+            return JSONResponse({"error": {"message": "Mock overload"}}, status_code=503)
+        completion = {
+            "id": f"cmpl-mock-{time.monotonic_ns()}",
+            "object": "text_completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "mock"),
+        }
+        await asyncio.sleep(first_token_ms / 1000)
+
+        if not payload.get("stream"):
+            await asyncio.sleep(token_ms * (tokens - 1) / 1000)
+            return {**completion, "choices": [choice("".join(words), "stop")]}
+
+        async def events():
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(token_ms / 1000)
+                yield f"data: {json.dumps({**completion, 'choices': [choice(word)]})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--first-token-ms", type=float, default=300, help="Delay before the first token")
+    parser.add_argument("--token-ms", type=float, default=20, help="Delay between tokens")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens per completion")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    args = parser.parse_args()
+
+    app = create_app(args.first_token_ms, args.token_ms, args.tokens, args.failure_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Move the document_chunk corpus to a new embedding model or dimension
+
+Runs without downtime. New-model embeddings are written to the embedding
+column that is not live (see EMBEDDING_COLUMN) while searches keep using the
+live one. Each deploy reads the column matching its own model, so old and
+new workers serve correct results side by side during the rollout.
+
+Usage:
+    # 1. Backfill the other column and build its index (resumable)
+    python scripts/reembed.py --model all-mpnet-base-v2 --dim 768
+    # 2. Deploy with the EMBEDDING_MODEL, EMBEDDING_DIM and EMBEDDING_COLUMN it prints
+    # 3. Once no worker runs the old deploy, embed chunks they ingested meanwhile
+    python scripts/reembed.py --model all-mpnet-base-v2 --dim 768 --column embedding_next
+    # 4. Drop the previous model's embeddings
+    python scripts/reembed.py --drop-column embedding
+"""
+import argparse
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.session import SessionLocal
+from app.database.vector import EMBEDDING_COLUMNS
+from app.utils.embedding_backends import backend_cache_key, load_backend
+from app.utils.reembed import backfill_column, build_column_index, drop_column, prepare_column, target_column
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", help="Target embedding model name")
+    parser.add_argument("--dim", type=int, help="Target embedding dimension")
+    parser.add_argument("--column", choices=EMBEDDING_COLUMNS,
+                        help="Column to fill (defaults to the one EMBEDDING_COLUMN does not name)")
+    parser.add_argument("--backend", default=None, help="torch or onnx (defaults to EMBEDDING_BACKEND)")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--drop-column", choices=EMBEDDING_COLUMNS, help="Drop a previous model's embeddings")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.drop_column:
+            try:
+                drop_column(db, args.drop_column)
+            except ValueError as e:
+                parser.error(str(e))
+            print(f"Dropped {args.drop_column}")
+            return
+
+        if not args.model or not args.dim:
+            parser.error("--model and --dim are required")
+
+        model = load_backend(args.model, args.backend)
+        model_dim = model.get_sentence_embedding_dimension()
+        if model_dim != args.dim:
+            parser.error(f"{args.model} produces {model_dim}-dim vectors, not {args.dim}")
+        cache_key = backend_cache_key(args.model, args.backend)
+        column = args.column or target_column()
+
+        try:
+            prepare_column(db, column, args.dim, cache_key)
+        except ValueError as e:
+            parser.error(str(e))
+        total = backfill_column(
+            db, model, cache_key, column, args.batch_size,
+            on_batch=lambda done: print(f"Embedded {done} chunks", end="\r")
+        )
+        print(f"\nEmbedded {total} chunks into {column}; building its index")
+        build_column_index(column)
+        print(f"Done. Deploy with EMBEDDING_MODEL={args.model} EMBEDDING_DIM={args.dim} EMBEDDING_COLUMN={column}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
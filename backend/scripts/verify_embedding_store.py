@@ -0,0 +1,63 @@
+"""Check memory-mapped embedding stores against document_chunk
+
+Reports documents whose store is missing, or whose chunk ids or sampled
+vectors disagree with the database. --rebuild rewrites those stores from
+the database rows.
+
+Usage:
+    python scripts/verify_embedding_store.py
+    python scripts/verify_embedding_store.py --document 42 --full
+    python scripts/verify_embedding_store.py --rebuild
+"""
+import argparse
+import os
+import sys
+
+# Add the backend directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database.session import SessionLocal
+from app.models.document import Document
+from app.utils.document_index import DocumentVectorIndex
+from app.utils.embedding_store import remove_store, verify_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--document", type=int, action="append", help="Only check these document ids")
+    parser.add_argument("--sample", type=int, default=100, help="Vectors compared per document")
+    parser.add_argument("--full", action="store_true", help="Compare every vector")
+    parser.add_argument("--rebuild", action="store_true", help="Rewrite stores that fail the check")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Document.id, Document.job_id, Document.chunk_count, Document.title).filter(
+            # Only documents with chunks of their own have a store
+            Document.status == "ready", Document.chunks_from_id.is_(None)
+        )
+        if args.document:
+            query = query.filter(Document.id.in_(args.document))
+
+        failures = 0
+        for document in query.order_by(Document.id):
+            result = verify_store(db, document.id, sample=None if args.full else args.sample)
+            if result["ok"]:
+                print(f"document {document.id}: ok ({result['rows']} rows)")
+                continue
+            failures += 1
+            print(f"document {document.id}: {'; '.join(result['problems'])}")
+            if args.rebuild:
+                remove_store(document.id)
+                # Loading from the database writes a fresh store
+                DocumentVectorIndex()._load_from_db(
+                    db, document.id, (document.job_id, document.chunk_count), document.title
+                )
+                print(f"document {document.id}: rebuilt")
+        sys.exit(1 if failures and not args.rebuild else 0)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
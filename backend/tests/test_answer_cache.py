@@ -0,0 +1,102 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.app.utils import answer_cache as answer_cache_module
+from backend.app.utils import retrieval
+from backend.app.utils.answer_cache import SemanticAnswerCache
+from backend.app.utils.retrieval import RetrievalEngine
+
+VERSION = ("job-1", 12)
+PREFERENCES = ("textual", "intermediate", "neutral")
+
+
+def test_similar_questions_share_an_answer():
+    cache = SemanticAnswerCache(threshold=0.95)
+    question = np.array([1.0, 0.0, 0.0])
+    cache.store(7, VERSION, PREFERENCES, question, {"answer": "Entropy measures disorder."})
+
+    hit = cache.lookup(7, VERSION, PREFERENCES, np.array([0.99, 0.05, 0.0]))
+    assert hit["answer"] == "Entropy measures disorder."
+    assert hit["similarity"] > 0.95
+
+    # Different question, preference set or document version
+    assert cache.lookup(7, VERSION, PREFERENCES, np.array([0.6, 0.8, 0.0])) is None
+    assert cache.lookup(7, VERSION, ("visual", "beginner", "casual"), question) is None
+    assert cache.lookup(7, ("job-2", 12), PREFERENCES, question) is None
+
+    stats = cache.stats()
+    assert stats["documents"]["7"] == {"hits": 1, "misses": 3, "hit_rate": 0.25}
+
+
+def test_answers_expire_are_evicted_and_invalidated(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(answer_cache_module.time, "monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=10, max_answers=2)
+    questions = np.eye(3)
+    for i, question in enumerate(questions):
+        cache.store(7, VERSION, PREFERENCES, question, {"answer": str(i)})
+
+    assert cache.lookup(7, VERSION, PREFERENCES, questions[0]) is None  # Evicted, oldest first
+    assert cache.lookup(7, VERSION, PREFERENCES, questions[2])["answer"] == "2"
+
+    now[0] += 11
+    assert cache.lookup(7, VERSION, PREFERENCES, questions[2]) is None
+    assert cache.stats()["expirations"] == 2
+
+    cache.store(7, VERSION, PREFERENCES, questions[0], {"answer": "0"})
+    cache.invalidate(7)
+    assert cache.lookup(7, VERSION, PREFERENCES, questions[0]) is None
+    assert cache.stats()["answers"] == 0
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    async def fake_embed(question):
+        return np.array([1.0, 0.0, 0.0]) if "entropy" in question else np.array([0.0, 1.0, 0.0])
+
+    async def fake_retrieve(self, db, question, query_embedding=None):
+        return [{"page_number": 1, "content": "Entropy is a measure of disorder."}]
+
+    monkeypatch.setattr(retrieval, "answer_cache", SemanticAnswerCache())
+    monkeypatch.setattr(retrieval, "document_version", lambda db, document_id: VERSION)
+    monkeypatch.setattr(retrieval, "embed_query_async", fake_embed)
+    monkeypatch.setattr(RetrievalEngine, "retrieve", fake_retrieve)
+    return RetrievalEngine(7, "Thermodynamics")
+
+
+def test_engine_reuses_cached_opening_answers(engine, monkeypatch):
+    calls = []
+
+    class CountingLLM:
+        async def ainvoke(self, prompt):
+            calls.append(prompt)
+            return "Entropy measures disorder."
+
+    monkeypatch.setattr(retrieval, "get_llm", CountingLLM)
+
+    def ask(question, history=()):
+        return asyncio.run(engine.answer(None, question, history=history, preferences=PREFERENCES))
+
+    first, second = ask("what is entropy?"), ask("what is entropy")
+    assert (first["cached"], second["cached"]) == (False, True)
+    assert second["answer"] == first["answer"]
+    assert second["citations"] == first["citations"]
+    assert len(calls) == 1
+
+    # Follow-ups depend on the conversation and are never shared
+    assert ask("what is entropy?", history=[("user", "Hi")])["cached"] is False
+    assert len(calls) == 2
+
+
+def test_begin_returns_a_prompt_until_an_answer_is_finished(engine):
+    pending = asyncio.run(engine.begin(None, "what is entropy?", preferences=PREFERENCES))
+    assert pending.cached is None
+    assert "Entropy is a measure of disorder." in pending.prompt
+    assert pending.finish(" Entropy measures disorder. ")["answer"] == "Entropy measures disorder."
+
+    replay = asyncio.run(engine.begin(None, "what is entropy", preferences=PREFERENCES))
+    assert replay.prompt is None
+    assert replay.cached["answer"] == "Entropy measures disorder."
+    assert replay.sources == pending.sources
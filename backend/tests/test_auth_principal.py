@@ -0,0 +1,121 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.api.v1.endpoints import auth
+from backend.app.models.user import User
+from backend.app.utils.principal_cache import load_principal, principal_cache
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(auth, "SECRET_KEY", "a-test-secret-that-is-at-least-32-bytes")
+    principal_cache.clear()
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(email="student@example.com", hashed_password="x", is_active=True))
+    session.commit()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: session.statements.append(statement))
+    yield session
+    session.close()
+    principal_cache.clear()
+
+
+def token_for(user, **claims):
+    data = {"sub": user.email, "uid": user.id, "ver": user.token_version, **claims}
+    return auth.create_access_token(data, timedelta(minutes=5))
+
+
+def authenticate(db, token):
+    principal = asyncio.run(auth.get_current_principal(token, db))
+    return asyncio.run(auth.get_current_active_principal(principal))
+
+
+def test_cached_principal_skips_the_database(db):
+    user = db.query(User).one()
+    token = token_for(user)
+    db.statements.clear()
+
+    first = authenticate(db, token)
+    assert len(db.statements) == 1
+    assert "hashed_password" not in db.statements[0]
+
+    second = authenticate(db, token)
+    assert len(db.statements) == 1
+    assert (second.id, second.email, second.is_active) == (first.id, "student@example.com", True)
+
+
+def test_deactivation_invalidates_the_cached_principal(db):
+    user = db.query(User).one()
+    token = token_for(user)
+    authenticate(db, token)
+
+    user.is_active = False
+    db.commit()
+
+    with pytest.raises(HTTPException) as excinfo:
+        authenticate(db, token)
+    assert excinfo.value.status_code == 400
+
+
+def test_a_load_between_flush_and_commit_does_not_keep_the_old_principal(tmp_path):
+    # A file database, so the concurrent request reads through its own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    User.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    db, other_request = factory(), factory()
+    user = User(email="student@example.com", hashed_password="x", is_active=True)
+    db.add(user)
+    db.commit()
+    load_principal(db, User.id == user.id)
+
+    user.is_active = False
+    db.flush()
+    # Another request authenticates before the deactivation is committed
+    assert load_principal(other_request, User.id == user.id).is_active is True
+    other_request.close()
+    db.commit()
+
+    assert principal_cache.get(user.id) is None
+    assert load_principal(db, User.id == user.id).is_active is False
+    db.close()
+
+
+def test_bumping_the_token_version_revokes_old_tokens(db):
+    user = db.query(User).one()
+    old_token = token_for(user)
+    authenticate(db, old_token)
+
+    user.token_version += 1
+    db.commit()
+
+    with pytest.raises(HTTPException) as excinfo:
+        authenticate(db, old_token)
+    assert excinfo.value.status_code == 401
+    assert authenticate(db, token_for(user)).token_version == 1
+
+
+def test_tokens_without_a_user_id_are_looked_up_by_email(db):
+    user = db.query(User).one()
+    token = auth.create_access_token({"sub": user.email}, timedelta(minutes=5))
+
+    assert authenticate(db, token).id == user.id
+
+    with pytest.raises(HTTPException) as excinfo:
+        authenticate(db, auth.create_access_token({"sub": "nobody@example.com"}, timedelta(minutes=5)))
+    assert excinfo.value.status_code == 401
+
+
+def test_full_user_is_loaded_only_where_needed(db):
+    user = db.query(User).one()
+    principal = authenticate(db, token_for(user))
+
+    current_user = asyncio.run(auth.get_current_user(principal, db))
+    assert current_user is user
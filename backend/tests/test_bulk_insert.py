@@ -0,0 +1,41 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend.tests.test_reembed import CHUNK_TABLE_SQL
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# EMBEDDING_COLUMN is read at import time, so each configuration runs in its own interpreter
+INSERT_SCRIPT = f"""
+import json
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from backend.app.database.bulk import write_document_chunks
+
+engine = create_engine("sqlite://")
+with engine.begin() as connection:
+    connection.execute(text('''{CHUNK_TABLE_SQL}'''))
+db = sessionmaker(bind=engine)()
+chunks = [{{"content": "Entropy", "page_number": 1, "chunk_index": 0}}]
+write_document_chunks(db, 1, chunks, [[1.0, 2.0]], method="executemany")
+row = db.execute(text("SELECT embedding, embedding_next FROM document_chunk")).one()
+print(json.dumps(list(row)))
+"""
+
+
+@pytest.mark.parametrize("column, expected", [
+    ("embedding", ["[1,2]", None]),
+    ("embedding_next", [None, "[1,2]"]),
+])
+def test_executemany_writes_the_live_embedding_column(column, expected):
+    env = {**os.environ, "EMBEDDING_COLUMN": column,
+           "DATABASE_URL": os.getenv("DATABASE_URL", "postgresql://u:p@localhost/db")}
+    result = subprocess.run([sys.executable, "-c", INSERT_SCRIPT], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == expected
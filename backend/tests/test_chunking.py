@@ -0,0 +1,55 @@
+from backend.app.utils.pdf import batched, chunk_text, iter_chunks
+
+
+def reference_chunk_text(text_pages, chunk_size=1000, overlap=200):
+    """The list-building chunker that ingestion used before streaming"""
+    chunks = []
+    for page_num, page_text in enumerate(text_pages):
+        if not page_text.strip():
+            continue
+        words = page_text.split()
+        for i in range(0, len(words), chunk_size - overlap):
+            chunk_words = words[i:i + chunk_size]
+            if chunk_words:
+                chunks.append({
+                    "content": " ".join(chunk_words),
+                    "page_number": page_num + 1,
+                    "chunk_index": len(chunks)
+                })
+    return chunks
+
+
+PAGES = [
+    " ".join(f"alpha{i}" for i in range(2500)),
+    "",
+    "   \n  ",
+    "short page",
+    " ".join(f"beta{i}" for i in range(801)),
+]
+
+
+def test_iter_chunks_matches_reference_boundaries_and_indexes():
+    for chunk_size, overlap in [(1000, 200), (100, 0), (7, 3)]:
+        expected = reference_chunk_text(PAGES, chunk_size, overlap)
+        assert list(iter_chunks(PAGES, chunk_size, overlap)) == expected
+        assert chunk_text(PAGES, chunk_size, overlap) == expected
+
+
+def test_iter_chunks_consumes_pages_lazily():
+    consumed = []
+
+    def pages():
+        for page in PAGES:
+            consumed.append(page)
+            yield page
+
+    chunks = iter_chunks(pages())
+    first = next(chunks)
+    assert first["chunk_index"] == 0
+    assert first["page_number"] == 1
+    assert len(consumed) == 1
+
+
+def test_batched_groups_items():
+    assert list(batched(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(batched([], 3)) == []
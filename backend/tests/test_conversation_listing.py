@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.api.v1.endpoints.conversations import get_conversation, get_conversations, get_messages
+from backend.app.api.v1.endpoints.documents import get_documents
+from backend.app.models.conversation import Conversation, Message
+from backend.app.models.document import Document
+from backend.app.models.user import User
+from backend.app.utils.pagination import decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    for model in (User, Document, Conversation, Message):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: session.statements.append(statement))
+    yield session
+    session.close()
+
+
+def seed(db, conversations, messages_each):
+    document = Document(title="Thermodynamics", file_path="a.pdf", file_size=1, user_id=1)
+    db.add(document)
+    db.flush()
+    start = datetime(2026, 1, 1)
+    for i in range(conversations):
+        conversation = Conversation(title=f"Conversation {i}", user_id=1, created_at=start + timedelta(minutes=i),
+                                    document_id=document.id if i % 2 else None)
+        db.add(conversation)
+        db.flush()
+        for j in range(messages_each):
+            db.add(Message(conversation_id=conversation.id, role="user", content="q",
+                           created_at=start + timedelta(minutes=i, seconds=j)))
+    # Another user's conversation never shows up
+    db.add(Conversation(title="Other", user_id=2, created_at=start))
+    db.commit()
+    db.statements.clear()
+
+
+def list_page(db, cursor=None, limit=50):
+    response = Response()
+    rows = asyncio.run(get_conversations(response, cursor, limit, db, SimpleNamespace(id=1)))
+    return rows, response.headers.get("X-Next-Cursor")
+
+
+def test_listing_takes_one_query_regardless_of_conversation_count(db):
+    seed(db, conversations=30, messages_each=3)
+
+    rows, next_cursor = list_page(db)
+
+    assert len(db.statements) == 1
+    assert next_cursor is None
+    assert [row["title"] for row in rows[:2]] == ["Conversation 29", "Conversation 28"]
+    assert rows[0]["message_count"] == 3
+    assert rows[0]["last_message_at"] == datetime(2026, 1, 1, 0, 29, 2)
+    assert rows[0]["document"]["title"] == "Thermodynamics"
+    assert rows[1]["document"] is None
+
+
+def test_keyset_pages_cover_every_conversation_once(db):
+    seed(db, conversations=7, messages_each=0)
+
+    titles, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = list_page(db, cursor, limit=3)
+        titles += [row["title"] for row in rows]
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert len(db.statements) == 3
+    assert titles == [f"Conversation {i}" for i in range(6, -1, -1)]
+
+
+def test_invalid_cursor_is_rejected(db):
+    with pytest.raises(HTTPException) as error:
+        list_page(db, cursor="not-a-cursor")
+    assert error.value.status_code == 400
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 18, 12, 30, 5, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+def test_conversation_shows_latest_messages_and_loads_older_ranges(db):
+    seed(db, conversations=1, messages_each=7)
+    user = SimpleNamespace(id=1)
+
+    conversation = asyncio.run(get_conversation(1, 3, db, user))
+    assert [m["created_at"].second for m in conversation["messages"]] == [4, 5, 6]
+
+    seconds, cursor = [], conversation["older_messages_cursor"]
+    while cursor:
+        response = Response()
+        page = asyncio.run(get_messages(1, response, cursor, 3, db, user))
+        seconds = [m["created_at"].second for m in page] + seconds
+        cursor = response.headers.get("X-Next-Cursor")
+    assert seconds == [0, 1, 2, 3]
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_messages(1, Response(), None, 3, db, SimpleNamespace(id=2)))
+    assert error.value.status_code == 404
+
+
+def test_documents_are_listed_by_page_with_only_listed_columns(db):
+    start = datetime(2026, 1, 1)
+    for i in range(5):
+        db.add(Document(title=f"Doc {i}", file_path=f"{i}.pdf", file_size=i, user_id=1,
+                        created_at=start + timedelta(days=i)))
+    db.commit()
+    db.statements.clear()
+
+    response = Response()
+    first = asyncio.run(get_documents(response, None, 3, db, SimpleNamespace(id=1)))
+    rest = asyncio.run(get_documents(Response(), response.headers["X-Next-Cursor"], 3, db, SimpleNamespace(id=1)))
+
+    assert [doc["title"] for doc in first + rest] == [f"Doc {i}" for i in range(4, -1, -1)]
+    assert len(db.statements) == 2
+    assert "file_path" not in db.statements[0]
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.conversation import Conversation, Message
+from backend.app.models.document import Document  # noqa: F401  Registers the referenced tables
+from backend.app.models.user import User  # noqa: F401
+from backend.app.utils import conversation_memory
+from backend.app.utils.conversation_memory import load_memory, summarize
+
+
+class SummaryLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        return "The student asked about entropy."
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://")
+    Conversation.__table__.create(engine)
+    Message.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(conversation_memory, "SessionLocal", factory)
+    return factory
+
+
+def add_conversation(db, messages):
+    conversation = Conversation(user_id=1, document_id=1)
+    db.add(conversation)
+    db.flush()
+    for role, content in messages:
+        db.add(Message(conversation_id=conversation.id, role=role, content=content))
+    db.commit()
+    return conversation
+
+
+def test_window_keeps_the_newest_messages_within_budget(session_factory):
+    db = session_factory()
+    turns = [("user" if i % 2 == 0 else "assistant", f"message {i} " + "x" * 36) for i in range(30)]
+    conversation = add_conversation(db, turns)
+
+    memory = load_memory(db, conversation, token_budget=50, max_messages=8)
+
+    # About 11 tokens each: four fit the budget, the other four read are left to summarize
+    assert [content.split()[1] for _, content in memory.window] == ["26", "27", "28", "29"]
+    assert [role for role, _ in memory.window] == ["user", "assistant", "user", "assistant"]
+    assert [content.split()[1] for _, _, content in memory.overflow] == ["22", "23", "24", "25"]
+
+    newest_id = db.query(Message.id).order_by(Message.id.desc()).first().id
+    memory = load_memory(db, conversation, before_id=newest_id, token_budget=50)
+    assert memory.window[-1][1].startswith("message 28")
+
+
+def test_short_messages_are_still_summarized_once_the_read_is_full(session_factory, monkeypatch):
+    monkeypatch.setattr(conversation_memory, "get_llm", lambda: SummaryLLM())
+    db = session_factory()
+    conversation = add_conversation(db, [("user", f"q{i}") for i in range(7)])
+
+    # Everything unsummarized fits in the window while the read is not full
+    memory = load_memory(db, conversation, token_budget=1000, max_messages=8)
+    assert [content for _, content in memory.window] == [f"q{i}" for i in range(7)]
+    assert memory.overflow == []
+
+    for i in range(7, 30):
+        db.add(Message(conversation_id=conversation.id, role="user", content=f"q{i}"))
+    db.commit()
+    memory = load_memory(db, conversation, token_budget=1000, max_messages=8)
+    assert [content for _, content in memory.window] == ["q26", "q27", "q28", "q29"]
+    assert [content for _, _, content in memory.overflow] == ["q22", "q23", "q24", "q25"]
+
+    assert asyncio.run(memory.fold()) is True
+    db.expire_all()
+    memory = load_memory(db, db.get(Conversation, conversation.id), token_budget=1000, max_messages=8)
+    assert [content for _, content in memory.window] == ["q26", "q27", "q28", "q29"]
+    assert memory.overflow == []
+
+
+def test_oversized_newest_message_is_truncated(session_factory):
+    db = session_factory()
+    conversation = add_conversation(db, [("assistant", "y" * 1000)])
+
+    memory = load_memory(db, conversation, token_budget=10)
+
+    assert memory.window == [("assistant", "y" * 40 + "...")]
+    assert memory.overflow == []
+
+
+def test_fold_updates_the_summary_once(session_factory, monkeypatch):
+    llm = SummaryLLM()
+    monkeypatch.setattr(conversation_memory, "get_llm", lambda: llm)
+    db = session_factory()
+    conversation = add_conversation(db, [("user", "What is entropy? " * 10), ("assistant", "Disorder. " * 10),
+                                         ("user", "And enthalpy?")])
+    first = load_memory(db, conversation, token_budget=10)
+    stale = load_memory(db, conversation, token_budget=10)
+
+    assert asyncio.run(first.fold()) is True
+    assert asyncio.run(stale.fold()) is False  # Another turn already moved the summary on
+    assert len(llm.prompts) == 2
+    assert "Student: What is entropy?" in llm.prompts[0]
+
+    db.expire_all()
+    conversation = db.get(Conversation, conversation.id)
+    assert conversation.summary == "The student asked about entropy."
+    memory = load_memory(db, conversation, token_budget=10)
+    assert memory.summary == "The student asked about entropy."
+    assert memory.window == [("user", "And enthalpy?")]
+    assert memory.overflow == []
+
+
+def test_extractive_summary_keeps_the_latest_lines(monkeypatch):
+    monkeypatch.setattr(conversation_memory, "MEMORY_SUMMARY_MODE", "extractive")
+    summary = asyncio.run(summarize("Earlier: " + "z" * 100, [("user", "Newest question")], budget=10))
+
+    assert summary.endswith("Student: Newest question")
+    assert len(summary) == 43
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.api.v1.endpoints import conversations
+from backend.app.api.v1.endpoints.conversations import add_user_message, replay_answer, stream_answer_events
+from backend.app.models.conversation import Conversation, Message
+from backend.app.models.document import Document  # noqa: F401  Registers the referenced tables
+from backend.app.models.user import User  # noqa: F401
+from backend.app.utils.llm import GenerationStats, StubLLM
+
+SOURCES = [{"page_number": 4, "content": "Entropy is a measure of disorder."}]
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://")
+    Conversation.__table__.create(engine)
+    Message.__table__.create(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(conversations, "SessionLocal", factory)
+    monkeypatch.setattr(conversations, "generation_stats", GenerationStats())
+    return factory
+
+
+@pytest.fixture
+def user_message(session_factory):
+    db = session_factory()
+    conversation = Conversation(user_id=1, document_id=1)
+    db.add(conversation)
+    db.flush()
+    message = Message(conversation_id=conversation.id, role="user", content="What is entropy?")
+    db.add(message)
+    db.commit()
+    db.refresh(message)
+    db.close()
+    return message
+
+
+def parse(event):
+    kind, data = event.strip().split("\n")
+    return kind[len("event: "):], json.loads(data[len("data: "):])
+
+
+def stream(tokens, user_message, **kwargs):
+    return stream_answer_events(tokens, SOURCES, user_message.conversation_id, user_message.id,
+                                time.perf_counter(), **kwargs)
+
+
+async def collect(events):
+    return [parse(event) async for event in events]
+
+
+def stored_messages(session_factory):
+    db = session_factory()
+    try:
+        return [(message.role, message.content, message.citations)
+                for message in db.query(Message).order_by(Message.id)]
+    finally:
+        db.close()
+
+
+def test_tokens_are_streamed_then_the_stored_answer_with_its_citations(session_factory, user_message):
+    completed = []
+    tokens = StubLLM("Entropy measures disorder.", token_delay=0).astream("prompt")
+
+    events = asyncio.run(collect(stream(tokens, user_message, on_complete=completed.append)))
+
+    assert [kind for kind, _ in events] == ["token", "token", "token", "done"]
+    assert "".join(data["text"] for _, data in events[:-1]) == "Entropy measures disorder."
+    citations = [{"page": 4, "text": "Entropy is a measure of disorder...."}]
+    done = events[-1][1]
+    assert (done["role"], done["content"], done["citations"]) == ("assistant", "Entropy measures disorder.", citations)
+    assert set(done["timings"]) == {"first_token_ms", "total_ms"}
+    assert completed == ["Entropy measures disorder."]
+    assert stored_messages(session_factory) == [
+        ("user", "What is entropy?", None),
+        ("assistant", "Entropy measures disorder.", citations),
+    ]
+    assert conversations.generation_stats.stats()["streams"] == 1
+
+
+def test_failed_generation_sends_an_error_and_drops_the_question(session_factory, user_message):
+    async def failing():
+        yield "Entropy"
+        raise RuntimeError("model went away")
+
+    events = asyncio.run(collect(stream(failing(), user_message)))
+
+    assert events == [("token", {"text": "Entropy"}),
+                      ("error", {"detail": "Error getting AI response: model went away"})]
+    assert stored_messages(session_factory) == []
+
+
+def test_client_disconnect_drops_the_question(session_factory, user_message):
+    async def disconnect_after_first_token():
+        events = stream(StubLLM("Entropy measures disorder.", token_delay=0).astream("prompt"), user_message)
+        first = await events.__anext__()
+        await events.aclose()
+        return parse(first)
+
+    assert asyncio.run(disconnect_after_first_token()) == ("token", {"text": "Entropy"})
+    assert stored_messages(session_factory) == []
+
+
+def test_cached_replays_are_stored_but_left_out_of_generation_stats(session_factory, user_message):
+    events = asyncio.run(collect(stream(replay_answer("Entropy measures disorder."), user_message, cached=True)))
+
+    assert [kind for kind, _ in events] == ["token", "done"]
+    assert [role for role, _, _ in stored_messages(session_factory)] == ["user", "assistant"]
+    assert conversations.generation_stats.stats()["streams"] == 0
+
+
+def test_questions_are_only_stored_in_the_users_document_conversations(session_factory, user_message):
+    db = session_factory()
+    db.add(Conversation(user_id=1, document_id=None))
+    db.commit()
+
+    for conversation_id, user_id, status_code in ((user_message.conversation_id, 2, 404), (2, 1, 400)):
+        with pytest.raises(HTTPException) as excinfo:
+            add_user_message(db, conversation_id, user_id, "Why?")
+        assert excinfo.value.status_code == status_code
+
+    _, message, preferences, formatted_query = add_user_message(db, user_message.conversation_id, 1, "Why?")
+    assert (message.role, message.content) == ("user", "Why?")
+    assert preferences == ("textual", "intermediate", "neutral")
+    assert formatted_query.startswith("Why?\n\nAnswer based on the following preferences:")
+    db.close()
@@ -0,0 +1,19 @@
+from sqlalchemy.pool import NullPool, QueuePool
+
+from backend.app.database import session
+
+
+def test_engine_pools_connections():
+    assert isinstance(session.engine.pool, QueuePool)
+    assert session.engine.pool.size() == session.DB_POOL_SIZE
+    assert session.pool_stats()["sync"]["pooled"] is True
+
+
+def test_pool_options_follow_configuration(monkeypatch):
+    options = session.pool_options()
+    assert options["pool_pre_ping"] is session.DB_POOL_PRE_PING
+    assert options["pool_recycle"] == session.DB_POOL_RECYCLE
+
+    monkeypatch.setattr(session, "DB_POOL_ENABLED", False)
+    assert session.pool_options() == {"poolclass": NullPool}
+
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.conversation import Conversation, Message
+from backend.app.models.document import Document, DocumentChunk
+from backend.app.models.user import User
+from backend.app.utils.ingestion import release_chunks, reuse_ingestion
+from backend.app.utils.vector_search import scope_filter
+
+# document_chunk without the Postgres-only vector and tsvector columns
+CHUNK_TABLE_SQL = """
+    CREATE TABLE document_chunk (
+        id INTEGER PRIMARY KEY, content TEXT NOT NULL, page_number INTEGER, chunk_index INTEGER NOT NULL,
+        document_id INTEGER NOT NULL REFERENCES document (id), embedding TEXT, created_at DATETIME, updated_at DATETIME
+    )"""
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    Document.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text(CHUNK_TABLE_SQL))
+    for model in (Conversation, Message):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_document(db, user_id, title, chunks=0):
+    document = Document(title=title, file_path="blob.pdf", file_size=1, user_id=user_id, content_hash="abc",
+                        status="ready", job_id=f"job-{title}", page_count=2, chunk_count=chunks)
+    db.add(document)
+    db.flush()
+    for index in range(chunks):
+        db.execute(text(
+            "INSERT INTO document_chunk (content, page_number, chunk_index, document_id) VALUES (:c, 1, :i, :d)"
+        ), {"c": f"chunk {index}", "i": index, "d": document.id})
+    db.commit()
+    return document
+
+
+def chunk_counts(db):
+    return dict(db.query(DocumentChunk.document_id, func.count(DocumentChunk.id)).group_by(DocumentChunk.document_id))
+
+
+def test_reuse_shares_chunks_without_copying(db):
+    source = add_document(db, 1, "original", chunks=3)
+    duplicate = add_document(db, 2, "duplicate")
+
+    reuse_ingestion(db, duplicate, source)
+
+    assert chunk_counts(db) == {source.id: 3}
+    assert (duplicate.status, duplicate.chunk_count, duplicate.chunks_from_id) == ("ready", 3, source.id)
+    assert db.query(Document.chunk_owner_id).filter(Document.id == duplicate.id).scalar() == source.id
+    assert duplicate.ingest_progress["reused_from"] == source.id
+
+
+def test_searches_of_a_sharing_document_read_the_shared_chunks_under_its_own_name(db):
+    source = add_document(db, 1, "original", chunks=3)
+    duplicate = add_document(db, 2, "duplicate")
+    reuse_ingestion(db, duplicate, source)
+
+    for document_id, user_id, title in ((duplicate.id, None, "duplicate"), (None, 2, "duplicate"),
+                                        (source.id, None, "original")):
+        scope, join, params = scope_filter(document_id, user_id)
+        rows = db.execute(text(f"SELECT dc.id, d.id AS document_id, d.title FROM document_chunk dc {join} "
+                               f"WHERE {scope}"), params).all()
+        assert len(rows) == 3
+        assert {row.title for row in rows} == {title}
+
+
+def test_deleting_a_shared_source_hands_its_chunks_on(db):
+    source = add_document(db, 1, "original", chunks=3)
+    first = add_document(db, 2, "first")
+    second = add_document(db, 3, "second")
+    reuse_ingestion(db, first, source)
+    reuse_ingestion(db, second, source)
+
+    assert release_chunks(db, source) == [first.id, second.id]
+    db.delete(source)
+    db.commit()
+
+    assert chunk_counts(db) == {first.id: 3}
+    db.refresh(first)
+    db.refresh(second)
+    assert (first.chunks_from_id, second.chunks_from_id) == (None, first.id)
+
+
+def test_deleting_documents_without_sharers_removes_only_their_own_chunks(db):
+    source = add_document(db, 1, "original", chunks=3)
+    duplicate = add_document(db, 2, "duplicate")
+    reuse_ingestion(db, duplicate, source)
+
+    assert release_chunks(db, duplicate) == []
+    db.delete(duplicate)
+    db.commit()
+    assert chunk_counts(db) == {source.id: 3}
+
+    assert release_chunks(db, source) == []
+    db.delete(source)
+    db.commit()
+    assert chunk_counts(db) == {}
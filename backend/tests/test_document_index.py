@@ -0,0 +1,37 @@
+import numpy as np
+
+from backend.app.utils.document_index import DocumentVectorIndex, _Entry, normalize_rows, top_k
+
+
+def test_top_k_matches_full_sort():
+    rng = np.random.default_rng(0)
+    matrix = normalize_rows(rng.standard_normal((3000, 384)).astype(np.float32))
+    query = rng.standard_normal(384).astype(np.float32)
+
+    rows, similarities = top_k(matrix, query, 10)
+
+    expected = np.argsort(-(matrix @ (query / np.linalg.norm(query))))[:10]
+    assert rows.tolist() == expected.tolist()
+    assert np.all(np.diff(similarities) <= 0)
+    assert top_k(matrix, query, 5000)[0].shape == (3000,)
+    assert top_k(np.empty((0, 0), dtype=np.float32), query, 5)[0].size == 0
+
+
+def make_entry(rows):
+    matrix = normalize_rows(np.ones((rows, 4), dtype=np.float32))
+    return _Entry(("job", rows), "doc", np.arange(rows, dtype=np.int64), matrix, ["x"] * rows, [1] * rows)
+
+
+def test_lru_is_bounded_by_bytes_and_invalidates():
+    entry_bytes = make_entry(100).nbytes
+    index = DocumentVectorIndex(max_bytes=entry_bytes * 2)
+    for document_id in range(3):
+        index._put(document_id, make_entry(100))
+
+    assert index._get(0) is None
+    assert index._get(1) is not None and index._get(2) is not None
+    assert index.stats()["evictions"] == 1
+
+    index.invalidate(2)
+    assert index._get(2) is None
+    assert index.stats()["bytes"] == entry_bytes
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+
+from backend.app.utils.embedding_backends import OnnxBackend, SentenceTransformerBackend
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+TEXTS = [
+    "Mitochondria are the powerhouse of the cell.",
+    "The derivative of sin(x) is cos(x).",
+    "CS 101 covers variables, loops and functions.",
+    "A short one",
+    "",
+]
+
+
+def cosine(a, b):
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1) + 1e-12)
+
+
+@pytest.fixture(scope="module")
+def torch_embeddings():
+    return SentenceTransformerBackend(MODEL_NAME).encode(TEXTS)
+
+
+@pytest.fixture(scope="module")
+def onnx_dir(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("onnx"))
+
+
+def test_onnx_matches_pytorch(torch_embeddings, onnx_dir):
+    backend = OnnxBackend(MODEL_NAME, model_dir=onnx_dir)
+    embeddings = backend.encode(TEXTS)
+
+    assert embeddings.shape == torch_embeddings.shape
+    assert backend.get_sentence_embedding_dimension() == torch_embeddings.shape[1]
+    assert cosine(embeddings, torch_embeddings).min() > 0.9999
+
+
+def test_quantized_onnx_stays_close_to_pytorch(torch_embeddings, onnx_dir):
+    backend = OnnxBackend(MODEL_NAME, model_dir=onnx_dir, quantize=True)
+    embeddings = backend.encode(TEXTS)
+
+    assert cosine(embeddings, torch_embeddings).min() > 0.98
+
+
+def test_single_text_returns_a_vector(onnx_dir):
+    backend = OnnxBackend(MODEL_NAME, model_dir=onnx_dir)
+    assert backend.encode(TEXTS[0]).shape == (backend.get_sentence_embedding_dimension(),)
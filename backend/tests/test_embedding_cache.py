@@ -0,0 +1,32 @@
+import numpy as np
+
+from backend.app.utils.embedding_cache import EmbeddingCache, text_hash
+
+
+def test_text_hash_normalizes_whitespace():
+    assert text_hash("Intro to  Biology\n") == text_hash(" Intro to Biology")
+    assert text_hash("Intro to Biology") != text_hash("Intro to Chemistry")
+
+
+def test_memory_tier_hits_and_lru_eviction():
+    cache = EmbeddingCache(max_entries=2, persist=False)
+    cache.put_many("model", ["a", "b"], np.eye(2, dtype=np.float32))
+
+    hits = cache.get_many("model", ["a", "c"])
+    assert np.array_equal(hits[0], [1, 0])
+    assert hits[1] is None
+
+    # "a" was used most recently, so adding "c" evicts "b"
+    cache.put_many("model", ["c"], [np.ones(2)])
+    assert cache.get_many("model", ["b"]) == [None]
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_entries_are_scoped_by_model():
+    cache = EmbeddingCache(max_entries=10, persist=False)
+    cache.put_many("model-a", ["text"], [np.ones(3)])
+    assert cache.get_many("model-b", ["text"]) == [None]
@@ -0,0 +1,36 @@
+import pytest
+
+from backend.app.utils import embeddings
+from backend.app.utils.embeddings import EmbeddingDimensionMismatch, verify_embedding_dimension
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+
+class FakeCatalog:
+    """Answers the to_regclass and pg_attribute lookups the startup check makes"""
+
+    def __init__(self, table_exists, column_dim):
+        self.table_exists = table_exists
+        self.column_dim = column_dim
+
+    def execute(self, statement, params=None):
+        if "atttypmod" in str(statement):
+            return FakeResult(self.column_dim)
+        return FakeResult("document_chunk" if self.table_exists else None)
+
+
+def test_startup_check_refuses_a_missing_or_mismatched_live_column(monkeypatch):
+    monkeypatch.setattr(embeddings, "EMBEDDING_DIM", 384)
+
+    verify_embedding_dimension(FakeCatalog(table_exists=False, column_dim=None))  # before the first migration
+    verify_embedding_dimension(FakeCatalog(table_exists=True, column_dim=384))
+
+    for column_dim in (768, None):
+        with pytest.raises(EmbeddingDimensionMismatch):
+            verify_embedding_dimension(FakeCatalog(table_exists=True, column_dim=column_dim))
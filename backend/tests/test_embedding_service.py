@@ -0,0 +1,145 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.api.v1.endpoints.documents import search_document
+from backend.app.models.document import Document
+from backend.app.models.user import User
+from backend.app.utils import embeddings
+from backend.app.utils.embedding_service import EmbeddingQueueFull, QueryEmbeddingService
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[float(len(text)), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_concurrent_queries_share_one_encode_call():
+    encoder = CountingEncoder()
+    service = QueryEmbeddingService(encoder, window_ms=200, max_batch_size=64)
+    queries = [f"question {i}" * (i + 1) for i in range(8)]
+    results = {}
+    start = threading.Barrier(len(queries))
+
+    def ask(query):
+        start.wait()
+        results[query] = service.embed(query, timeout=5)
+
+    threads = [threading.Thread(target=ask, args=(query,)) for query in queries]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(encoder.calls) < len(queries)
+    for query in queries:
+        assert results[query][0] == len(query)
+    assert service.stats()["batches"] == len(encoder.calls)
+
+
+def test_repeated_queries_hit_the_lru():
+    encoder = CountingEncoder()
+    service = QueryEmbeddingService(encoder, window_ms=0)
+    first = service.embed("what is mitosis?", timeout=5)
+    second = service.embed("what  is mitosis? ", timeout=5)
+
+    assert np.array_equal(first, second)
+    assert len(encoder.calls) == 1
+    assert service.stats()["cache_hits"] == 1
+
+
+class BlockingEncoder(CountingEncoder):
+    """Holds every encode call until released"""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, texts):
+        self.started.set()
+        self.release.wait(5)
+        return super().__call__(texts)
+
+
+def filled_service(max_pending=2):
+    """A service whose model is busy and whose queue is full"""
+    encoder = BlockingEncoder()
+    service = QueryEmbeddingService(encoder, window_ms=0, max_pending=max_pending)
+    futures = [service.submit("in flight")]
+    assert encoder.started.wait(5)
+    futures += [service.submit(f"waiting {i}") for i in range(max_pending)]
+    return service, encoder, futures
+
+
+def test_full_queue_rejects_queries_until_it_drains():
+    service, encoder, futures = filled_service()
+
+    with pytest.raises(EmbeddingQueueFull):
+        service.submit("one too many")
+    assert service.stats()["rejected"] == 1
+
+    encoder.release.set()
+    assert [future.result(timeout=5)[0] for future in futures] == [9.0, 9.0, 9.0]
+    assert service.embed("admitted again", timeout=5)[0] == len("admitted again")
+
+
+def test_callers_giving_up_do_not_stop_the_batcher():
+    service, encoder, futures = filled_service(max_pending=3)
+    in_flight, abandoned, waiting, timed_out = futures
+
+    async def ask_with_timeout():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.wrap_future(timed_out), timeout=0.01)
+
+    asyncio.run(ask_with_timeout())
+    assert timed_out.cancelled()
+    assert abandoned.cancel()
+    assert not in_flight.cancel()  # Already being encoded
+
+    encoder.release.set()
+    assert in_flight.result(timeout=5)[0] == len("in flight")
+    assert waiting.result(timeout=5)[0] == len("waiting 1")
+    assert service.embed("still serving", timeout=5)[0] == len("still serving")
+
+
+def test_bulk_batches_share_the_queue_and_are_encoded_on_their_own():
+    encoder = CountingEncoder()
+    service = QueryEmbeddingService(encoder, window_ms=50)
+    query = service.submit("short question")
+    bulk = service.submit_many(["chunk one", "chunk two", "chunk three"])
+
+    assert query.result(timeout=5)[0] == len("short question")
+    assert bulk.result(timeout=5)[:, 0].tolist() == [9.0, 9.0, 11.0]
+    assert ["chunk one", "chunk two", "chunk three"] in encoder.calls
+    assert service.stats()["bulk_batches"] == 1
+
+
+def test_search_returns_503_when_the_embedding_queue_is_full(monkeypatch):
+    service, encoder, _ = filled_service()
+    monkeypatch.setattr(embeddings, "query_embedder", service)
+    engine = create_engine("sqlite://")
+    for model in (User, Document):
+        model.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Document(title="Notes", file_path="a.pdf", file_size=1, user_id=1))
+    db.commit()
+
+    try:
+        with pytest.raises(HTTPException) as excinfo:
+            asyncio.run(search_document(1, "what is entropy?", db=db, current_user=SimpleNamespace(id=1)))
+        assert excinfo.value.status_code == 503
+        assert excinfo.value.headers == {"Retry-After": "1"}
+    finally:
+        encoder.release.set()
+        db.close()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from backend.app.utils import embedding_store
+from backend.app.utils.embedding_store import EmbeddingStoreWriter, open_store, remove_store
+
+
+def test_store_round_trips_through_memmap(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path))
+    rng = np.random.default_rng(0)
+    batches = [rng.standard_normal((n, 8)).astype(np.float32) for n in (3, 5)]
+
+    writer = EmbeddingStoreWriter(7, "job-a")
+    for batch in batches:
+        writer.append(batch)
+    assert open_store(7, "job-a") is None  # nothing published before commit
+    writer.commit(list(range(100, 108)))
+
+    ids, matrix = open_store(7, "job-a")
+    expected = np.vstack(batches)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    assert isinstance(matrix, np.memmap)
+    assert ids.tolist() == list(range(100, 108))
+    np.testing.assert_allclose(matrix, expected, rtol=1e-6)
+
+    # A re-ingest publishes new files and drops the old version
+    writer = EmbeddingStoreWriter(7, "job-b")
+    writer.append(batches[0])
+    writer.commit([1, 2, 3])
+    assert open_store(7, "job-a") is None
+    assert open_store(7, "job-b")[1].shape == (3, 8)
+
+    remove_store(7)
+    assert not tmp_path.joinpath("embedding", "7").exists()
+
+
+def test_commit_rejects_mismatched_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path))
+    writer = EmbeddingStoreWriter(1, None)
+    writer.append(np.ones((2, 4), dtype=np.float32))
+    with pytest.raises(ValueError):
+        writer.commit([1])
+    assert open_store(1, None) is None
+    assert list(tmp_path.joinpath("embedding", "1").iterdir()) == []
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from backend.app.utils import hybrid_search
+from backend.app.utils.hybrid_search import hybrid_search as run_hybrid_search, reciprocal_rank_fusion
+
+
+def test_rrf_rewards_ids_ranked_by_both_lists():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4]], [0.5, 0.5], k=60)
+
+    assert [chunk_id for chunk_id, _ in fused][:2] == [3, 1]
+    assert dict(fused)[3] == pytest.approx(0.5 / 63 + 0.5 / 61)
+    assert len(fused) == 4
+
+
+def test_rrf_weights_shift_the_ranking():
+    vector, lexical = [1, 2], [2, 1]
+    assert reciprocal_rank_fusion([vector, lexical], [0.9, 0.1])[0][0] == 1
+    assert reciprocal_rank_fusion([vector, lexical], [0.1, 0.9])[0][0] == 2
+    assert reciprocal_rank_fusion([vector, lexical], [1.0, 0.0])[0][0] == 1
+
+
+def hit(chunk_id, vector_hit_count):
+    return SimpleNamespace(id=chunk_id, content="c", page_number=1, document_title="doc", document_id=1,
+                           similarity=0.5, score=0.01, vector_rank=1, lexical_rank=None,
+                           vector_hit_count=vector_hit_count)
+
+
+class ScriptedSession:
+    """Answers each fused statement with the next scripted result, recording which vector leg it used"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.legs = []
+
+    def execute(self, statement, params=None):
+        self.legs.append("exact" if "vector_scored AS MATERIALIZED" in str(statement) else "index")
+        return SimpleNamespace(all=lambda rows=self.results.pop(0): rows)
+
+
+@pytest.mark.parametrize("index_rows, legs", [
+    ([hit(1, 40)], ["index"]),
+    ([hit(1, 3)], ["index", "exact"]),
+    ([], ["index", "exact"]),
+])
+def test_filtered_index_leg_falls_back_to_exact_scoring_when_short(monkeypatch, index_rows, legs):
+    monkeypatch.setattr(hybrid_search, "scope_size", lambda db, document_id, user_id: 50_000)
+    monkeypatch.setattr(hybrid_search, "choose_strategy", lambda size: hybrid_search.STRATEGY_FILTERED_INDEX)
+    monkeypatch.setattr(hybrid_search, "filtered_scan_params", lambda *args: {})
+    monkeypatch.setattr(hybrid_search, "apply_search_params", lambda db, **params: None)
+    db = ScriptedSession(index_rows, [hit(2, 40)])
+
+    chunks = run_hybrid_search(db, "entropy", np.ones(4, dtype=np.float32), limit=5, user_id=1, backend="postgres")
+
+    assert db.legs == legs
+    assert [chunk["id"] for chunk in chunks] == ([1] if legs == ["index"] else [2])
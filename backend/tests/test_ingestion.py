@@ -0,0 +1,179 @@
+import asyncio
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.api.v1.endpoints.documents import get_document_status
+from backend.app.database import bulk
+from backend.app.models.document import Document, DocumentChunk
+from backend.app.models.user import User
+from backend.app.utils import ingestion
+from backend.app.utils.ingestion import get_ingestion_status, submit_ingestion
+from backend.tests.test_reembed import CHUNK_TABLE_SQL
+
+PAGES = ["Entropy is a measure of disorder.", "Enthalpy is heat content.", "Free energy decides."]
+
+
+class PendingExecutor:
+    """Holds submitted jobs until the test runs them, so in-flight jobs can be observed"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.jobs.append((future, fn, args))
+        return future
+
+    def run_all(self):
+        jobs, self.jobs = self.jobs, []
+        for future, fn, args in jobs:
+            future.set_result(fn(*args))
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    Document.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text(CHUNK_TABLE_SQL))
+    factory = sessionmaker(bind=engine)
+    executor = PendingExecutor()
+    snapshots = []
+
+    def embed(texts):
+        # What a client polling the status endpoint sees while the job runs
+        db = factory()
+        snapshots.append(get_ingestion_status(db.query(Document).one()))
+        db.close()
+        return [[float(len(content)), 1.0] for content in texts]
+
+    monkeypatch.setattr(ingestion, "SessionLocal", factory)
+    monkeypatch.setattr(ingestion, "_executor", executor)
+    monkeypatch.setattr(ingestion, "_jobs", {})
+    monkeypatch.setattr(ingestion, "EMBEDDING_BATCH_SIZE", 1)
+    monkeypatch.setattr(ingestion, "EMBEDDING_STORE_ENABLED", False)
+    monkeypatch.setattr(ingestion, "get_page_count", lambda file_path: len(PAGES))
+    monkeypatch.setattr(ingestion, "iter_pdf_pages", lambda file_path: iter(PAGES))
+    monkeypatch.setattr(ingestion, "embed_documents", embed)
+    monkeypatch.setattr(bulk, "BULK_INSERT_METHOD", "executemany")
+
+    db = factory()
+    document = Document(title="Thermodynamics", file_path="thermo.pdf", file_size=1, user_id=1, status="queued")
+    db.add(document)
+    db.commit()
+    yield SimpleNamespace(db=db, factory=factory, document=document, executor=executor, snapshots=snapshots)
+    db.close()
+
+
+def poll(pipeline, user_id=1):
+    """Call the status endpoint the way a request does, in a session of its own"""
+    db = pipeline.factory()
+    try:
+        return asyncio.run(get_document_status(pipeline.document.id, db, SimpleNamespace(id=user_id)))
+    finally:
+        db.close()
+
+
+def stage_statuses(status):
+    return {stage: progress["status"] for stage, progress in status["stages"].items()}
+
+
+def chunk_count(db):
+    return db.query(func.count(DocumentChunk.id)).scalar()
+
+
+def reload(pipeline):
+    pipeline.db.expire_all()
+    return pipeline.db.get(Document, pipeline.document.id)
+
+
+def test_status_moves_from_queued_through_processing_to_ready(pipeline):
+    job_id = submit_ingestion(pipeline.db, pipeline.document)
+
+    queued = poll(pipeline)
+    assert (queued["job_id"], queued["status"]) == (job_id, "queued")
+    assert set(stage_statuses(queued).values()) == {"pending"}
+
+    pipeline.executor.run_all()
+
+    # One chunk per page and batch: each batch is written before the next one is embedded
+    assert [snapshot["status"] for snapshot in pipeline.snapshots] == ["processing"] * 3
+    assert [snapshot["chunk_count"] for snapshot in pipeline.snapshots] == [0, 1, 2]
+    assert set(stage_statuses(pipeline.snapshots[0]).values()) == {"running"}
+    assert pipeline.snapshots[0]["stages"]["extract"]["total"] == 3
+
+    ready = poll(pipeline)
+    assert (ready["status"], ready["page_count"], ready["chunk_count"], ready["error"]) == ("ready", 3, 3, None)
+    assert set(stage_statuses(ready).values()) == {"done"}
+    assert ready["stages"]["embed"] == {"status": "done", "done": 3, "total": 3, "error": None}
+    assert chunk_count(pipeline.db) == 3
+
+    with pytest.raises(HTTPException) as excinfo:
+        poll(pipeline, user_id=2)
+    assert excinfo.value.status_code == 404
+
+
+def test_resubmitting_keeps_the_job_in_flight_or_done(pipeline):
+    job_id = submit_ingestion(pipeline.db, pipeline.document)
+
+    assert submit_ingestion(pipeline.db, pipeline.document) == job_id
+    assert len(pipeline.executor.jobs) == 1
+
+    pipeline.executor.run_all()
+    document = reload(pipeline)
+    assert submit_ingestion(pipeline.db, document) == job_id
+    assert pipeline.executor.jobs == []
+
+    forced = submit_ingestion(pipeline.db, document, force=True)
+    assert forced != job_id
+    pipeline.executor.run_all()
+    assert (reload(pipeline).status, chunk_count(pipeline.db)) == ("ready", 3)
+
+
+def test_abandoned_jobs_are_restarted_and_recent_ones_kept(pipeline):
+    job_id = submit_ingestion(pipeline.db, pipeline.document)
+    # The worker that queued the job went away without running it
+    ingestion._jobs.clear()
+    pipeline.executor.jobs.clear()
+
+    assert submit_ingestion(pipeline.db, reload(pipeline)) == job_id  # still within INGEST_STALE_SECONDS
+
+    stale = datetime.utcnow() - timedelta(seconds=ingestion.INGEST_STALE_SECONDS + 60)
+    pipeline.db.query(Document).update({Document.updated_at: stale}, synchronize_session=False)
+    pipeline.db.commit()
+    restarted = submit_ingestion(pipeline.db, reload(pipeline))
+    assert restarted != job_id
+
+    pipeline.executor.run_all()
+    assert (reload(pipeline).job_id, reload(pipeline).status) == (restarted, "ready")
+
+
+def test_failed_jobs_report_the_error_and_retry_without_duplicating_chunks(pipeline, monkeypatch):
+    def failing_pages(file_path):
+        yield PAGES[0]
+        yield PAGES[1]
+        raise RuntimeError("corrupt page 3")
+
+    monkeypatch.setattr(ingestion, "iter_pdf_pages", failing_pages)
+    failed_job = submit_ingestion(pipeline.db, pipeline.document)
+    pipeline.executor.run_all()
+
+    failed = get_ingestion_status(reload(pipeline))
+    assert (failed["status"], failed["error"]) == ("failed", "corrupt page 3")
+    assert set(stage_statuses(failed).values()) == {"failed"}
+
+    monkeypatch.setattr(ingestion, "iter_pdf_pages", lambda file_path: iter(PAGES))
+    retried_job = submit_ingestion(pipeline.db, reload(pipeline))
+    assert retried_job != failed_job
+    pipeline.executor.run_all()
+
+    ready = get_ingestion_status(reload(pipeline))
+    assert (ready["job_id"], ready["status"], ready["chunk_count"], ready["error"]) == (retried_job, "ready", 3, None)
+    assert chunk_count(pipeline.db) == 3
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend.app.utils.llm import AsyncLLMClient, LLMError
+
+
+def completion(text):
+    return {"choices": [{"text": text, "index": 0, "finish_reason": None}]}
+
+
+def make_client(handler, **kwargs):
+    kwargs.setdefault("retry_base", 0)
+    return AsyncLLMClient(base_url="http://llm.test/v1", api_key="key", model="test-model",
+                          transport=httpx.MockTransport(handler), **kwargs)
+
+
+def run(client, coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_ainvoke_posts_a_completion_request():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json=completion(" Entropy measures disorder."))
+
+    client = make_client(handler)
+    assert run(client, client.ainvoke("What is entropy?")) == " Entropy measures disorder."
+
+    request, = requests
+    assert request.url == "http://llm.test/v1/completions"
+    assert request.headers["Authorization"] == "Bearer key"
+    payload = json.loads(request.content)
+    assert payload["model"] == "test-model"
+    assert payload["prompt"] == "What is entropy?"
+    assert payload["stream"] is False
+
+
+def test_transient_failures_are_retried():
+    statuses = iter([503, 429, 200])
+
+    def handler(request):
+        status = next(statuses)
+        return httpx.Response(status, json=completion("ok") if status == 200 else {"error": "busy"})
+
+    client = make_client(handler, max_retries=2)
+    assert run(client, client.ainvoke("prompt")) == "ok"
+    assert client.stats()["retries"] == 2
+
+
+def test_client_errors_and_exhausted_retries_raise():
+    client = make_client(lambda request: httpx.Response(400, json={"error": "bad"}), max_retries=2)
+    with pytest.raises(LLMError, match="400"):
+        run(client, client.ainvoke("prompt"))
+    assert client.stats()["retries"] == 0
+
+    def handler(request):
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    client = make_client(handler, max_retries=1)
+    with pytest.raises(LLMError, match="ConnectTimeout"):
+        run(client, client.ainvoke("prompt"))
+    assert client.stats()["retries"] == 1
+    assert client.stats()["failures"] == 1
+
+
+def test_astream_yields_server_sent_tokens():
+    events = "".join(f"data: {json.dumps(completion(text))}\n\n" for text in ["Entropy", " measures", " disorder."])
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text=events + "data: [DONE]\n\n",
+                              headers={"Content-Type": "text/event-stream"})
+
+    client = make_client(handler)
+
+    async def collect():
+        return [token async for token in client.astream("prompt")]
+
+    assert run(client, collect()) == ["Entropy", " measures", " disorder."]
+
+
+def test_concurrent_generations_are_capped():
+    active, peak = 0, 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return httpx.Response(200, json=completion("ok"))
+
+    client = make_client(handler, max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(client.ainvoke("prompt") for _ in range(6)))
+
+    assert run(client, burst()) == ["ok"] * 6
+    assert peak == 2
+    assert client.stats()["in_flight"] == 0
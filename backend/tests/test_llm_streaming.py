@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from backend.app.api.v1.endpoints.conversations import sse_event
+from backend.app.utils import retrieval
+from backend.app.utils.llm import GenerationStats, StubLLM
+from backend.app.utils.retrieval import RetrievalEngine
+
+
+async def collect(tokens):
+    return [token async for token in tokens]
+
+
+def test_stub_llm_streams_its_answer_token_by_token():
+    llm = StubLLM()
+    prompt = "Context\n\nQuestion: What is entropy?\nHelpful Answer:"
+    answer = asyncio.run(llm.ainvoke(prompt))
+    tokens = asyncio.run(collect(llm.astream(prompt)))
+
+    assert answer == "This is a stub answer to: What is entropy?"
+    assert len(tokens) == 9
+    assert "".join(tokens) == answer
+
+
+def test_engine_streams_from_the_configured_llm(monkeypatch):
+    monkeypatch.setattr(retrieval, "get_llm", lambda: StubLLM("Entropy measures disorder."))
+    engine = RetrievalEngine(1, "Thermodynamics")
+
+    tokens = asyncio.run(collect(engine.stream("prompt")))
+
+    assert tokens == ["Entropy", " measures", " disorder."]
+
+
+def test_sse_event_format():
+    event = sse_event("token", {"text": " hello"})
+
+    assert event == 'event: token\ndata: {"text": " hello"}\n\n'
+    assert json.loads(event.split("data: ", 1)[1]) == {"text": " hello"}
+
+
+def test_generation_stats_percentiles():
+    stats = GenerationStats(window=3)
+    for first_token, total in [(0.1, 1.0), (0.2, 2.0), (None, 3.0), (0.4, 4.0)]:
+        stats.record(first_token, total)
+
+    result = stats.stats()
+    assert result["streams"] == 4
+    assert result["total_ms"]["p50"] == 3000.0
+    assert result["first_token_ms"]["p50"] == 200.0
@@ -0,0 +1,154 @@
+"""Query plans of the hot endpoint queries must use indexes
+
+The queries are captured as the endpoint code sends them, then EXPLAINed.
+Needs a Postgres with pgvector: set TEST_DATABASE_URL. Tables are created
+and seeded in a scratch schema inside a transaction that is rolled back.
+"""
+import asyncio
+import json
+import os
+
+import pytest
+from fastapi import Response
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from backend.app.api.v1.endpoints.conversations import get_conversations, message_page
+from backend.app.api.v1.endpoints.documents import get_documents
+from backend.app.database.session import Base
+from backend.app.models import document, user  # noqa: F401  Registers the tables
+from backend.app.models.conversation import Conversation
+from backend.app.utils.conversation_memory import load_memory
+from backend.app.utils.document_index import DocumentVectorIndex
+from backend.app.utils.pagination import NEXT_CURSOR_HEADER
+from backend.app.utils.principal_cache import Principal
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+HOT_TABLES = {"document", "document_chunk", "conversation", "message"}
+
+SEED_SQL = [
+    """INSERT INTO "user" (id, email, hashed_password, created_at, updated_at)
+       SELECT i, 'user' || i || '@example.com', 'x', now(), now() FROM generate_series(1, 200) i""",
+    """INSERT INTO document (id, title, file_path, file_size, user_id, status, created_at, updated_at)
+       SELECT i, 'Doc ' || i, i || '.pdf', 1, i % 200 + 1, 'ready',
+              now() - i * interval '1 minute', now()
+       FROM generate_series(1, 5000) i""",
+    """INSERT INTO document_chunk (content, page_number, chunk_index, document_id, created_at, updated_at)
+       SELECT 'chunk ' || c, 1, c, d, now(), now()
+       FROM generate_series(1, 5000) d, generate_series(0, 9) c""",
+    """INSERT INTO conversation (id, title, user_id, document_id, created_at, updated_at)
+       SELECT i, 'Conversation ' || i, i % 200 + 1, i, now() - i * interval '1 minute', now()
+       FROM generate_series(1, 4000) i""",
+    """INSERT INTO message (content, role, conversation_id, created_at, updated_at)
+       SELECT 'message ' || m, CASE WHEN m % 2 = 0 THEN 'user' ELSE 'assistant' END, c,
+              now() - m * interval '1 second', now()
+       FROM generate_series(1, 4000) c, generate_series(1, 20) m""",
+]
+
+USER = Principal(7, "user7@example.com", True, 0)
+# Small enough that every list has a second page, so the keyset queries are captured too
+PAGE = 10
+
+
+def list_conversations(db):
+    response = Response()
+    asyncio.run(get_conversations(response, cursor=None, limit=PAGE, db=db, current_user=USER))
+    asyncio.run(get_conversations(Response(), cursor=response.headers[NEXT_CURSOR_HEADER], limit=PAGE,
+                                  db=db, current_user=USER))
+
+
+def page_messages(db):
+    _, next_cursor = message_page(db, 47, limit=PAGE)
+    message_page(db, 47, cursor=next_cursor, limit=PAGE)
+
+
+def read_memory(db):
+    load_memory(db, Conversation(id=47, summary_message_id=10), before_id=1000000)
+
+
+def list_documents(db):
+    response = Response()
+    asyncio.run(get_documents(response, cursor=None, limit=PAGE, db=db, current_user=USER))
+    asyncio.run(get_documents(Response(), cursor=response.headers[NEXT_CURSOR_HEADER], limit=PAGE,
+                              db=db, current_user=USER))
+
+
+def load_document_chunks(db):
+    DocumentVectorIndex().get_entry(db, 47)
+
+
+# The code paths behind the hot endpoints, run against the seeded tables
+HOT_CALLS = {
+    "conversation list": list_conversations,
+    "message page": page_messages,
+    "conversation memory": read_memory,
+    "document list": list_documents,
+    "document chunks": load_document_chunks,
+}
+
+
+def capture_selects(connection, call):
+    """The SELECT statements, as sent to Postgres, and their parameters for one call"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", record)
+    # Joins the seeded transaction without committing or ending it
+    session = Session(bind=connection)
+    try:
+        call(session)
+    finally:
+        session.close()
+        event.remove(connection, "before_cursor_execute", record)
+    return statements
+
+
+def sequential_scans(plan):
+    """Hot tables read by a sequential scan anywhere in a JSON plan"""
+    scans = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        scans.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scans += sequential_scans(child)
+    return scans
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    try:
+        connection = engine.connect()
+    except Exception as e:
+        pytest.skip(f"Cannot connect to TEST_DATABASE_URL: {e}")
+    transaction = connection.begin()
+    try:
+        if connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'vector'")).first() is None:
+            pytest.skip("pgvector is not installed in the test database")
+        connection.execute(text("CREATE SCHEMA query_plan_test"))
+        connection.execute(text("SET LOCAL search_path TO query_plan_test, public"))
+        Base.metadata.create_all(connection)
+        for statement in SEED_SQL:
+            connection.execute(text(statement))
+        for table in HOT_TABLES:
+            connection.execute(text(f"ANALYZE {table}"))
+        yield connection
+    finally:
+        transaction.rollback()
+        connection.close()
+        engine.dispose()
+
+
+@pytest.mark.parametrize("name", sorted(HOT_CALLS))
+def test_hot_queries_use_indexes(seeded, name):
+    statements = capture_selects(seeded, HOT_CALLS[name])
+    assert statements, f"{name} ran no queries"
+    for statement, parameters in statements:
+        plan = seeded.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        assert sequential_scans(plan[0]["Plan"]) == [], f"{statement}\n{json.dumps(plan, indent=2)}"
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.models.document import Document
+from backend.app.models.user import User
+from backend.app.utils import document_index as document_index_module
+from backend.app.utils import embedding_store, embeddings
+from backend.app.utils.document_index import DocumentVectorIndex
+from backend.app.utils.embedding_store import open_store, remove_column_stores, write_store
+from backend.app.utils.reembed import _fill_batch, backfill_column, drop_column, target_column
+
+# document_chunk with both embedding columns as text, as pgvector renders them
+CHUNK_TABLE_SQL = """
+    CREATE TABLE document_chunk (
+        id INTEGER PRIMARY KEY, content TEXT NOT NULL, page_number INTEGER, chunk_index INTEGER NOT NULL,
+        document_id INTEGER NOT NULL, embedding TEXT, embedding_next TEXT, created_at DATETIME, updated_at DATETIME
+    )"""
+
+
+class FakeModel:
+    """Two-dimensional 'embeddings' derived from the text, recording what it was asked to encode"""
+
+    def __init__(self):
+        self.seen = []
+
+    def encode(self, texts):
+        self.seen.extend(texts)
+        return np.array([[len(content), 1.0] for content in texts], dtype=np.float32)
+
+
+class NoCache:
+    def get_many(self, cache_key, texts):
+        return [None] * len(texts)
+
+    def put_many(self, cache_key, texts, encoded):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(embeddings, "embedding_cache", NoCache())
+    engine = create_engine("sqlite://")
+    User.__table__.create(engine)
+    Document.__table__.create(engine)
+    with engine.begin() as connection:
+        connection.execute(text(CHUNK_TABLE_SQL))
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_chunks(db, contents, document_id=1, embedded=True):
+    for content in contents:
+        db.execute(
+            text("INSERT INTO document_chunk (content, chunk_index, document_id, embedding) VALUES (:c, 0, :d, :e)"),
+            {"c": content, "d": document_id, "e": "[1,0]" if embedded else None}
+        )
+    db.commit()
+
+
+def column_values(db, column):
+    return [row[0] for row in db.execute(text(f"SELECT {column} FROM document_chunk ORDER BY id"))]
+
+
+def test_fill_batch_embeds_missing_rows_in_id_order(db):
+    add_chunks(db, ["a", "bb", "ccc", "dddd"])
+    db.execute(text("UPDATE document_chunk SET embedding_next = '[9,9]' WHERE id = 1"))
+    model = FakeModel()
+
+    last_id, embedded = _fill_batch(db, model, "fake", "embedding_next", 0, 2)
+
+    assert (last_id, embedded) == (3, 2)
+    assert model.seen == ["bb", "ccc"]
+    assert column_values(db, "embedding_next") == ["[9,9]", "[2,1]", "[3,1]", None]
+    assert column_values(db, "embedding") == ["[1,0]"] * 4  # the live column is never written
+    assert _fill_batch(db, model, "fake", "embedding_next", 4, 2) == (None, 0)
+
+
+def test_backfill_resumes_and_catches_up_chunks_ingested_meanwhile(db):
+    add_chunks(db, ["a", "bb", "ccc"])
+    model = FakeModel()
+    batches = []
+
+    assert backfill_column(db, model, "fake", "embedding_next", batch_size=2, on_batch=batches.append) == 3
+    assert batches == [2, 3]
+
+    # Ingested by a worker still on the previous model, which only writes the live column
+    add_chunks(db, ["eeeee"])
+    model.seen.clear()
+    assert backfill_column(db, model, "fake", "embedding_next") == 1
+    assert model.seen == ["eeeee"]
+    assert column_values(db, "embedding_next") == ["[1,1]", "[2,1]", "[3,1]", "[5,1]"]
+
+
+def test_cutover_alternates_columns_and_never_touches_the_live_one(db, tmp_path, monkeypatch):
+    assert target_column("embedding") == "embedding_next"
+    assert target_column("embedding_next") == "embedding"
+    with pytest.raises(ValueError):
+        drop_column(db, "embedding")
+
+    # Stores are kept per column, so refilling one never leaves the other's vectors behind
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path))
+    write_store(1, "job", [1], np.ones((1, 2), dtype=np.float32))
+    remove_column_stores("embedding_next")
+    assert open_store(1, "job") is not None
+    remove_column_stores("embedding")
+    assert open_store(1, "job") is None
+
+
+def test_partially_embedded_documents_are_reloaded_until_complete(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_store, "EMBEDDING_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(document_index_module, "EMBEDDING_STORE_ENABLED", True)
+    db.add(Document(id=1, title="doc", file_path="doc.pdf", file_size=1, user_id=1, status="ready",
+                    job_id="job", chunk_count=3))
+    db.commit()
+    add_chunks(db, ["a", "bb"])
+    add_chunks(db, ["ccc"], embedded=False)
+    index = DocumentVectorIndex(verify_seconds=0)
+
+    entry = index.get_entry(db, 1)
+    assert entry.ids.tolist() == [1, 2]
+    assert open_store(1, "job") is None
+
+    db.execute(text("UPDATE document_chunk SET embedding = '[0,1]' WHERE id = 3"))
+    db.commit()
+    entry = index.get_entry(db, 1)
+    assert entry.ids.tolist() == [1, 2, 3]
+    assert entry.version == ("job", 3)
+    assert open_store(1, "job")[0].tolist() == [1, 2, 3]
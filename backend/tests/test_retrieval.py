@@ -0,0 +1,62 @@
+import asyncio
+
+import numpy as np
+
+from backend.app.utils import retrieval, ttl_cache
+from backend.app.utils.retrieval import RetrievalEngine
+from backend.app.utils.ttl_cache import TTLCache
+
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ttl_cache.time, "monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts b, the least recently used
+    assert cache.get("b") is None
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+class FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        return " An answer. "
+
+
+def test_engine_answers_with_one_retrieval_and_one_completion(monkeypatch):
+    llm = FakeLLM()
+    retrieved = []
+    monkeypatch.setattr(retrieval, "get_llm", lambda: llm)
+
+    async def fake_embed(question):
+        return np.ones(4, dtype=np.float32)
+
+    monkeypatch.setattr(retrieval, "embed_query_async", fake_embed)
+
+    async def fake_retrieve(self, db, question, query_embedding=None):
+        retrieved.append(question)
+        return [{"page_number": 4, "content": "Entropy never decreases in an isolated system."}]
+
+    monkeypatch.setattr(RetrievalEngine, "retrieve", fake_retrieve)
+    engine = RetrievalEngine(1, "Thermodynamics")
+
+    result = asyncio.run(engine.answer(
+        None, "What is entropy?", "What is entropy?\n\nUse a formal tone.",
+        [("user", "Hi"), ("assistant", "Hello")]
+    ))
+
+    assert retrieved == ["What is entropy?"]
+    assert result["answer"] == "An answer."
+    assert result["citations"] == [{"page": 4, "text": "Entropy never decreases in an isolated system...."}]
+    prompt, = llm.prompts
+    assert "[Page 4] Entropy never decreases" in prompt
+    assert "Student: Hi\nAssistant: Hello" in prompt
+    assert "Use a formal tone." in prompt
@@ -0,0 +1,40 @@
+import pytest
+
+from backend.app.database.indexes import ivfflat_lists, vector_index_name, vector_index_sql
+from backend.app.database.vector import EMBEDDING_COLUMN
+from backend.app.utils.vector_search import EXACT_SEARCH_MAX_CHUNKS, choose_strategy
+
+
+def test_ivfflat_lists_follow_pgvector_sizing():
+    assert ivfflat_lists(0) == 1
+    assert ivfflat_lists(250_000) == 250
+    assert ivfflat_lists(4_000_000) == 2000
+
+
+def test_vector_index_sql_uses_cosine_ops():
+    hnsw = vector_index_sql("hnsw", m=24, ef_construction=100)
+    assert "USING hnsw (embedding vector_cosine_ops) WITH (m = 24, ef_construction = 100)" in hnsw
+    assert hnsw.startswith("CREATE INDEX CONCURRENTLY")
+
+    ivfflat = vector_index_sql("ivfflat", name="tmp_idx", concurrently=False, lists=100)
+    assert ivfflat.startswith("CREATE INDEX tmp_idx ON document_chunk USING ivfflat")
+    assert "WITH (lists = 100)" in ivfflat
+
+    with pytest.raises(ValueError):
+        vector_index_sql("flat")
+
+
+def test_vector_index_sql_defaults_to_the_live_column():
+    assert f"USING hnsw ({EMBEDDING_COLUMN} vector_cosine_ops)" in vector_index_sql("hnsw")
+    assert f" {vector_index_name(EMBEDDING_COLUMN)} ON " in vector_index_sql("hnsw")
+
+    standby = vector_index_sql("hnsw", column="embedding_next")
+    assert standby.startswith("CREATE INDEX CONCURRENTLY document_chunk_embedding_next_idx ON")
+    assert "(embedding_next vector_cosine_ops)" in standby
+
+
+def test_scoped_search_strategy_follows_scope_size():
+    assert choose_strategy(None) == "index"
+    assert choose_strategy(0) == "exact"
+    assert choose_strategy(EXACT_SEARCH_MAX_CHUNKS) == "exact"
+    assert choose_strategy(EXACT_SEARCH_MAX_CHUNKS + 1) == "filtered_index"
@@ -3,13 +3,24 @@ import { DashboardDocument } from '../components/Dashboard/DocumentList';
 
 const API_URL = '/api/v1';
 
+// The documents endpoint returns one page at a time; the cursor of the next
+// page comes back in the X-Next-Cursor header until the list is exhausted
+const PAGE_SIZE = 200;
+
 export async function fetchDocuments(): Promise<DashboardDocument[]> {
-  const { data } = await axios.get(`${API_URL}/documents`, {
-    headers: {
-      Authorization: `Bearer ${localStorage.getItem('token')}`
-    }
-  });
-  return data as DashboardDocument[];
+  const documents: DashboardDocument[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await axios.get(`${API_URL}/documents`, {
+      params: { limit: PAGE_SIZE, cursor },
+      headers: {
+        Authorization: `Bearer ${localStorage.getItem('token')}`
+      }
+    });
+    documents.push(...(response.data as DashboardDocument[]));
+    cursor = response.headers['x-next-cursor'] as string | undefined;
+  } while (cursor);
+  return documents;
 }
 
 export async function uploadDocument(file: File) {